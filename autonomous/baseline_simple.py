@@ -21,12 +21,19 @@ class Autonomous:
         self.field_string = ''
         ds = wpilib.DriverStation.getInstance()
         while self.timer.get() < 1 and len(self.field_string) == 0:
-            fms_message = ds.getGameSpecificMessage().decode("utf-8")
+            fms_message = ds.getGameSpecificMessage()
             if fms_message is None:
                 fms_message = ''
+            elif isinstance(fms_message, bytes):
+                # (the simulated HAL already returns a str)
+                fms_message = fms_message.decode("utf-8")
 
             self.field_string = fms_message.upper()
 
+            # Don't spin; this also lets the clock advance in simulation.
+            if len(self.field_string) == 0:
+                wpilib.Timer.delay(0.005)
+
         self.drive_speed = 150
 
         # Note: positive angles = rightward
@@ -85,9 +92,39 @@ class Autonomous:
         self.startup_routine = True
         self.start_timer_started = False
 
+        # Time to allow for raising the lift before ejecting the cube, if
+        # the lift hasn't been zeroed. Otherwise the lift makes a profiled
+        # move, and the cube is ejected once the move has finished (or
+        # timed out).
+        self.lift_raise_time = 1.5
+        self.lift_profiled = False
+        self.eject_start = None
+
     def update_smart_dashboard(self):
         pass
 
+    def raise_lift(self, elapsed):
+        """
+        Raise the lift to the switch.
+
+        Args:
+            elapsed: the time since the lift started going up, in seconds.
+
+        Returns:
+            True once the lift is up (or the move has timed out).
+        """
+        lift = self.robot.lift
+
+        if lift.move_to_preset('switch') is None:
+            if elapsed < self.lift_raise_time:
+                lift.setLiftPower(-0.3)
+                return False
+
+            return True
+
+        self.lift_profiled = True
+        return lift.is_move_finished() or lift.has_move_timed_out()
+
     def periodic(self):
         try:
             if self.startup_routine:
@@ -106,18 +143,24 @@ class Autonomous:
                     elif init_time < 0.5+4:
                         self.robot.lift.setLiftPower(0)
                         self.robot.drivetrain.set_all_module_speeds(self.drive_speed, True)
-                    elif init_time < 0.5+4+1.5:
-                        if self.eject_cube:
-                            self.robot.lift.setLiftPower(-0.3)
+                    elif self.eject_start is None:
                         self.robot.drivetrain.set_all_module_speeds(0, True)
-                    elif init_time < 0.5+4+1.5+1:
-                        self.robot.lift.setLiftPower(0)
+
+                        if (
+                            not self.eject_cube
+                            or self.raise_lift(init_time - (0.5+4))
+                        ):
+                            self.eject_start = init_time
+                    elif init_time < self.eject_start+1:
+                        if not self.lift_profiled:
+                            self.robot.lift.setLiftPower(0)
                         if self.eject_cube:
                             self.robot.claw.set_power(-0.5)
 
                         self.robot.drivetrain.set_all_module_speeds(0, True)
                     else:
-                        self.robot.lift.setLiftPower(0)
+                        if not self.lift_profiled:
+                            self.robot.lift.setLiftPower(0)
                         self.robot.claw.set_power(0)
                         self.robot.drivetrain.set_all_module_angles(0)
                         self.robot.drivetrain.set_all_module_speeds(0, True)
@@ -286,7 +286,7 @@ class Autonomous:
                 self.robot.drivetrain.reset_drive_position()
                 self.state = 'turn'
             else:
-                self.state = 'target-turn'
+                self.state = 'lift'
 
     def state_lift(self):
         """
@@ -297,7 +297,15 @@ class Autonomous:
         # stop the drivetrain.
         self.robot.drivetrain.set_all_module_speeds(0, True)
 
-        if not self.hack_timer_started:
+        # use a profiled move if the lift has been zeroed; otherwise fall
+        # back to running the lift for a fixed amount of time.
+        if self.robot.lift.move_to_preset('switch') is not None:
+            if (
+                self.robot.lift.is_move_finished()
+                or self.robot.lift.has_move_timed_out()
+            ):
+                self.state = 'target-turn'
+        elif not self.hack_timer_started:
             self.hack_timer.reset()
             self.hack_timer.start()
             self.hack_timer_started = True
@@ -96,7 +96,7 @@ if wpilib.RobotBase.isSimulation():
 
     _, trajectories['straight-forward'] = pf.generate(
         [
-            array_to_waypoint(np.array([0, 0]))
+            array_to_waypoint(np.array([0, 0])),
             array_to_waypoint(np.array([132, 0]))
         ],
         pf.FIT_HERMITE_CUBIC,
@@ -135,6 +135,12 @@ class Autonomous:
         self.lift_timer = wpilib.Timer()
         self.lift_timer_started = False
 
+        # The lift is raised with profiled moves once it has been zeroed;
+        # otherwise it's run at a fixed power for a fixed time. The next
+        # step starts once the lift is there (or the move has timed out).
+        self.unfold_time = None
+        self.eject_start = None
+
         target_trajectory = trajectories['straight-forward']
         self.eject_cube = False
 
@@ -142,12 +148,17 @@ class Autonomous:
             self.field_string = ''
             ds = wpilib.DriverStation.getInstance()
             while self.timer.get() < 1 and len(self.field_string) == 0:
-                fms_message = ds.getGameSpecificMessage().decode("utf-8")
+                fms_message = ds.getGameSpecificMessage()
                 if fms_message is None:
                     fms_message = ''
+                elif isinstance(fms_message, bytes):
+                    fms_message = fms_message.decode("utf-8")
 
                 self.field_string = fms_message.upper()
 
+                if len(self.field_string) == 0:
+                    wpilib.Timer.delay(0.005)
+
             if self.field_string != '':
                 print("[auto] Got field string in {:.3f} seconds: {}".format(
                     self.timer.get(), self.field_string
@@ -225,6 +236,32 @@ class Autonomous:
     def update_smart_dashboard(self):
         pass
 
+    def raise_lift(self, preset, elapsed, fallback_time, fallback_power):
+        """
+        Raise the lift to a preset position.
+
+        Args:
+            preset: the preset to move to (see
+                :meth:`lift.ManualControlLift.preset_position`).
+            elapsed: the time since the lift started going up, in seconds.
+            fallback_time, fallback_power: how long, and at what power, to
+                run the lift for if it hasn't been zeroed.
+
+        Returns:
+            True once the lift is there (or the move has timed out).
+        """
+        lift = self.robot.lift
+
+        if lift.move_to_preset(preset) is None:
+            if elapsed < fallback_time:
+                lift.setLiftPower(fallback_power)
+                return False
+
+            lift.setLiftPower(0)
+            return True
+
+        return lift.is_move_finished() or lift.has_move_timed_out()
+
     def periodic(self):
         # follow trajectory if need be
         try:
@@ -234,16 +271,15 @@ class Autonomous:
                     self.start_timer.start()
                     self.start_timer_started = True
                 else:
-                    #
                     init_time = self.start_timer.get()
-                    if init_time < 0.75:
-                        self.robot.lift.setLiftPower(-0.6)
+                    if self.unfold_time is None:
                         self.robot.drivetrain.set_all_module_angles(0)
-                    elif init_time < 0.75+1.5:
-                        self.robot.lift.setLiftPower(0)
+                        if self.raise_lift('carry', init_time, 0.75, -0.6):
+                            self.unfold_time = init_time
+                    elif init_time < self.unfold_time+1.5:
                         self.robot.drivetrain.set_all_module_angles(0)
                         self.robot.drivetrain.set_all_module_speeds(250, True)
-                    elif init_time < (0.75+1.5)+1.5:
+                    elif init_time < (self.unfold_time+1.5)+1.5:
                         self.robot.drivetrain.set_all_module_angles(0)
                         self.robot.drivetrain.set_all_module_speeds(-250, True)
                     else:
@@ -274,13 +310,13 @@ class Autonomous:
                     self.lift_timer.start()
                     self.lift_timer_started = True
                 else:
-                    if self.lift_timer.get() < 1.5:
-                        self.robot.lift.setLiftPower(-0.4)
-                    elif self.lift_timer.get() < 4:
-                        self.robot.lift.setLiftPower(0)
+                    lift_time = self.lift_timer.get()
+                    if self.eject_start is None:
+                        if self.raise_lift('switch', lift_time, 1.5, -0.4):
+                            self.eject_start = lift_time
+                    elif lift_time < self.eject_start+2.5:
                         self.robot.claw.set_power(-0.5)  # eject cube
                     else:
-                        self.robot.lift.setLiftPower(0)
                         self.robot.claw.set_power(0)
         except:  # noqa: E772
             print(
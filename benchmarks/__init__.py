@@ -0,0 +1,2 @@
+from .stubs import StubHardware, stub_hardware  # noqa: F401
+from .hotpaths import run_benchmarks  # noqa: F401
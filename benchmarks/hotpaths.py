@@ -0,0 +1,248 @@
+"""
+Micro-benchmarks of the robot code's hot paths.
+
+Each benchmark calls one piece of the teleop loop over and over against
+stub hardware (see :mod:`benchmarks.stubs`) and reports the time per call
+and the number of hardware calls (Talon, joystick, Preferences and navX)
+each call makes::
+
+    python -m benchmarks.hotpaths                # compare to the baselines
+    python -m benchmarks.hotpaths save           # record new baselines
+    python -m benchmarks.hotpaths compare 50     # ... with 50us Talon calls
+
+Comparing exits with an error if any benchmark got more than
+``time_tolerance`` slower than its baseline, or makes more hardware calls.
+Times depend on the machine, so record baselines on the machine you compare
+on; hardware call counts don't.
+"""
+import itertools
+import json
+import math
+import os
+import sys
+import time
+from collections import namedtuple
+import numpy as np
+from .stubs import StubHardware, kinds, stub_hardware
+
+#: Stored baselines: benchmark name -> {'time_us': ..., 'calls': ...}
+baseline_path = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+#: How much slower than the baseline a benchmark can get before comparing
+#: fails: a fraction of the baseline, plus a few microseconds so the
+#: smallest benchmarks don't fail on timer noise.
+time_tolerance = 0.25
+time_slack_us = 2
+
+#: ``time`` is seconds per call; ``calls`` is hardware calls per call, and
+#: ``calls_by_kind`` breaks them down by device kind.
+Result = namedtuple('Result', ['name', 'time', 'calls', 'calls_by_kind'])
+
+
+def build_robot():
+    """
+    Run robotInit and teleopInit on a new Robot.
+
+    Must be called inside :func:`benchmarks.stubs.stub_hardware`. Only the
+    robot code is set up - not the rest of RobotBase, which needs a driver
+    station.
+    """
+    import hal_impl.functions
+    import robot
+
+    hal_impl.functions.reset_hal()
+
+    robot_obj = robot.Robot.__new__(robot.Robot)
+    robot_obj.robotInit()
+    robot_obj.teleopInit()
+
+    # half stick forwards and to the side, and turning a bit
+    robot_obj.teleop.stick.axes[0:3] = [0.3, -0.6, 0.2]
+
+    return robot_obj
+
+
+def get_benchmarks(robot):
+    """
+    Returns:
+        list of ``(name, function)``
+    """
+    drivetrain = robot.drivetrain
+    module = drivetrain.modules[0]
+    angles = itertools.cycle(np.linspace(-math.pi, math.pi, 37))
+
+    return [
+        ('SwerveDrive.drive', lambda: drivetrain.drive(0.5, 0.3, 0.2)),
+        ('SwerveModule.set_steer_angle',
+            lambda: module.set_steer_angle(next(angles))),
+        ('SwerveDrive.turn_to_angle',
+            lambda: drivetrain.turn_to_angle(robot.imu, 1.0)),
+        ('Teleop.drive', robot.teleop.drive),
+        ('SwerveDrive.update_smart_dashboard',
+            drivetrain.update_smart_dashboard),
+        ('Teleop.update_smart_dashboard',
+            robot.teleop.update_smart_dashboard),
+        ('IMU.update_smart_dashboard', robot.imu.update_smart_dashboard),
+        ('Lift.update_smart_dashboard', robot.lift.update_smart_dashboard),
+        ('Winch.update_smart_dashboard', robot.winch.update_smart_dashboard),
+        ('CANAccounting.update_smart_dashboard',
+            robot.can_stats.update_smart_dashboard),
+        ('Robot.teleopPeriodic', robot.teleopPeriodic),
+    ]
+
+
+def measure(name, fn, hardware, min_time=0.1, repeat=7):
+    """
+    Time a function, taking the best of ``repeat`` runs of at least
+    ``min_time`` seconds each.
+    """
+    n = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(n):
+            fn()
+        if time.perf_counter() - start >= min_time:
+            break
+        n *= 2
+
+    best = float('inf')
+    for _ in range(repeat):
+        hardware.reset()
+
+        start = time.perf_counter()
+        for _ in range(n):
+            fn()
+        best = min(best, (time.perf_counter() - start) / n)
+
+    return Result(
+        name, best, hardware.total_calls() / n,
+        {kind: hardware.calls[kind] / n for kind in kinds}
+    )
+
+
+def run_benchmarks(latency=None, min_time=0.1, repeat=7, names=None):
+    """
+    Run the benchmarks.
+
+    Args:
+        latency (dict): per-call latency of each device kind, in seconds
+            (see StubHardware).
+        min_time (float): minimum length of each timed run, in seconds.
+        repeat (int): number of timed runs per benchmark.
+        names: only run these benchmarks.
+
+    Returns:
+        list of Result
+    """
+    hardware = StubHardware(latency)
+    results = []
+
+    with stub_hardware(hardware):
+        robot = build_robot()
+
+        for name, fn in get_benchmarks(robot):
+            if names is None or name in names:
+                results.append(measure(name, fn, hardware, min_time, repeat))
+
+    return results
+
+
+def load_baselines(path=baseline_path):
+    with open(path) as fp:
+        return json.load(fp)
+
+
+def save_baselines(results, path=baseline_path):
+    baselines = {
+        r.name: {'time_us': round(r.time * 1e6, 2), 'calls': r.calls}
+        for r in results
+    }
+
+    with open(path, 'w') as fp:
+        json.dump(baselines, fp, indent=4, sort_keys=True)
+        fp.write('\n')
+
+
+def compare(results, baselines, tolerance=time_tolerance, check_time=True):
+    """
+    Find the benchmarks that regressed.
+
+    Args:
+        results: list of Result.
+        baselines: as loaded by load_baselines.
+        tolerance (float): allowed slowdown, as a fraction of the baseline
+            (plus ``time_slack_us``).
+        check_time (bool): compare times as well as hardware call counts.
+
+    Returns:
+        list of messages, one for each regression.
+    """
+    regressions = []
+
+    for r in results:
+        baseline = baselines.get(r.name)
+        if baseline is None:
+            continue
+
+        # (allow for the occasional dashboard update in teleopPeriodic)
+        if r.calls > baseline['calls'] + 0.5:
+            regressions.append(
+                '{}: {:.1f} hardware calls per call (baseline {:.1f})'.format(
+                    r.name, r.calls, baseline['calls']
+                )
+            )
+
+        time_us = r.time * 1e6
+        limit = (baseline['time_us'] * (1 + tolerance)) + time_slack_us
+        if check_time and time_us > limit:
+            regressions.append(
+                '{}: {:.1f} us per call (baseline {:.1f} us)'.format(
+                    r.name, time_us, baseline['time_us']
+                )
+            )
+
+    return regressions
+
+
+def format_results(results, baselines=None):
+    lines = ['{:<38} {:>10} {:>8} {:>7} {:>7} {:>7} {:>7}'.format(
+        'benchmark', 'us/call', 'vs base', 'talon', 'stick', 'prefs', 'navx'
+    )]
+
+    for r in results:
+        change = ''
+        if baselines and r.name in baselines:
+            change = '{:+.0%}'.format(
+                (r.time * 1e6) / baselines[r.name]['time_us'] - 1
+            )
+
+        lines.append('{:<38} {:>10.1f} {:>8} {:>7.1f} {:>7.1f} {:>7.1f} {:>7.1f}'.format(  # noqa: E501
+            r.name, r.time * 1e6, change,
+            *(r.calls_by_kind[kind] for kind in kinds)
+        ))
+
+    return '\n'.join(lines)
+
+
+def main(command='compare', talon_latency_us=0):
+    latency = {'talon': float(talon_latency_us) * 1e-6}
+    results = run_benchmarks(latency)
+
+    if command == 'save':
+        save_baselines(results)
+        print(format_results(results))
+        print('[benchmarks] saved baselines to ' + baseline_path)
+        return 0
+
+    baselines = load_baselines()
+    print(format_results(results, baselines))
+
+    regressions = compare(results, baselines)
+    for regression in regressions:
+        print('[benchmarks] REGRESSION: ' + regression)
+
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(*sys.argv[1:]))
@@ -0,0 +1,303 @@
+"""
+Fast stand-ins for the robot's hardware, for benchmarking.
+
+The simulated HAL and the robotpy Talon / navX simulations are much slower
+than the real devices' Python bindings, so timing robot code against them
+mostly measures the simulation. These stubs do as little as possible: they
+remember what was set, return it when asked, and count every call.
+
+Each call can also be made to take a fixed extra time (busy-waiting, since
+sleeps are far too coarse), to see how the code would behave with slower
+hardware calls, e.g. CAN transactions on a busy bus.
+
+Use :func:`stub_hardware` to swap the stubs in for the real classes, both
+while robot objects are constructed and while they run (some code looks
+``wpilib.Preferences`` up on every call)::
+
+    hardware = StubHardware(latency={'talon': 50e-6})
+    with stub_hardware(hardware):
+        drivetrain = swerve.SwerveDrive(...)
+        drivetrain.drive(0.5, 0, 0)
+"""
+import contextlib
+import time
+from collections import Counter
+from ctre.talonsrx import TalonSRX
+
+#: Device kinds, as used for call counts and latencies.
+kinds = ('talon', 'joystick', 'preferences', 'navx')
+
+
+class StubHardware(object):
+    """
+    Call counts and latencies shared by all stub devices.
+
+    Args:
+        latency (dict): extra time taken by each call, in seconds, keyed by
+            device kind.
+    """
+
+    def __init__(self, latency=None):
+        self.latency = dict(latency or {})
+        self.calls = Counter()
+
+    def call(self, kind):
+        self.calls[kind] += 1
+
+        delay = self.latency.get(kind)
+        if delay:
+            end = time.perf_counter() + delay
+            while time.perf_counter() < end:
+                pass
+
+    def total_calls(self):
+        return sum(self.calls.values())
+
+    def reset(self):
+        self.calls.clear()
+
+
+class _StubDevice(object):
+    kind = None
+
+    #: The StubHardware new devices report to (set by stub_hardware).
+    hardware = None
+
+    def __init__(self):
+        self._hardware = self.hardware
+
+    def __getattr__(self, name):
+        # anything not stubbed explicitly (config calls, mostly) just gets
+        # counted
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        hardware = self._hardware
+        kind = self.kind
+
+        def method(*args, **kwargs):
+            hardware.call(kind)
+            return 0
+
+        setattr(self, name, method)
+        return method
+
+
+class StubTalonSRX(_StubDevice):
+    kind = 'talon'
+
+    ControlMode = TalonSRX.ControlMode
+    FeedbackDevice = TalonSRX.FeedbackDevice
+    LimitSwitchNormal = TalonSRX.LimitSwitchNormal
+    LimitSwitchSource = TalonSRX.LimitSwitchSource
+    StatusFrameEnhanced = TalonSRX.StatusFrameEnhanced
+
+    def __init__(self, device_id):
+        super().__init__()
+        self.device_id = device_id
+        self.control_mode = TalonSRX.ControlMode.PercentOutput
+        self.value = 0
+        self.position = 0
+        self.velocity = 0
+        self.analog = 0
+
+    def getDeviceID(self):
+        return self.device_id
+
+    def set(self, mode, value, *args):
+        self._hardware.call('talon')
+        self.control_mode = mode
+        self.value = value
+
+    def getSelectedSensorPosition(self, pidIdx=0):
+        self._hardware.call('talon')
+        return self.position
+
+    def getSelectedSensorVelocity(self, pidIdx=0):
+        self._hardware.call('talon')
+        return self.velocity
+
+    def getQuadraturePosition(self):
+        self._hardware.call('talon')
+        return self.position
+
+    def getQuadratureVelocity(self):
+        self._hardware.call('talon')
+        return self.velocity
+
+    def getAnalogIn(self):
+        self._hardware.call('talon')
+        return self.analog
+
+    def getAnalogInRaw(self):
+        self._hardware.call('talon')
+        return self.analog
+
+    def getClosedLoopError(self, pidIdx=0):
+        self._hardware.call('talon')
+        return 0
+
+    def getOutputCurrent(self):
+        self._hardware.call('talon')
+        return 0.0
+
+    def getMotorOutputPercent(self):
+        self._hardware.call('talon')
+        return 0.0
+
+    def configGetParameter(self, param, ordinal, timeout_ms):
+        # config calls aren't remembered, so there's nothing to read back
+        self._hardware.call('talon')
+        raise NotImplementedError
+
+
+class StubJoystick(_StubDevice):
+    kind = 'joystick'
+
+    def __init__(self, port):
+        super().__init__()
+        self.port = port
+        self.axes = [0.0] * 6
+        self.buttons = [False] * 13
+
+    def getRawAxis(self, axis):
+        self._hardware.call('joystick')
+        return self.axes[axis]
+
+    def getRawButton(self, button):
+        self._hardware.call('joystick')
+        return self.buttons[button]
+
+
+class StubPreferences(_StubDevice):
+    kind = 'preferences'
+
+    _instance = None
+
+    @classmethod
+    def getInstance(cls):
+        if cls._instance is None:
+            cls._instance = cls()
+
+        return cls._instance
+
+    def __init__(self):
+        super().__init__()
+        self.values = {}
+
+    def _get(self, key, default):
+        self._hardware.call('preferences')
+        return self.values.get(key, default)
+
+    def _put(self, key, value):
+        self._hardware.call('preferences')
+        self.values[key] = value
+
+    def getFloat(self, key, backup=0):
+        return self._get(key, backup)
+
+    def getInt(self, key, backup=0):
+        return self._get(key, backup)
+
+    def getBoolean(self, key, backup=False):
+        return self._get(key, backup)
+
+    def getString(self, key, backup=''):
+        return self._get(key, backup)
+
+    def putFloat(self, key, value):
+        self._put(key, value)
+
+    def putInt(self, key, value):
+        self._put(key, value)
+
+    def putBoolean(self, key, value):
+        self._put(key, value)
+
+    def putString(self, key, value):
+        self._put(key, value)
+
+    def containsKey(self, key):
+        self._hardware.call('preferences')
+        return key in self.values
+
+
+class StubAHRS(_StubDevice):
+    kind = 'navx'
+
+    @classmethod
+    def create_spi(cls, port=None, *args):
+        return cls()
+
+    @classmethod
+    def create_i2c(cls, port=None, *args):
+        return cls()
+
+    def __init__(self):
+        super().__init__()
+        self.angle = 0.0
+        self.rate = 0.0
+
+    def isConnected(self):
+        self._hardware.call('navx')
+        return True
+
+    def getAngle(self):
+        self._hardware.call('navx')
+        return self.angle
+
+    def getFusedHeading(self):
+        self._hardware.call('navx')
+        return self.angle % 360
+
+    def getYaw(self):
+        self._hardware.call('navx')
+        return ((self.angle + 180) % 360) - 180
+
+    def getRate(self):
+        self._hardware.call('navx')
+        return self.rate
+
+    def reset(self):
+        self._hardware.call('navx')
+        self.angle = 0.0
+
+
+#: Where each real hardware class is looked up from: (module, attribute,
+#: stub).
+_patches = [
+    ('swerve.swerve_module', 'TalonSRX', StubTalonSRX),
+    ('lift.lift', 'TalonSRX', StubTalonSRX),
+    ('lift.claw', 'TalonSRX', StubTalonSRX),
+    ('winch.winch', 'TalonSRX', StubTalonSRX),
+    ('sensors.imu', 'AHRS', StubAHRS),
+    ('wpilib', 'Joystick', StubJoystick),
+    ('wpilib', 'Preferences', StubPreferences),
+]
+
+
+@contextlib.contextmanager
+def stub_hardware(hardware):
+    """
+    Replace the hardware classes used by the robot code with stubs that
+    report to ``hardware``.
+    """
+    import importlib
+
+    saved = []
+    for module_name, attr, stub in _patches:
+        module = importlib.import_module(module_name)
+        saved.append((module, attr, getattr(module, attr)))
+        setattr(module, attr, stub)
+
+    old_hardware = _StubDevice.hardware
+    _StubDevice.hardware = hardware
+    StubPreferences._instance = None
+
+    try:
+        yield hardware
+    finally:
+        for module, attr, value in saved:
+            setattr(module, attr, value)
+
+        _StubDevice.hardware = old_hardware
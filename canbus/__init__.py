@@ -0,0 +1,3 @@
+from .status_frames import StatusFrameManager  # noqa: F401
+from .accounting import CANAccounting  # noqa: F401
+from .configurator import TalonConfigurator  # noqa: F401
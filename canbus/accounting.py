@@ -0,0 +1,226 @@
+"""
+CAN transaction accounting.
+
+:class:`CANAccounting` wraps Talon SRX objects in a thin proxy that counts
+every call made on them, broken down by:
+
+- **kind**: ``get`` (``get*`` calls, i.e. reads of status frame data),
+  ``set`` (``set()`` calls, i.e. control frame updates) and ``config``
+  (everything else: ``config*``, ``set<Something>``, ``selectProfileSlot``,
+  etc.)
+- **device**: the Talon being called, labelled with the subsystem that owns
+  it.
+- **caller**: the module the call was made from (for example
+  ``swerve.swerve_module`` or ``teleop``).
+
+Counts are accumulated per loop tick and folded into per-mode totals by
+:meth:`CANAccounting.end_tick`. Since the proxy is pure Python, this works
+the same way against the simulated HAL as it does on the robot.
+"""
+import sys
+from collections import Counter
+import wpilib
+from ctre.talonsrx import TalonSRX
+
+#: Kinds of CAN transactions.
+kinds = ('get', 'set', 'config')
+
+
+def _classify(method_name):
+    if method_name == 'set':
+        return 'set'
+    elif method_name.startswith('get'):
+        return 'get'
+    else:
+        return 'config'
+
+
+class InstrumentedTalon:
+    """
+    A proxy around a :class:`ctre.talonsrx.TalonSRX` that reports each
+    method call to a :class:`CANAccounting` instance.
+    """
+
+    def __init__(self, talon, device, accounting):
+        self.__talon = talon
+        self.__device = device
+        self.__accounting = accounting
+        self.__wrappers = {}
+
+    def __getattr__(self, name):
+        attr = getattr(self.__talon, name)
+
+        # Don't count enums, constants or private helpers.
+        if name.startswith('_') or name[0].isupper() or not callable(attr):
+            return attr
+
+        wrapper = self.__wrappers.get(name)
+        if wrapper is None:
+            wrapper = self.__make_wrapper(name, attr)
+            self.__wrappers[name] = wrapper
+
+        return wrapper
+
+    def __make_wrapper(self, name, method):
+        kind = _classify(name)
+        device = self.__device
+        record = self.__accounting.record
+
+        def wrapper(*args, **kwargs):
+            caller = sys._getframe(1).f_globals.get('__name__', '?')
+            record(device, caller, kind)
+            return method(*args, **kwargs)
+
+        return wrapper
+
+
+class ModeStats:
+    """
+    Accumulated CAN transaction counts for one robot mode.
+
+    Attributes:
+        ticks: the number of loop ticks recorded.
+        totals: a Counter of transactions by kind.
+        max_per_tick: a Counter holding the largest number of transactions of
+            each kind seen in a single tick.
+        by_device: a Counter of transactions keyed by ``(device, kind)``.
+        by_caller: a Counter of transactions keyed by ``(caller, kind)``.
+    """
+
+    def __init__(self):
+        self.ticks = 0
+        self.totals = Counter()
+        self.max_per_tick = Counter()
+        self.by_device = Counter()
+        self.by_caller = Counter()
+
+    def per_tick(self, kind):
+        """Get the average number of transactions of a kind per tick."""
+        if self.ticks == 0:
+            return 0
+
+        return self.totals[kind] / self.ticks
+
+
+class CANAccounting:
+    """
+    Counts CAN transactions made on instrumented Talons.
+
+    Parameters:
+        enabled: if False, :meth:`instrument` leaves objects untouched and
+            nothing is ever recorded.
+
+    Attributes:
+        modes: a dict mapping mode names to :class:`ModeStats`.
+        last_tick: a Counter of transactions by kind for the most recently
+            completed tick.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.modes = {}
+        self.last_tick = Counter()
+
+        self.__tick_devices = Counter()
+        self.__tick_callers = Counter()
+        self.__tick_kinds = Counter()
+
+    def instrument(self, owner, obj):
+        """
+        Replace every Talon attribute of ``obj`` with an instrumented proxy.
+
+        Args:
+            owner: a label for the subsystem owning these Talons, used to
+                name the devices in reports (e.g. ``'lift'``).
+            obj: the subsystem object (e.g. a ``ManualControlLift``).
+        """
+        if not self.enabled:
+            return
+
+        for attr, value in list(vars(obj).items()):
+            if isinstance(value, TalonSRX):
+                device = '{} #{}'.format(owner, value.getDeviceID())
+                setattr(obj, attr, InstrumentedTalon(value, device, self))
+
+    def record(self, device, caller, kind):
+        """Record a single transaction in the current tick."""
+        self.__tick_kinds[kind] += 1
+        self.__tick_devices[(device, kind)] += 1
+        self.__tick_callers[(caller, kind)] += 1
+
+    def end_tick(self, mode):
+        """
+        Fold the transactions recorded since the last call into the totals
+        for the given mode. Call this at the end of every periodic method.
+        """
+        if not self.enabled:
+            return
+
+        stats = self.modes.get(mode)
+        if stats is None:
+            stats = ModeStats()
+            self.modes[mode] = stats
+
+        stats.ticks += 1
+        stats.totals.update(self.__tick_kinds)
+        stats.by_device.update(self.__tick_devices)
+        stats.by_caller.update(self.__tick_callers)
+
+        for kind in kinds:
+            if self.__tick_kinds[kind] > stats.max_per_tick[kind]:
+                stats.max_per_tick[kind] = self.__tick_kinds[kind]
+
+        self.last_tick = self.__tick_kinds
+        self.__tick_kinds = Counter()
+        self.__tick_devices = Counter()
+        self.__tick_callers = Counter()
+
+    def reset(self):
+        """Clear all recorded statistics."""
+        self.modes = {}
+        self.last_tick = Counter()
+        self.__tick_kinds.clear()
+        self.__tick_devices.clear()
+        self.__tick_callers.clear()
+
+    def update_smart_dashboard(self):
+        if not self.enabled:
+            return
+
+        for kind in kinds:
+            wpilib.SmartDashboard.putNumber(
+                'CAN {} Calls (Last Tick)'.format(kind.title()),
+                self.last_tick[kind]
+            )
+
+        for mode, stats in self.modes.items():
+            for kind in kinds:
+                wpilib.SmartDashboard.putNumber(
+                    'CAN {} Calls/Tick ({})'.format(kind.title(), mode),
+                    stats.per_tick(kind)
+                )
+
+    def dump(self, fp):
+        """
+        Write a human-readable report of all recorded statistics.
+
+        Args:
+            fp: a writable text file object.
+        """
+        for mode, stats in sorted(self.modes.items()):
+            print('== {} ({} ticks)'.format(mode, stats.ticks), file=fp)
+
+            for kind in kinds:
+                print('  {:<6} total={:<8} per tick={:<8.2f} max={}'.format(
+                    kind, stats.totals[kind], stats.per_tick(kind),
+                    stats.max_per_tick[kind]
+                ), file=fp)
+
+            for title, counts in [
+                ('device', stats.by_device), ('caller', stats.by_caller)
+            ]:
+                print('  -- per {} (calls/tick):'.format(title), file=fp)
+                for (name, kind), count in sorted(counts.items()):
+                    print('    {:<32} {:<6} {:.2f}'.format(
+                        name, kind, count / stats.ticks
+                    ), file=fp)
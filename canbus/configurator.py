@@ -0,0 +1,301 @@
+"""
+Verified Talon SRX configuration.
+
+Each subsystem declares the persistent configuration its Talons need (see
+the ``get_talon_config()`` methods), the same way it declares status frame
+rates. :class:`TalonConfigurator` then:
+
+1. sends every setting to every Talon in one pass, without waiting for each
+   one to be acknowledged,
+2. reads each setting back, and
+3. re-sends only the settings that didn't stick, this time waiting for the
+   Talon's answer, and reads them back again (up to ``retries`` times).
+
+A Talon that browns out loses this configuration without anything on the
+roboRIO noticing, so :meth:`TalonConfigurator.repair` can be run again later
+to check everything and fix what's wrong.
+
+Settings that can't be read back (``quadrature_position``) are always sent
+with a timeout, and checked by the error code they return. The simulated
+Talons can't read most parameters back either; those settings are reported
+as unverified.
+"""
+import time
+from collections import namedtuple
+from ctre._impl import ParamEnum
+from .status_frames import default_periods
+
+
+def _read_parameter(param, ordinal=0):
+    def read(talon, timeout_ms):
+        return talon.configGetParameter(param, ordinal, timeout_ms)
+
+    return read
+
+
+def status_frame_setting(frame):
+    """
+    Get the setting name for the period of a status frame.
+    """
+    return 'status_frame_{}'.format(int(frame))
+
+
+#: The settings the configurator knows about, as ``name: (apply, read)``.
+#: ``apply(talon, value, timeout_ms)`` sends the setting and returns an
+#: error code; ``read(talon, timeout_ms)`` returns its current value, and is
+#: None for settings that can't be read back.
+settings = {
+    'feedback_sensor': (
+        lambda talon, value, timeout_ms:
+            talon.configSelectedFeedbackSensor(value, 0, timeout_ms),
+        _read_parameter(ParamEnum.eFeedbackSensorType)
+    ),
+    'allowable_error': (
+        lambda talon, value, timeout_ms:
+            talon.configAllowableClosedloopError(0, value, timeout_ms),
+        _read_parameter(ParamEnum.eProfileParamSlot_AllowableErr)
+    ),
+    'motion_cruise_velocity': (
+        lambda talon, value, timeout_ms:
+            talon.configMotionCruiseVelocity(value, timeout_ms),
+        _read_parameter(ParamEnum.eMotMag_VelCruise)
+    ),
+    'motion_acceleration': (
+        lambda talon, value, timeout_ms:
+            talon.configMotionAcceleration(value, timeout_ms),
+        _read_parameter(ParamEnum.eMotMag_Accel)
+    ),
+    'quadrature_position': (
+        lambda talon, value, timeout_ms:
+            talon.setQuadraturePosition(value, timeout_ms),
+        None
+    ),
+}
+
+
+def _status_frame_setting(frame):
+    def apply(talon, value, timeout_ms):
+        return talon.setStatusFramePeriod(frame, value, timeout_ms)
+
+    return apply, _read_parameter(ParamEnum.eStatusFramePeriod, int(frame))
+
+
+for _frame in default_periods:
+    settings[status_frame_setting(_frame)] = _status_frame_setting(_frame)
+
+#: A setting that couldn't be applied. ``actual`` is the value read back,
+#: or the error code for settings that can't be read back.
+ConfigFailure = namedtuple('ConfigFailure', [
+    'device', 'setting', 'expected', 'actual',
+])
+
+#: The result of applying (or checking) the configuration.
+#:
+#: - ``settings``: the number of settings.
+#: - ``verified``: settings confirmed by reading them back or by their
+#:   error code.
+#: - ``unverified``: settings that were sent but can't be checked.
+#: - ``retried``: the number of settings that had to be sent again.
+#: - ``failures``: a list of :data:`ConfigFailure`.
+#: - ``elapsed``: time taken, in seconds.
+ConfigReport = namedtuple('ConfigReport', [
+    'settings', 'verified', 'unverified', 'retried', 'failures', 'elapsed',
+])
+
+
+class TalonConfigurator:
+    """
+    Applies and verifies the configuration of every Talon on the robot.
+
+    Parameters:
+        timeout_ms: how long to wait for each read back, and for each
+            setting sent with a timeout.
+        retries: how many times to re-send a setting that didn't stick.
+
+    Attributes:
+        devices: a list of ``(name, talon, {setting: value})`` tuples.
+    """
+
+    def __init__(self, timeout_ms=10, retries=2):
+        self.timeout_ms = timeout_ms
+        self.retries = retries
+        self.devices = []
+        self.__devices_by_talon = {}
+
+    def add(self, talon, config, name=None):
+        """
+        Register settings for a Talon. Settings added for the same Talon
+        more than once are merged.
+
+        Args:
+            talon: a :class:`ctre.talonsrx.TalonSRX` instance.
+            config: a dict mapping setting names (see :data:`settings`) to
+                values.
+            name: a name for the Talon in reports; defaults to
+                ``'Talon <CAN ID>'``.
+        """
+        for setting in config:
+            if setting not in settings:
+                raise ValueError('unknown Talon setting: ' + setting)
+
+        device = self.__devices_by_talon.get(id(talon))
+        if device is None:
+            if name is None:
+                name = 'Talon {}'.format(talon.getDeviceID())
+
+            device = (name, talon, {})
+            self.devices.append(device)
+            self.__devices_by_talon[id(talon)] = device
+
+        device[2].update(config)
+
+    def add_all(self, declarations):
+        """
+        Register a list of ``(talon, config)`` tuples, as returned by the
+        ``get_talon_config()`` methods on each subsystem.
+        """
+        for talon, config in declarations:
+            self.add(talon, config)
+
+    def add_status_frames(self, status_frames):
+        """
+        Add the status frame periods worked out by a
+        :class:`canbus.StatusFrameManager`, so they're verified too.
+        """
+        for talon, periods in status_frames.talons:
+            self.add(talon, {
+                status_frame_setting(frame): period
+                for frame, period in periods.items()
+            })
+
+    def __check(self, talon, setting, value):
+        """
+        Read a setting back.
+
+        Returns:
+            ``(ok, actual)``; ``ok`` is None if the setting can't be read
+            back.
+        """
+        read = settings[setting][1]
+        if read is None:
+            return None, None
+
+        try:
+            actual = read(talon, self.timeout_ms)
+        except (NotImplementedError, AssertionError):
+            # the simulated Talons don't implement reading most parameters
+            # (and choke on some of the ones they do)
+            return None, None
+
+        return float(actual) == float(value), actual
+
+    def __send(self, talon, setting, value, timeout_ms):
+        """
+        Send a setting.
+
+        Returns:
+            ``(ok, error)``; ``ok`` is None unless the setting can't be read
+            back and was sent with a timeout.
+        """
+        apply, read = settings[setting]
+
+        if read is None:
+            timeout_ms = self.timeout_ms
+
+        error = apply(talon, value, timeout_ms)
+        if read is None:
+            return not error, error
+
+        return None, error
+
+    def __run(self, pending, send_first):
+        start = time.perf_counter()
+        verified = unverified = retried = 0
+        failures = []
+
+        for attempt in range(self.retries + 1):
+            if attempt > 0:
+                retried += len(pending)
+
+            # batched pass: send everything before reading anything back
+            results = []
+            for device, setting, value in pending:
+                ok = actual = None
+                if send_first or attempt > 0:
+                    # retries wait for the Talon's answer
+                    ok, actual = self.__send(
+                        device[1], setting, value,
+                        self.timeout_ms if attempt > 0 else 0
+                    )
+                results.append((device, setting, value, ok, actual))
+
+            still_failing = []
+            for device, setting, value, ok, actual in results:
+                if ok is None:
+                    ok, read_back = self.__check(device[1], setting, value)
+                    if ok is not None:
+                        actual = read_back
+
+                if ok is None:
+                    unverified += 1
+                elif ok:
+                    verified += 1
+                else:
+                    still_failing.append((device, setting, value, actual))
+
+            pending = [(d, s, v) for d, s, v, _ in still_failing]
+            if not pending:
+                break
+
+        for device, setting, value, actual in still_failing:
+            failures.append(ConfigFailure(device[0], setting, value, actual))
+
+        return ConfigReport(
+            verified + unverified + len(failures), verified, unverified,
+            retried, failures, time.perf_counter() - start
+        )
+
+    def __all_settings(self):
+        return [
+            (device, setting, value)
+            for device in self.devices
+            for setting, value in sorted(device[2].items())
+        ]
+
+    def apply(self):
+        """
+        Send every registered setting, verify them, and retry the ones that
+        failed.
+
+        Returns:
+            :data:`ConfigReport`
+        """
+        return self.__run(self.__all_settings(), send_first=True)
+
+    def repair(self):
+        """
+        Read every registered setting back, and re-send the ones that are
+        wrong (e.g. because a Talon has reset since :meth:`apply`).
+
+        Returns:
+            :data:`ConfigReport`
+        """
+        return self.__run(self.__all_settings(), send_first=False)
+
+
+def format_report(report):
+    """
+    Format a :data:`ConfigReport` as a list of log lines.
+    """
+    lines = [
+        'Configured {} Talon settings in {:.1f} ms: {} verified, {} '
+        'unverified, {} retried, {} failed'.format(
+            report.settings, report.elapsed * 1000, report.verified,
+            report.unverified, report.retried, len(report.failures)
+        )
+    ]
+
+    for failure in report.failures:
+        lines.append('{} {}: wanted {!r}, got {!r}'.format(*failure))
+
+    return lines
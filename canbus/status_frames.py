@@ -0,0 +1,150 @@
+"""
+Talon SRX status frame management.
+
+Every Talon periodically broadcasts a set of status frames over CAN, whether
+or not anything on the roboRIO reads them. Each subsystem declares which
+feedback signals it actually reads from each of its Talons and how often it
+needs them (see the ``*_status_frames`` attributes on the subsystem classes);
+:class:`StatusFrameManager` turns those declarations into status frame
+periods, applies them, and estimates the resulting CAN bus utilization.
+
+Signals are named by what they carry, rather than by frame:
+
+- **general**: applied motor output, faults and limit switch states.
+- **feedback**: selected sensor position and velocity, output current.
+- **quadrature**: quadrature encoder position and velocity.
+- **analog**: analog input, temperature and bus voltage.
+- **pulse_width**: pulse width encoder position and velocity.
+- **motion_magic**: MotionMagic / motion profile targets.
+- **closed_loop**: closed loop error and PIDF state.
+
+Talons with followers are the exception: followers mirror their leader's
+general frame, so it is always left at its factory default period on them.
+"""
+from ctre.talonsrx import TalonSRX
+
+StatusFrame = TalonSRX.StatusFrameEnhanced
+
+#: Maps signal names to the status frame that carries them.
+signal_frames = {
+    'general': StatusFrame.Status_1_General,
+    'feedback': StatusFrame.Status_2_Feedback0,
+    'quadrature': StatusFrame.Status_3_Quadrature,
+    'analog': StatusFrame.Status_4_AinTempVbat,
+    'pulse_width': StatusFrame.Status_8_PulseWidth,
+    'motion_magic': StatusFrame.Status_10_MotionMagic,
+    'closed_loop': StatusFrame.Status_13_Base_PIDF0,
+}
+
+#: Factory default status frame periods, in ms.
+default_periods = {
+    StatusFrame.Status_1_General: 10,
+    StatusFrame.Status_2_Feedback0: 20,
+    StatusFrame.Status_3_Quadrature: 160,
+    StatusFrame.Status_4_AinTempVbat: 160,
+    StatusFrame.Status_8_PulseWidth: 160,
+    StatusFrame.Status_10_MotionMagic: 160,
+    StatusFrame.Status_13_Base_PIDF0: 160,
+}
+
+#: Period (in ms) for frames that nothing has asked for.
+unused_frame_period = 255
+
+#: Period (in ms) of the control frame the roboRIO sends to each Talon.
+control_frame_period = 10
+
+#: Approximate size of one CAN frame on the wire, in bits. This is an
+#: extended (29-bit ID) frame with an 8-byte payload, plus worst-case bit
+#: stuffing.
+_bits_per_frame = 150
+
+#: CAN bus bit rate, in bits per second.
+_bus_bitrate = 1000000
+
+
+class StatusFrameManager:
+    """
+    Collects status frame declarations for every Talon on the robot,
+    applies them and estimates the resulting CAN bus load.
+
+    Attributes:
+        talons: a list of ``(talon, {frame: period_ms})`` tuples, one per
+            registered Talon. A Talon registered more than once gets the
+            shortest period asked for each frame.
+    """
+
+    def __init__(self):
+        self.talons = []
+
+    def add(self, talon, signal_rates, leader=False):
+        """
+        Register a Talon and the signals that are read from it.
+
+        Args:
+            talon: a :class:`ctre.talonsrx.TalonSRX` instance.
+            signal_rates: a dict mapping signal names (see
+                :data:`signal_frames`) to the maximum acceptable period for
+                that signal, in ms. Signals that are not listed are sent as
+                slowly as possible.
+            leader: whether other Talons follow this one. If so, its general
+                frame is kept at (or below) the default period.
+        """
+        for registered, periods in self.talons:
+            if registered is talon:
+                break
+        else:
+            periods = {
+                frame: unused_frame_period for frame in default_periods
+            }
+            self.talons.append((talon, periods))
+
+        for signal, period in signal_rates.items():
+            frame = signal_frames[signal]
+            periods[frame] = min(periods[frame], int(period))
+
+        if leader:
+            general = signal_frames['general']
+            periods[general] = min(periods[general], default_periods[general])
+
+    def add_all(self, declarations):
+        """
+        Register a list of ``(talon, signal_rates[, leader])`` tuples, as
+        returned by the ``get_status_frame_rates()`` methods on each
+        subsystem.
+        """
+        for declaration in declarations:
+            self.add(*declaration)
+
+    def apply(self, timeout_ms=0):
+        """
+        Send the status frame periods to every registered Talon.
+        """
+        for talon, periods in self.talons:
+            for frame, period in periods.items():
+                talon.setStatusFramePeriod(frame, period, timeout_ms)
+
+    def estimate_bus_load(self):
+        """
+        Estimate the fraction of CAN bus bandwidth used by the registered
+        Talons with the configured status frame periods.
+        """
+        return self.__estimate_load(
+            [periods for _, periods in self.talons]
+        )
+
+    def estimate_default_bus_load(self):
+        """
+        Estimate the fraction of CAN bus bandwidth the registered Talons
+        would use with factory default status frame periods.
+        """
+        return self.__estimate_load(
+            [default_periods for _ in self.talons]
+        )
+
+    def __estimate_load(self, all_periods):
+        frames_per_sec = 0
+        for periods in all_periods:
+            frames_per_sec += 1000 / control_frame_period
+            frames_per_sec += sum(1000 / p for p in periods.values())
+
+        return (frames_per_sec * _bits_per_frame) / _bus_bitrate
@@ -0,0 +1,3 @@
+from .schema import Key, all_keys, keys_by_name  # noqa: F401
+from .snapshot import Snapshot, changed, defaults, get, load, load_table, \
+    reload  # noqa: F401
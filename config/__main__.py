@@ -0,0 +1,45 @@
+"""
+Check saved NetworkTables ini files against the configuration schema:
+
+    python -m config validate FILE...     # unknown keys and bad values
+    python -m config diff OLD NEW         # what changed between two files
+    python -m config defaults FILE        # what a file changes from the
+                                          # schema defaults
+"""
+import sys
+from . import ini, snapshot
+
+
+def main(command=None, *paths):
+    if command == 'validate' and paths:
+        ok = True
+
+        for path in paths:
+            problems = ini.validate(ini.read_ini(path))
+            for problem in problems:
+                print('[config] {}: {}'.format(path, problem))
+
+            ok = ok and not problems
+
+        return 0 if ok else 1
+    elif command == 'diff' and len(paths) == 2:
+        old_path, new_path = paths
+        old = ini.values(ini.read_ini(old_path))
+        new = ini.values(ini.read_ini(new_path))
+    elif command == 'defaults' and len(paths) == 1:
+        path, = paths
+        old = snapshot.values(snapshot.defaults())
+        new = ini.values(ini.read_ini(path))
+
+        # keys the file leaves out are at their defaults anyway
+        old = {name: value for name, value in old.items() if name in new}
+    else:
+        print(__doc__)
+        return 2
+
+    print(ini.format_diff(ini.diff(old, new)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(*sys.argv[1:]))
@@ -0,0 +1,156 @@
+"""
+Checking and comparing saved NetworkTables ini files (such as
+``Swerve_v4_constants.ini``) against the configuration schema.
+
+Only the Preferences entries of an ini file are looked at. Values are
+compared after converting them to the schema type, so ``double 5`` and an
+``int`` key set to 5 count as the same.
+"""
+import difflib
+import re
+from .schema import keys_by_name
+
+_prefix = '/Preferences/'
+
+_entry_pattern = re.compile(r'^(\w+(?: array)?) "((?:[^"\\]|\\.)*)"=(.*)$')
+
+#: The NetworkTables type each schema type is stored as.
+nt_types = {
+    bool: 'boolean',
+    int: 'double',
+    float: 'double',
+    str: 'string',
+}
+
+
+def _unescape(s):
+    return re.sub(r'\\(.)', r'\1', s)
+
+
+def _parse_value(nt_type, text):
+    if nt_type == 'boolean':
+        if text not in ('true', 'false'):
+            raise ValueError('not a boolean: ' + text)
+        return text == 'true'
+    elif nt_type == 'double':
+        return float(text)
+    elif nt_type == 'string':
+        if not (text.startswith('"') and text.endswith('"')):
+            raise ValueError('not a string: ' + text)
+        return _unescape(text[1:-1])
+
+    # (arrays and raw values aren't used by Preferences)
+    return text
+
+
+def read_ini(path):
+    """
+    Read the Preferences entries of an ini file.
+
+    Returns:
+        dict mapping key names to ``(NetworkTables type, value)``.
+    """
+    entries = {}
+
+    with open(path) as fp:
+        for line in fp:
+            match = _entry_pattern.match(line.strip())
+            if match is None:
+                continue
+
+            nt_type, name, text = match.groups()
+            name = _unescape(name)
+            if not name.startswith(_prefix):
+                continue
+
+            try:
+                value = _parse_value(nt_type, text)
+            except ValueError:
+                value = text
+                nt_type = 'invalid ' + nt_type
+
+            entries[name[len(_prefix):]] = (nt_type, value)
+
+    return entries
+
+
+def validate(entries):
+    """
+    Check ini entries against the schema.
+
+    Returns:
+        list of problems, as messages: unknown keys (with the closest key in
+        the schema, since they're usually typos), values of the wrong type
+        and non-integer values for integer keys.
+    """
+    problems = []
+
+    for name, (nt_type, value) in sorted(entries.items()):
+        key = keys_by_name.get(name)
+
+        if key is None:
+            close = difflib.get_close_matches(name, keys_by_name, n=1)
+            problems.append('{!r} is not a known key{}'.format(
+                name, " (did you mean {!r}?)".format(close[0]) if close
+                else ''
+            ))
+        elif nt_type != nt_types[key.type]:
+            problems.append('{!r} is a {}, should be a {}'.format(
+                name, nt_type, nt_types[key.type]
+            ))
+        elif key.type is int and value != int(value):
+            problems.append('{!r} should be a whole number, not {}'.format(
+                name, value
+            ))
+
+    return problems
+
+
+def values(entries):
+    """
+    Get the values of ini entries by key name, converted to the schema type
+    where the key is in the schema and has the right type.
+    """
+    result = {}
+
+    for name, (nt_type, value) in entries.items():
+        key = keys_by_name.get(name)
+        if key is not None and nt_type == nt_types[key.type]:
+            value = key.type(value)
+
+        result[name] = value
+
+    return result
+
+
+def diff(old, new):
+    """
+    Compare two sets of values (see :func:`values`, and
+    :func:`config.snapshot.values` for snapshots).
+
+    Returns:
+        list of ``(name, old value, new value, key)``, sorted by name. A
+        value is None where a side doesn't have the key, and ``key`` is None
+        for keys that aren't in the schema.
+    """
+    return [
+        (name, old.get(name), new.get(name), keys_by_name.get(name))
+        for name in sorted(set(old) | set(new))
+        if old.get(name) != new.get(name)
+    ]
+
+
+def format_diff(changes):
+    lines = []
+
+    for name, old, new, key in changes:
+        if key is None:
+            note = ' (not in schema)'
+        elif key.reconfigure:
+            note = ' (reconfigures Talons)'
+        else:
+            note = ''
+
+        lines.append('{}: {!r} -> {!r}{}'.format(name, old, new, note))
+
+    return '\n'.join(lines)
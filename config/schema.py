@@ -0,0 +1,240 @@
+"""
+Every configuration key the robot code reads from Preferences.
+
+Each key is declared once, with its type, default value and the subsystem
+that uses it. Keys marked ``reconfigure`` are sent on to a Talon when they
+change (sensor phase, inversion, soft limits, MotionMagic settings), so
+changing them costs CAN configuration traffic and they're worth checking
+closely when two robot images differ.
+
+The per-module swerve keys (``'<Module Name>-offset'`` etc.) are declared
+once, and expanded for each module in ``module_defaults`` by
+:func:`module_keys`.
+"""
+import math
+from collections import namedtuple
+
+#: A configuration key.
+#:
+#: - ``name``: the Preferences key.
+#: - ``attr``: the attribute it's loaded into on a
+#:   :class:`config.snapshot.Snapshot` (or, for per-module keys, on the
+#:   module's entry in ``Snapshot.modules``).
+#: - ``type``: one of ``bool``, ``int``, ``float`` or ``str``.
+#: - ``default``: the value used when the key isn't set. ``None`` means the
+#:   setting is optional.
+#: - ``subsystem``: the part of the robot code that reads it.
+#: - ``reconfigure``: whether changing it means reconfiguring a Talon.
+Key = namedtuple('Key', [
+    'name', 'attr', 'type', 'default', 'subsystem', 'reconfigure',
+])
+
+
+def _keys(subsystem, *keys, reconfigure=()):
+    return [
+        Key(name, attr, type(default) if key_type is None else key_type,
+            default, subsystem, attr in reconfigure)
+        for name, attr, default, key_type in (
+            key if len(key) == 4 else key + (None,) for key in keys
+        )
+    ]
+
+
+#: Default per-module swerve configuration (this used to live in
+#: ``swerve/constants.py``).
+module_defaults = {
+    'Back Left': {
+        'Sensor Reverse': True,
+        'Steer Sensor Reverse': True,
+        'Offset': -1643,
+        'Reversed': True,
+        'Steer Reversed': False
+    },
+    'Back Right': {
+        'Sensor Reverse': False,
+        'Steer Sensor Reverse': True,
+        'Offset': 992,
+        'Reversed': False,
+        'Steer Reversed': False
+    },
+    'Front Left': {
+        'Sensor Reverse': True,
+        'Steer Sensor Reverse': True,
+        'Offset': -1035,
+        'Reversed': True,
+        'Steer Reversed': False
+    },
+    'Front Right': {
+        'Sensor Reverse': False,
+        'Steer Sensor Reverse': False,
+        'Offset': 107,
+        'Reversed': False,
+        'Steer Reversed': True
+    },
+}
+
+#: Per-module swerve keys: ``(key suffix, attr, type, module_defaults entry
+#: or fixed default, reconfigure)``.
+_module_key_specs = [
+    ('Max Wheel Speed', 'max_speed', float, 370.0, False),
+    ('Sensor Reverse', 'sensor_reverse', bool, 'Sensor Reverse', True),
+    ('Steer Sensor Reverse', 'steer_sensor_reverse', bool,
+        'Steer Sensor Reverse', True),
+    ('offset', 'offset', float, 'Offset', False),
+    ('reversed', 'reversed', bool, 'Reversed', False),
+    ('steer-reversed', 'steer_reversed', bool, 'Steer Reversed', True),
+    ('Drive kS', 'drive_ks', float, 0.0, False),
+    ('Drive kV', 'drive_kv', float, 0.0, False),
+    ('Drive kA', 'drive_ka', float, 0.0, False),
+]
+
+#: The attributes of each module's configuration.
+module_attrs = [spec[1] for spec in _module_key_specs]
+
+
+def module_keys(module_name):
+    """
+    Get the keys of one swerve module.
+    """
+    keys = []
+
+    for suffix, attr, key_type, default, reconfigure in _module_key_specs:
+        if isinstance(default, str):
+            default = key_type(module_defaults[module_name][default])
+
+        keys.append(Key(
+            module_name + '-' + suffix, attr, key_type, default, 'swerve',
+            reconfigure
+        ))
+
+    return keys
+
+
+#: Default lift preset heights, in encoder ticks above the bottom limit
+#: switch.
+lift_preset_defaults = {
+    'floor': 0,
+    'carry': 1500,
+    'switch': 9000,
+    'scale': 22000,
+}
+
+#: All keys except the per-module swerve ones.
+keys = (
+    _keys(
+        'control',
+        ('Control: Forward-Backward Axis', 'fwd_axis', 1),
+        ('Control: Fwd-Bwd Axis Inverted', 'fwd_inv', True),
+        ('Control: Left-Right Axis', 'str_axis', 0),
+        ('Control: L-R Axis Inverted', 'str_inv', False),
+        ('Control: Rotation Axis', 'rcw_axis', 2),
+        ('Control: Rot Axis Inverted', 'rcw_inv', True),
+        ('Control: Lift Control Axis', 'lift_axis', 2),
+        ('Control: Lift Control Inverted', 'lift_inv', False),
+        ('Control: Lift Control Deadband', 'lift_deadband', 0.25),
+        ('Control: Lift Control Coefficient', 'lift_coeff', 0.5),
+        ('Control: Teleop Speed', 'teleop_speed', 370),
+        ('Control: Turn Sensitivity', 'turn_sensitivity', 0.25),
+        ('Control: Winch Slack Distance', 'winch_slack', 15568),
+        ('Control: Winch Sync Power', 'sync_power', 0.5),
+        ('Control: Claw Control Axis', 'claw_axis', 5),
+        ('Control: Claw Control Inverted', 'claw_inv', False),
+        ('Control: Claw Control Deadband', 'claw_deadband', 0.1),
+        ('Control: Claw Control Coefficient', 'claw_coeff', 1.0),
+        ('Control: Close Claw When Moving Lift',
+            'close_claw_on_lift_motion', False),
+    )
+    + _keys(
+        'swerve',
+        ('Swerve: Disable Velocity Control', 'fallback_to_pct_out', False),
+        ('Turn Min Wheel Speed', 'turn_min_wheel_speed', 25.0),
+        ('Turn Max Wheel Speed', 'turn_max_wheel_speed', 100.0),
+        ('Turn kP', 'turn_kp', 50 / math.pi),
+        ('Turn kD', 'turn_kd', 5.0),
+        ('Turn Error Tolerance', 'turn_tolerance', 1.0),
+        ('Heading Hold kP', 'heading_hold_kp', 1.0),
+        ('Heading Hold kD', 'heading_hold_kd', 0.05),
+        ('Heading Hold Max Output', 'heading_hold_max_output', 0.3),
+        ('Heading Hold Settle Rate', 'heading_hold_settle_rate', 0.3),
+        ('Traction: Slip Threshold', 'slip_threshold', 15.0),
+        ('Traction: Slip Ratio', 'slip_ratio', 0.3),
+        ('Traction: Limit Slipping Modules', 'traction_control', False),
+        ('Traction: Slipping Output Scale', 'slipping_output_scale', 0.7),
+        # Test mode only runs the drive characterization (which spins every
+        # drive motor) when this is turned on; it's turned off again after
+        # each run.
+        ('Test: Drive Characterization', 'drive_characterization', False),
+        ('Test: Characterization Min R^2', 'characterization_min_r_squared',
+            0.9),
+    )
+    + _keys(
+        'imu',
+        ('Reverse Heading Direction', 'reverse_heading', False),
+    )
+    + _keys(
+        'lift',
+        ('Lift: Invert Sensor Phase', 'lift_sensor_phase', True),
+        ('Lift: Upper Limit', 'lift_upper_limit', None, int),
+        ('Lift: Limits Enabled', 'lift_limits_enabled', False),
+        ('Lift: Cruise Velocity', 'lift_cruise_velocity', 1500),
+        ('Lift: Acceleration', 'lift_acceleration', 3000),
+        ('Lift: Position Tolerance', 'lift_position_tolerance', 50),
+        # MotionMagic gains. kF is 1023 / the lift's top speed in ticks /
+        # 100ms; these are starting points, to be tuned on the robot.
+        ('Lift: kP', 'lift_kp', 0.5),
+        ('Lift: kI', 'lift_ki', 0.0),
+        ('Lift: kD', 'lift_kd', 0.0),
+        ('Lift: kF', 'lift_kf', 0.5),
+        *(
+            ('Lift: Preset ' + name.title(), 'lift_preset_' + name, default)
+            for name, default in sorted(lift_preset_defaults.items())
+        ),
+        reconfigure=(
+            'lift_sensor_phase', 'lift_upper_limit', 'lift_limits_enabled',
+            'lift_cruise_velocity', 'lift_acceleration', 'lift_kp', 'lift_ki',
+            'lift_kd', 'lift_kf',
+        )
+    )
+    + _keys(
+        'rd4b lift',
+        # native units per 100ms, and per 100ms per second
+        ('lift cruise velocity', 'rd4b_cruise_velocity', 50.0),
+        ('lift acceleration', 'rd4b_acceleration', 100.0),
+        reconfigure=('rd4b_cruise_velocity', 'rd4b_acceleration')
+    )
+    + _keys(
+        'camera',
+        ('Selected Camera', 'selected_camera', 1),
+        ('Camera Res Width', 'camera_width', 320),
+        ('Camera Res Height', 'camera_height', 200),
+        ('Camera FPS', 'camera_fps', 30),
+        ('Camera Bandwidth Cap', 'camera_bandwidth_cap', 3.0),
+        ('Camera Share Frames', 'camera_share_frames', False),
+    )
+    + _keys(
+        'robot',
+        ('Debug: CAN Accounting', 'can_accounting', False),
+        ('Debug: Profile Loop', 'profile_loop', False),
+        ('Debug: Profiler Mode', 'profiler_mode', 'sampling'),
+        ('Debug: Profiler Ticks', 'profiler_ticks', 250),
+        ('Debug: Profiler Top N', 'profiler_top_n', 10),
+        ('GC: Manual Control', 'gc_manual_control', False),
+        ('GC: Min Idle Time', 'gc_min_idle_time', 5.0),
+    )
+)
+
+#: Every key, including the per-module swerve ones.
+all_keys = keys + [
+    key for module_name in sorted(module_defaults)
+    for key in module_keys(module_name)
+]
+
+#: All keys by Preferences name.
+keys_by_name = {key.name: key for key in all_keys}
+
+
+def subsystem_keys(subsystem):
+    """
+    Get the keys read by one subsystem.
+    """
+    return [key for key in all_keys if key.subsystem == subsystem]
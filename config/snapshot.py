@@ -0,0 +1,153 @@
+"""
+Typed snapshots of the robot configuration.
+
+A :class:`Snapshot` holds the value of every key in :mod:`config.schema`,
+read from Preferences in one pass and converted to the key's type. Reading a
+setting is then just an attribute lookup (``config.get().teleop_speed``),
+and a misspelt setting is an AttributeError instead of a silent fallback to
+a default. Per-module swerve settings are in ``Snapshot.modules``, by module
+name (``config.get().modules['Front Left'].offset``).
+
+The robot keeps one current snapshot, returned by :func:`get`. It is only
+re-read from Preferences by :func:`reload`, which the robot does when it
+reloads its config (see ``Robot.load_config``).
+"""
+from collections import namedtuple
+from .schema import all_keys, keys, module_attrs, module_defaults, \
+    module_keys
+
+Snapshot = namedtuple('Snapshot', [key.attr for key in keys] + ['modules'])
+
+#: One swerve module's settings.
+ModuleConfig = namedtuple('ModuleConfig', module_attrs)
+
+_module_keys = {name: module_keys(name) for name in module_defaults}
+
+_current = None
+
+
+def _convert(key, value):
+    if value is None:
+        return None
+
+    return key.type(value)
+
+
+def read(getters):
+    """
+    Read a snapshot.
+
+    Args:
+        getters (dict): maps each key type to a function taking a key name
+            and a default value, and returning the key's value.
+    """
+    values = [
+        _convert(key, getters[key.type](key.name, key.default))
+        for key in keys
+    ]
+
+    modules = {
+        name: ModuleConfig(*(
+            _convert(key, getters[key.type](key.name, key.default))
+            for key in module_key_list
+        ))
+        for name, module_key_list in _module_keys.items()
+    }
+
+    return Snapshot(*values, modules)
+
+
+def load(prefs=None):
+    """
+    Read a snapshot from Preferences.
+    """
+    if prefs is None:
+        import wpilib
+        prefs = wpilib.Preferences.getInstance()
+
+    return read({
+        bool: prefs.getBoolean,
+        int: prefs.getInt,
+        float: prefs.getFloat,
+        str: prefs.getString,
+    })
+
+
+def load_table(table):
+    """
+    Read a snapshot straight from the Preferences NetworkTable, e.g. in the
+    camera process, which doesn't have WPILib's Preferences.
+    """
+    return read({
+        bool: table.getBoolean,
+        int: table.getNumber,
+        float: table.getNumber,
+        str: table.getString,
+    })
+
+
+def defaults():
+    """
+    Get a snapshot with every key at its default value.
+    """
+    def get_default(name, default):
+        return default
+
+    return read({
+        key_type: get_default for key_type in (bool, int, float, str)
+    })
+
+
+def values(snapshot):
+    """
+    Get a snapshot's values by key name.
+    """
+    result = {key.name: getattr(snapshot, key.attr) for key in keys}
+
+    for name, module_key_list in _module_keys.items():
+        module = snapshot.modules[name]
+        for key in module_key_list:
+            result[key.name] = getattr(module, key.attr)
+
+    return result
+
+
+def changed(old, new):
+    """
+    Find the settings that differ between two snapshots.
+
+    Returns:
+        list of ``(key, old value, new value)``, in schema order.
+    """
+    if old is None:
+        return []
+
+    old_values = values(old)
+    new_values = values(new)
+
+    return [
+        (key, old_values[key.name], new_values[key.name])
+        for key in all_keys
+        if old_values[key.name] != new_values[key.name]
+    ]
+
+
+def get():
+    """
+    Get the current snapshot, loading it from Preferences if there isn't one
+    yet.
+    """
+    if _current is None:
+        return reload()
+
+    return _current
+
+
+def reload(prefs=None):
+    """
+    Re-read the current snapshot from Preferences.
+    """
+    global _current
+
+    _current = load(prefs)
+    return _current
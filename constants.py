@@ -2,57 +2,43 @@
 Contains constants relating to robot configuration; for example, Talon CAN IDs
 and frame dimensions.
 """
-import wpilib
+import config
 
-# Teleop control constants. Can be loaded from Preferences.
-fwdAxis = 1  #: Forward/Backward axis
-strAxis = 0  #: Left/Right axis
-rcwAxis = 2  #: Rotation axis
+_defaults = config.defaults()
 
-liftAxis = 2  #: Lift control axis on throttle
-clawAxis = 5  #: Claw control axis on throttle
+# Teleop control constants. Loaded from Preferences by load_control_config();
+# see config/schema.py for the keys.
+fwdAxis = _defaults.fwd_axis  #: Forward/Backward axis
+strAxis = _defaults.str_axis  #: Left/Right axis
+rcwAxis = _defaults.rcw_axis  #: Rotation axis
 
-fwdInv = True  #: Fwd/Bwd axis inverted
-strInv = True  #: L/R axis inverted
-rcwInv = True  #: Rot axis inverted
-liftInv = False  #: Lift axis inverted
-clawInv = False  #: Claw axis inverted
+liftAxis = _defaults.lift_axis  #: Lift control axis on throttle
+clawAxis = _defaults.claw_axis  #: Claw control axis on throttle
 
-teleop_speed = 370
-turn_sensitivity = 0.25
+fwdInv = _defaults.fwd_inv  #: Fwd/Bwd axis inverted
+strInv = _defaults.str_inv  #: L/R axis inverted
+rcwInv = _defaults.rcw_inv  #: Rot axis inverted
+liftInv = _defaults.lift_inv  #: Lift axis inverted
+clawInv = _defaults.claw_inv  #: Claw axis inverted
 
-lift_deadband = 0.25  # deadband
-lift_coeff = 0.20
+teleop_speed = _defaults.teleop_speed
+turn_sensitivity = _defaults.turn_sensitivity
 
-winch_slack = 15568
-sync_power = 0.5
+lift_deadband = _defaults.lift_deadband  # deadband
+lift_coeff = _defaults.lift_coeff
 
-claw_deadband = 0.1
-claw_coeff = 0.35
-close_claw_on_lift_motion = False
+winch_slack = _defaults.winch_slack
+sync_power = _defaults.sync_power
 
-
-# Wraps the Preferences API to provide an alternative to all of the
-# getInt/getString/getWhatever methods
-def __load_preference(key, backup):
-    prefs = wpilib.Preferences.getInstance()
-
-    getMethod = None
-    if isinstance(backup, str):
-        getMethod = prefs.getString
-    elif isinstance(backup, bool):
-        getMethod = prefs.getBoolean
-    elif isinstance(backup, int):
-        getMethod = lambda k, b: int(prefs.getInt(k, b))  # noqa: E731
-    elif isinstance(backup, float):
-        getMethod = lambda k, b: float(prefs.getFloat(k, b))  # noqa: E731
-
-    return getMethod(key, backup)
+claw_deadband = _defaults.claw_deadband
+claw_coeff = _defaults.claw_coeff
+close_claw_on_lift_motion = _defaults.close_claw_on_lift_motion
 
 
 def load_control_config():
     """
-    Load configurable constants using the Robot Preferences API.
+    Load configurable constants from the current config snapshot (see
+    :func:`config.get`).
     Do not call this at module level (otherwise it might try to access parts of
     WPILib before they have been initialized).
     """
@@ -61,51 +47,34 @@ def load_control_config():
     global winch_slack, close_claw_on_lift_motion, claw_deadband, claw_coeff
     global clawAxis, clawInv, sync_power
 
-    fwdAxis = __load_preference('Control: Forward-Backward Axis', backup=1)
-    fwdInv = __load_preference('Control: Fwd-Bwd Axis Inverted', backup=True)
-
-    strAxis = __load_preference('Control: Left-Right Axis', backup=0)
-    strInv = __load_preference('Control: L-R Axis Inverted', backup=False)
-
-    rcwAxis = __load_preference('Control: Rotation Axis', backup=2)
-    rcwInv = __load_preference('Control: Rot Axis Inverted', backup=True)
+    cfg = config.get()
 
-    liftAxis = __load_preference('Control: Lift Control Axis', backup=2)
-    liftInv = __load_preference('Control: Lift Control Inverted', backup=False)
-    lift_deadband = __load_preference(
-        'Control: Lift Control Deadband', backup=0.25
-    )
-    lift_coeff = __load_preference(
-        'Control: Lift Control Coefficient', backup=0.5
-    )
+    fwdAxis = cfg.fwd_axis
+    fwdInv = cfg.fwd_inv
 
-    teleop_speed = __load_preference('Control: Teleop Speed', backup=370)
-    turn_sensitivity = __load_preference(
-        'Control: Turn Sensitivity', backup=0.25
-    )
+    strAxis = cfg.str_axis
+    strInv = cfg.str_inv
 
-    winch_slack = __load_preference(
-        'Control: Winch Slack Distance', backup=15568
-    )
+    rcwAxis = cfg.rcw_axis
+    rcwInv = cfg.rcw_inv
 
-    sync_power = __load_preference(
-        'Control: Winch Sync Power', backup=0.5
-    )
+    liftAxis = cfg.lift_axis
+    liftInv = cfg.lift_inv
+    lift_deadband = cfg.lift_deadband
+    lift_coeff = cfg.lift_coeff
 
-    clawAxis = __load_preference('Control: Claw Control Axis', backup=5)
-    clawInv = __load_preference('Control: Claw Control Inverted', backup=False)
+    teleop_speed = cfg.teleop_speed
+    turn_sensitivity = cfg.turn_sensitivity
 
-    claw_deadband = __load_preference(
-        'Control: Claw Control Deadband', backup=0.1
-    )
+    winch_slack = cfg.winch_slack
+    sync_power = cfg.sync_power
 
-    claw_coeff = __load_preference(
-        'Control: Claw Control Coefficient', backup=1.0
-    )
+    clawAxis = cfg.claw_axis
+    clawInv = cfg.claw_inv
+    claw_deadband = cfg.claw_deadband
+    claw_coeff = cfg.claw_coeff
 
-    close_claw_on_lift_motion = __load_preference(
-        'Control: Close Claw When Moving Lift', backup=False
-    )
+    close_claw_on_lift_motion = cfg.close_claw_on_lift_motion
 
 
 #: Swerve module hardware configuration.
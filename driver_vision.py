@@ -1,6 +1,11 @@
 from networktables import NetworkTables
+import config
+from config.schema import subsystem_keys
+from vision.frame_ring import FrameRingWriter
+from vision.stream_control import StreamController, StreamMode, \
+    build_ladder, mode_cost
 import cscore
-import time
+import threading
 
 # tuples are (camera_name, camera_device_id)
 cameras = [
@@ -8,54 +13,194 @@ cameras = [
     ('Camera 2', 1),
 ]
 
+# Preferences keys that should wake the camera process up
+settings_keys = frozenset(key.name for key in subsystem_keys('camera'))
+
+# how often to measure the stream (and adjust it) when a bandwidth cap is set
+measure_period = 1.0  # seconds
+
+# cscore only measures what the camera sends, not what the server sends after
+# scaling and recompressing, so the stream rate is estimated from that (the
+# USB cameras send roughly quality 90 jpegs)
+camera_jpeg_quality = 90
+
+# The estimate scales the camera's rate with the same cost model the
+# controller predicts with, so it can't show the controller when the model is
+# wrong about a mode. Only step up with more room to spare than a real
+# measurement would need.
+estimated_rate_headroom = 0.6
+
+
+def apply_mode(cam_server, mode):
+    # Only the server output changes; the cameras keep running at full
+    # resolution and frame rate for anything reading the frame rings.
+    cam_server.setResolution(mode.width, mode.height)
+    cam_server.setFPS(mode.fps)
+    cam_server.setCompression(mode.quality)
+
+
+def estimate_stream_rate(camera_obj, camera_mode, mode):
+    """
+    Estimate the server's output data rate, in bytes per second.
+
+    This isn't a measurement of the stream: only the camera's data rate is
+    measured (which does follow what's in view), and it's scaled to the
+    server's mode with :func:`vision.stream_control.mode_cost`. Switching
+    modes changes the estimate by exactly what the controller predicted.
+    """
+    camera_mode = camera_mode._replace(quality=camera_jpeg_quality)
+    scale = mode_cost(mode) / mode_cost(camera_mode)
+    return camera_obj.getActualDataRate() * min(scale, 1)
+
+
+def capture_frame(writer, sink):
+    """
+    Grab the next frame from a cscore sink straight into a frame ring slot.
+    Returns False if no frame was captured.
+    """
+    slot = writer.begin_write()
+    timestamp, image = sink.grabFrame(slot)
+
+    # grabFrame only fills our buffer in place if the sizes match
+    if timestamp == 0 or image is not slot:
+        writer.abort()
+        return False
+
+    # cscore timestamps are in microseconds, on cscore's clock (not
+    # time.monotonic(); see vision/frame_ring.py)
+    writer.commit(timestamp / 1e6)
+    return True
+
+
+def share_frames(cs_instance, camera_obj, ring_name, camera_settings):
+    """
+    Copy every frame from a camera into a shared-memory frame ring (see
+    vision/frame_ring.py), so other processes can use the camera too.
+    Frames are decoded straight into the ring slots, in BGR order.
+
+    When the camera resolution changes, the ring is replaced with one for
+    the new size; readers see the old one marked as replaced, and reopen.
+    """
+    sink = cs_instance.getVideo(camera=camera_obj)
+    writer = None
+
+    while True:
+        width, height = camera_settings['width'], camera_settings['height']
+        if writer is None:
+            writer = FrameRingWriter(ring_name, width, height)
+        elif (writer.width, writer.height) != (width, height):
+            writer = writer.replace(width, height)
+
+        capture_frame(writer, sink)
+
 
 def main():
     cs_instance = cscore.CameraServer.getInstance()
     cs_instance.enableLogging()
 
+    # needed for getActualFPS() / getActualDataRate()
+    cscore.setTelemetryPeriod(measure_period)
+
     table = NetworkTables.getTable("Preferences")
 
-    res_w = int(table.getNumber('Camera Res Width', 320))
-    res_h = int(table.getNumber('Camera Res Height', 200))
-    fps = int(table.getNumber('Camera FPS', 30))
+    # Sleep until a setting changes instead of polling; the listener runs on
+    # the NetworkTables thread and just wakes the main loop up.
+    settings_changed = threading.Event()
+
+    def on_setting_changed(source, key, value, is_new):
+        if key in settings_keys:
+            settings_changed.set()
+
+    table.addEntryListener(on_setting_changed)
 
     camera_objects = []
+    camera_settings = []
 
     for cam_idx, cam_config in enumerate(cameras):
         name, dev_id = cam_config
 
         camera_obj = cscore.UsbCamera(name=name, dev=dev_id)
-        camera_obj.setResolution(res_w, res_h)
-        camera_obj.setFPS(fps)
-
         camera_objects.append(camera_obj)
+        camera_settings.append({'width': 0, 'height': 0})
         # camera_chooser.addDefault(name, cam_idx)
 
     cam_server = cs_instance.addServer(name='camera_server')
-    current_selected = int(table.getNumber('Selected Camera', 1))
+    current_selected = config.load_table(table).selected_camera
 
     if current_selected >= len(camera_objects):
         current_selected = 1
 
-    cam_server.setSource(camera_objects[current_selected])
+    # Bandwidth cap is in Mbit/s, 0 disables adaptive streaming.
+    controller = StreamController([], 0, headroom=estimated_rate_headroom)
+    camera_mode = None
 
-    while True:
-        selected_camera = int(table.getNumber('Selected Camera', 0))
+    def load_settings(camera_idx):
+        nonlocal camera_mode
 
-        if (
-            selected_camera < len(camera_objects)
-            and selected_camera != current_selected
-        ):
-            res_w = int(table.getNumber('Camera Res Width', 320))
-            res_h = int(table.getNumber('Camera Res Height', 200))
-            fps = int(table.getNumber('Camera FPS', 30))
+        cfg = config.load_table(table)
+        res_w = cfg.camera_width
+        res_h = cfg.camera_height
+        fps = cfg.camera_fps
+        cap_mbps = cfg.camera_bandwidth_cap
 
-            camera_obj = camera_objects[selected_camera]
+        camera_mode = StreamMode(res_w, res_h, fps, camera_jpeg_quality)
+        camera_objects[camera_idx].setResolution(res_w, res_h)
+        camera_objects[camera_idx].setFPS(fps)
+        camera_settings[camera_idx].update(width=res_w, height=res_h)
 
-            camera_obj.setResolution(res_w, res_h)
-            camera_obj.setFPS(fps)
+        controller.ladder = build_ladder(res_w, res_h, fps)
+        controller.set_bandwidth_cap(cap_mbps * 125000)
+        controller.level = min(controller.level, len(controller.ladder) - 1)
 
-            cam_server.setSource(camera_obj)
-            current_selected = selected_camera
+    load_settings(current_selected)
+    apply_mode(cam_server, controller.mode)
+    cam_server.setSource(camera_objects[current_selected])
+
+    # Frame sharing needs OpenCV (for cscore's CvSink), so it's opt-in.
+    if config.load_table(table).camera_share_frames:
+        for cam_idx, camera_obj in enumerate(camera_objects):
+            if camera_settings[cam_idx]['width'] == 0:
+                load_settings(cam_idx)
+
+            threading.Thread(
+                target=share_frames,
+                args=(
+                    cs_instance, camera_obj, 'camera{}'.format(cam_idx),
+                    camera_settings[cam_idx]
+                ),
+                daemon=True
+            ).start()
 
-        time.sleep(0.02)
+    while True:
+        # With no cap there is nothing to measure, so block until a setting
+        # changes.
+        timeout = measure_period if controller.bandwidth_cap else None
+        settings_changed.wait(timeout)
+
+        if settings_changed.is_set():
+            settings_changed.clear()
+
+            selected_camera = config.load_table(table).selected_camera
+
+            if (
+                selected_camera < len(camera_objects)
+                and selected_camera != current_selected
+            ):
+                cam_server.setSource(camera_objects[selected_camera])
+                current_selected = selected_camera
+
+            load_settings(current_selected)
+            apply_mode(cam_server, controller.mode)
+        else:
+            camera_obj = camera_objects[current_selected]
+            new_mode = controller.update(
+                estimate_stream_rate(camera_obj, camera_mode, controller.mode),
+                camera_obj.getActualFPS()
+            )
+
+            if new_mode is not None:
+                apply_mode(cam_server, new_mode)
+                print("[driver_vision] stream at {:.0f} kB/s, switching to {}x{} @ {} fps, quality {}".format(  # noqa: E501
+                    controller.data_rate / 1000, new_mode.width,
+                    new_mode.height, new_mode.fps, new_mode.quality
+                ))
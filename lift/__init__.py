@@ -1,3 +1,4 @@
 from .lift import ManualControlLift  # noqa: F401
 from .rd4b_lift import RD4BLift  # noqa: F401
 from .claw import Claw  # noqa: F401
+from .motion_profile import TrapezoidalProfile  # noqa: F401
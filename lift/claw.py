@@ -36,6 +36,12 @@ class Claw:
     claw_movement_time = 0.5  #: time to allow for the claw to open, in seconds
     claw_adjust_time = 0.25
 
+    #: Status frame periods (in ms) for the claw Talon. Nothing reads any
+    #: feedback from it. See :mod:`canbus.status_frames`.
+    status_frames = {
+        'general': 100,
+    }
+
     def __init__(self, talon_id):
         """
         Create a new instance of the claw subsystem.
@@ -58,6 +64,20 @@ class Claw:
         self.closeAdjustTimer = wpilib.Timer()
         self.movementTimer = wpilib.Timer()
 
+    def get_talon_config(self):
+        """
+        The claw Talon only runs in PercentOutput, so it needs no
+        configuration beyond its status frames.
+        """
+        return []
+
+    def get_status_frame_rates(self):
+        """
+        Get the status frame declarations for the claw Talon, as
+        ``(talon, signal_rates)`` tuples.
+        """
+        return [(self.talon, self.status_frames)]
+
     def set_power(self, power):
         self.state = 'manual_ctrl'
         self.talon.set(TalonSRX.ControlMode.PercentOutput, power)
@@ -1,8 +1,37 @@
+import sys
 import wpilib
+import config
+from config.schema import lift_preset_defaults
 from ctre.talonsrx import TalonSRX
+from sensors.limit_switch import LimitSwitch
+from .motion_profile import TrapezoidalProfile
 
 
 class ManualControlLift:
+    #: Default preset positions, in encoder ticks above the bottom limit
+    #: switch. Each one can be overridden with a "Lift: Preset <Name>" key in
+    #: Preferences.
+    preset_defaults = lift_preset_defaults
+
+    #: Status frame periods (in ms) for the signals we read from each Talon.
+    #: The follower mirrors the main Talon's general frame, so that's left
+    #: at its default. See :mod:`canbus.status_frames`.
+    main_status_frames = {
+        'feedback': 20,  # lift position, used for profiled moves
+    }
+
+    #: The Talon profile slot holding the MotionMagic gains.
+    motion_slot = 0
+
+    #: How long (in seconds) after its profile should have ended a move is
+    #: given up on, if the lift still isn't within tolerance.
+    move_timeout = 0.5
+
+    follower_status_frames = {
+        'general': 100,
+        'feedback': 500,  # follower position, dashboard only
+    }
+
     def __init__(
         self,
         main_lift_id, follower_id,
@@ -14,17 +43,8 @@ class ManualControlLift:
         self.lift_main = TalonSRX(main_lift_id)
         self.lift_follower = TalonSRX(follower_id)
 
-        self.lift_main.configSelectedFeedbackSensor(
-            TalonSRX.FeedbackDevice.PulseWidthEncodedPosition,
-            0, 0
-        )
-        # self.lift_main.setPulseWidthPosition(0, 0)
-
-        self.lift_follower.configSelectedFeedbackSensor(
-            TalonSRX.FeedbackDevice.PulseWidthEncodedPosition,
-            0, 0
-        )
-        # self.lift_follower.setPulseWidthPosition(0, 0)
+        # The feedback sensors are set up by a canbus.TalonConfigurator; see
+        # get_talon_config().
 
         self.lift_follower.set(
             TalonSRX.ControlMode.Follower,
@@ -39,36 +59,134 @@ class ManualControlLift:
         self.lift_stop_timer_started = False
 
         self.lift_zero_found = False
-        self.bottom_limit_switch = wpilib.DigitalInput(bottom_limit_channel)
+        self.zero_capture_time = None
+        self.bottom_limit = LimitSwitch(bottom_limit_channel)
+        self.bottom_limit_switch = self.bottom_limit.switch
         self.start_limit_switch = wpilib.DigitalInput(start_lim_channel)
 
+        # Soft limit state. The soft limit config is only sent to the Talon
+        # when it changes; see _apply_soft_limit().
+        self.soft_limit_requested = True
+        self.soft_limit_applied = None
+        self.soft_limit_threshold = None
+
+        # Sensor phase, as last sent to the Talons.
+        self.sensor_phase = None
+
+        # Profiled (MotionMagic) moves. These are configured by
+        # load_config_values().
+        self.upper_limit = None
+        self.cruise_velocity = None
+        self.acceleration = None
+        self.gains = None
+        self.position_tolerance = 50
+        self.presets = dict(self.preset_defaults)
+
+        self.profile = None
+        self.profile_timer = wpilib.Timer()
+
     def load_config_values(self):
-        prefs = wpilib.Preferences.getInstance()
+        cfg = config.get()
 
-        phase = prefs.getBoolean("Lift: Invert Sensor Phase", True)
-        self.upper_limit = prefs.getInt("Lift: Upper Limit", None)
+        phase = cfg.lift_sensor_phase
+        self.upper_limit = cfg.lift_upper_limit
 
-        self.limits_enabled = prefs.getBoolean("Lift: Limits Enabled", False)
+        self.limits_enabled = cfg.lift_limits_enabled
 
         if self.limits_enabled:
             # Note: positive / forward power to the motors = lift moves down
             # negative / reverse power to the motors = lift moves up
-            if self.upper_limit is not None:
+            if (
+                self.upper_limit is not None
+                and self.upper_limit != self.soft_limit_threshold
+            ):
+                self.soft_limit_threshold = self.upper_limit
                 self.lift_main.configReverseSoftLimitThreshold(
-                    int(self.upper_limit), 0
+                    self.soft_limit_threshold, 0
                 )
-                self.lift_main.configReverseSoftLimitEnable(True, 0)
-            else:
-                self.lift_main.configReverseSoftLimitEnable(False, 0)
 
-        self.lift_main.setSensorPhase(phase)
-        self.lift_follower.setSensorPhase(phase)
+        self._apply_soft_limit()
+
+        if phase != self.sensor_phase:
+            self.lift_main.setSensorPhase(phase)
+            self.lift_follower.setSensorPhase(phase)
+
+            self.sensor_phase = phase
+
+        # Units: ticks / 100ms and ticks / 100ms / sec respectively.
+        cruise_velocity = cfg.lift_cruise_velocity
+        acceleration = cfg.lift_acceleration
+
+        # Only send the MotionMagic config over CAN when it actually changes.
+        if (
+            cruise_velocity != self.cruise_velocity
+            or acceleration != self.acceleration
+        ):
+            self.lift_main.configMotionCruiseVelocity(cruise_velocity, 0)
+            self.lift_main.configMotionAcceleration(acceleration, 0)
+
+            self.cruise_velocity = cruise_velocity
+            self.acceleration = acceleration
+
+        # The closed loop gains for MotionMagic, so moves don't depend on
+        # whatever happens to be in the Talon's flash.
+        gains = (cfg.lift_kp, cfg.lift_ki, cfg.lift_kd, cfg.lift_kf)
+        if gains != self.gains:
+            kp, ki, kd, kf = gains
+            self.lift_main.config_kP(self.motion_slot, kp, 0)
+            self.lift_main.config_kI(self.motion_slot, ki, 0)
+            self.lift_main.config_kD(self.motion_slot, kd, 0)
+            self.lift_main.config_kF(self.motion_slot, kf, 0)
+
+            self.gains = gains
+
+        self.position_tolerance = cfg.lift_position_tolerance
+
+        for name in self.preset_defaults:
+            self.presets[name] = getattr(cfg, 'lift_preset_' + name)
+
+    def get_talon_config(self):
+        """
+        Get the persistent configuration for the lift Talons, as
+        ``(talon, settings)`` tuples. See :mod:`canbus.configurator`.
+        """
+        sensor = TalonSRX.FeedbackDevice.PulseWidthEncodedPosition
+
+        return [
+            (self.lift_main, {'feedback_sensor': sensor}),
+            (self.lift_follower, {'feedback_sensor': sensor}),
+        ]
+
+    def get_status_frame_rates(self):
+        """
+        Get the status frame declarations for the lift Talons, as
+        ``(talon, signal_rates[, leader])`` tuples.
+        """
+        return [
+            (self.lift_main, self.main_status_frames, True),
+            (self.lift_follower, self.follower_status_frames),
+        ]
 
     def set_soft_limit_status(self, status):
-        if self.upper_limit is not None:
+        """
+        Request that the upper soft limit be enabled or disabled.
+
+        The soft limit is only actually enabled once the lift has been zeroed
+        and an upper limit has been configured.
+        """
+        self.soft_limit_requested = status
+        self._apply_soft_limit()
+
+    def _apply_soft_limit(self):
+        status = (
+            self.soft_limit_requested
+            and self.lift_zero_found
+            and self.upper_limit is not None
+        )
+
+        if status != self.soft_limit_applied:
             self.lift_main.configReverseSoftLimitEnable(status, 0)
-        else:
-            self.lift_main.configReverseSoftLimitEnable(False, 0)
+            self.soft_limit_applied = status
 
     def update_smart_dashboard(self):
         wpilib.SmartDashboard.putNumber(
@@ -91,12 +209,136 @@ class ManualControlLift:
             self.lift_zero_found
         )
 
+        if self.zero_capture_time is not None:
+            wpilib.SmartDashboard.putNumber(
+                "Lift Zero Capture Time",
+                self.zero_capture_time
+            )
+
         wpilib.SmartDashboard.putBoolean(
             "Lift Start Position Switch",
             not self.start_limit_switch.get()
         )
 
+        wpilib.SmartDashboard.putBoolean(
+            "Lift Move Finished",
+            self.is_move_finished()
+        )
+
+        if self.profile is not None:
+            expected_pos, _ = self.profile.sample(self.profile_timer.get())
+
+            wpilib.SmartDashboard.putNumber(
+                "Lift Profile Target",
+                self.profile.end
+            )
+
+            wpilib.SmartDashboard.putNumber(
+                "Lift Profile Error",
+                expected_pos - self.lift_main.getSelectedSensorPosition(0)
+            )
+
+    def preset_position(self, name):
+        """
+        Get the target sensor position for a named preset ('floor', 'carry',
+        'switch' or 'scale').
+        """
+        # Note: the lift moves up in the reverse (negative) direction.
+        position = -abs(self.presets[name])
+
+        if self.upper_limit is not None:
+            position = max(position, int(self.upper_limit))
+
+        return position
+
+    def get_move_time(self, position):
+        """
+        Get the time, in seconds, that a profiled move from the current lift
+        position to the given position would take.
+        """
+        return TrapezoidalProfile(
+            self.lift_main.getSelectedSensorPosition(0), position,
+            self.cruise_velocity, self.acceleration
+        ).duration
+
+    def move_to_position(self, position):
+        """
+        Start a profiled move to the given sensor position.
+
+        The profile is run on the Talon using MotionMagic; a matching
+        :class:`~lift.motion_profile.TrapezoidalProfile` is kept here so that
+        we know when the move should finish. Calling this again with the same
+        target while a move is underway does not restart the move.
+
+        Returns:
+            The time in seconds until the lift is expected to arrive, or
+            None if the lift has not been zeroed (or configured) yet.
+        """
+        if not self.lift_zero_found or self.cruise_velocity is None:
+            return None
+
+        if self.profile is not None and self.profile.end == position:
+            return max(self.profile.duration - self.profile_timer.get(), 0)
+
+        self.profile = TrapezoidalProfile(
+            self.lift_main.getSelectedSensorPosition(0), position,
+            self.cruise_velocity, self.acceleration
+        )
+
+        self.profile_timer.reset()
+        self.profile_timer.start()
+
+        self.lift_main.selectProfileSlot(self.motion_slot, 0)
+        self.lift_main.set(TalonSRX.ControlMode.MotionMagic, position)
+
+        return self.profile.duration
+
+    def move_to_preset(self, name):
+        """
+        Start a profiled move to a named preset position.
+        See :meth:`move_to_position`.
+        """
+        return self.move_to_position(self.preset_position(name))
+
+    def is_profile_active(self):
+        """
+        Check whether a profiled move is currently controlling the lift.
+        """
+        return self.profile is not None
+
+    def is_move_finished(self):
+        """
+        Check whether the current profiled move has finished.
+
+        A move is finished once the profile has run to completion and the
+        lift is within tolerance of the target.
+        """
+        if self.profile is None:
+            return True
+
+        if not self.profile.is_finished(self.profile_timer.get()):
+            return False
+
+        return abs(
+            self.lift_main.getSelectedSensorPosition(0) - self.profile.end
+        ) <= self.position_tolerance
+
+    def has_move_timed_out(self):
+        """
+        Check whether the current profiled move should have finished more
+        than :attr:`move_timeout` seconds ago (but the lift still isn't
+        within tolerance of the target).
+        """
+        if self.profile is None:
+            return False
+
+        return self.profile_timer.get() >= (
+            self.profile.duration + self.move_timeout
+        )
+
     def moveTimed(self, time, power):
+        self.profile = None
+
         if not self.timer_started:
             self.timer_started = True
             self.lift_timer.reset()
@@ -107,24 +349,43 @@ class ManualControlLift:
             self.lift_main.set(TalonSRX.ControlMode.PercentOutput, 0)
 
     def setLiftPower(self, power):
+        self.profile = None
+
         if power > 0 and not self.bottom_limit_switch.get():
             self.lift_main.set(TalonSRX.ControlMode.PercentOutput, 0)
         else:
             self.lift_main.set(TalonSRX.ControlMode.PercentOutput, power)
 
     def checkLimitSwitch(self):
-        self.set_soft_limit_status(self.lift_zero_found)
-
-        if not self.bottom_limit_switch.get():
-            self.lift_zero_found = True
+        """
+        Check the bottom limit switch, and zero the lift encoders when it
+        gets pressed.
 
+        The encoders are zeroed exactly once per (debounced) press, rather
+        than on every tick the switch is held down.
+        """
+        if self.bottom_limit.update() == LimitSwitch.PRESSED:
             self.lift_main.setPulseWidthPosition(0, 0)
             self.lift_follower.setPulseWidthPosition(0, 0)
 
             self.lift_main.setQuadraturePosition(0, 0)
             self.lift_follower.setQuadraturePosition(0, 0)
 
+            self.zero_capture_time = self.bottom_limit.press_time
+            if not self.lift_zero_found:
+                self.lift_zero_found = True
+                self._apply_soft_limit()
+
+            print(
+                "[lift] Captured zero at t={:.3f} (press #{})".format(
+                    self.zero_capture_time, self.bottom_limit.press_count
+                ),
+                file=sys.stderr
+            )
+
     def driveToStartingPosition(self):
+        self.profile = None
+
         if self.start_limit_switch.get():
             self.lift_main.set(TalonSRX.ControlMode.PercentOutput, -0.25)
         else:
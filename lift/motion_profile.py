@@ -0,0 +1,111 @@
+"""
+Trapezoidal motion profiles for the lift.
+
+A trapezoidal profile accelerates at a constant rate up to a cruise velocity,
+holds that velocity, then decelerates at the same rate so that it arrives at
+the target with zero velocity. If the move is too short to ever reach the
+cruise velocity, the profile degenerates into a triangle.
+
+All units are Talon native units, so that the same numbers can be handed to
+the Talon's MotionMagic configuration:
+
+- positions are in sensor ticks,
+- velocities are in ticks per 100ms,
+- accelerations are in ticks per 100ms per second.
+"""
+
+import math
+
+
+class TrapezoidalProfile:
+    """
+    A precomputed trapezoidal motion profile between two positions.
+
+    Parameters:
+        start: the starting position, in ticks.
+        end: the target position, in ticks.
+        cruise_velocity: the maximum velocity, in ticks per 100ms.
+        acceleration: the maximum acceleration, in ticks per 100ms per second.
+
+    Attributes:
+        duration: the total time the move will take, in seconds.
+    """
+
+    def __init__(self, start, end, cruise_velocity, acceleration):
+        if cruise_velocity <= 0 or acceleration <= 0:
+            raise ValueError(
+                'Cruise velocity and acceleration must both be positive.'
+            )
+
+        self.start = start
+        self.end = end
+        self.distance = abs(end - start)
+        self.direction = 1 if end >= start else -1
+
+        # Work in ticks/s and ticks/s^2 internally.
+        self.max_velocity = cruise_velocity * 10
+        self.acceleration = acceleration * 10
+
+        self.accel_time = self.max_velocity / self.acceleration
+        accel_distance = 0.5 * self.acceleration * (self.accel_time ** 2)
+
+        if 2 * accel_distance > self.distance:
+            # Triangular profile: we never reach the cruise velocity.
+            self.accel_time = math.sqrt(self.distance / self.acceleration)
+            self.peak_velocity = self.acceleration * self.accel_time
+            self.cruise_time = 0
+        else:
+            self.peak_velocity = self.max_velocity
+            self.cruise_time = (
+                (self.distance - 2 * accel_distance) / self.max_velocity
+            )
+
+        self.accel_distance = 0.5 * self.acceleration * (self.accel_time ** 2)
+        self.duration = (2 * self.accel_time) + self.cruise_time
+
+    def sample(self, t):
+        """
+        Get the expected state of the move at a given time.
+
+        Args:
+            t: the time since the start of the move, in seconds.
+
+        Returns:
+            A ``(position, velocity)`` tuple, where the position is in ticks
+            and the velocity is in ticks per 100ms.
+        """
+        if t <= 0:
+            return self.start, 0
+        elif t >= self.duration:
+            return self.end, 0
+
+        if t < self.accel_time:
+            dist = 0.5 * self.acceleration * (t ** 2)
+            vel = self.acceleration * t
+        elif t < self.accel_time + self.cruise_time:
+            dist = (
+                self.accel_distance
+                + self.peak_velocity * (t - self.accel_time)
+            )
+            vel = self.peak_velocity
+        else:
+            t_remaining = self.duration - t
+            dist = (
+                self.distance
+                - 0.5 * self.acceleration * (t_remaining ** 2)
+            )
+            vel = self.acceleration * t_remaining
+
+        return (
+            self.start + self.direction * dist,
+            self.direction * vel / 10
+        )
+
+    def is_finished(self, t):
+        """
+        Check whether the profile has finished at a given time.
+
+        Args:
+            t: the time since the start of the move, in seconds.
+        """
+        return t >= self.duration
@@ -15,6 +15,9 @@ from ctre.talonsrx import TalonSRX
 import wpilib
 import math
 
+import config
+from .motion_profile import TrapezoidalProfile
+
 
 class RD4BLift:
     """
@@ -53,6 +56,10 @@ class RD4BLift:
 
         self.right_motor.set(TalonSRX.ControlMode.Follower, left_id)
 
+        # the profile for the move currently in progress, if any.
+        self.profile = None
+        self.profile_timer = wpilib.Timer()
+
         # finally, load the configuration values.
         self.load_config_values()
 
@@ -67,6 +74,9 @@ class RD4BLift:
         - "lift potentiometer base angle"
         - "lift limit up"
 
+        The MotionMagic cruise velocity and acceleration come from the config
+        snapshot (see :func:`config.get`).
+
         This function also precalculates values that are used throughout the
         code and sets soft limits for the motor based on encoder values.
         """
@@ -95,19 +105,55 @@ class RD4BLift:
         self.left_motor.configForwardSoftLimitThreshold(self.LIMIT_UP, 0)
         self.left_motor.configReverseSoftLimitThreshold(self.initial_angle, 0)
 
+        # get the velocity and acceleration limits for profiled moves, and
+        # hand them to the talon's MotionMagic controller.
+        cfg = config.get()
+        self.cruise_velocity = cfg.rd4b_cruise_velocity
+        self.acceleration = cfg.rd4b_acceleration
+
+        self.left_motor.configMotionCruiseVelocity(
+            int(self.cruise_velocity), 0
+        )
+        self.left_motor.configMotionAcceleration(int(self.acceleration), 0)
+
+    def move_to(self, native_units):
+        """
+        Run a velocity and acceleration limited move to the given position.
+
+        The move itself is carried out by the talon (using MotionMagic); we
+        keep a copy of the profile so that we know when it should finish.
+
+        Args:
+            native_units: the potentiometer position to move to.
+
+        Returns:
+            The time, in seconds, the move is expected to take.
+        """
+        self.profile = TrapezoidalProfile(
+            self.left_motor.getSelectedSensorPosition(0), native_units,
+            self.cruise_velocity, self.acceleration
+        )
+
+        self.profile_timer.reset()
+        self.profile_timer.start()
+
+        self.left_motor.set(TalonSRX.ControlMode.MotionMagic, native_units)
+
+        return self.profile.duration
+
     def fully_extend(self):
         """
         Fully extend the RD4B upward.
         This function runs the motor to the LIMIT_UP position.
         """
-        self.left_motor.set(TalonSRX.ControlMode.Position, self.LIMIT_UP)
+        return self.move_to(self.LIMIT_UP)
 
     def fully_retract(self):
         """
         Fully retract the RD4B to the lowest position.
         This function runs the motor to the initial_angle position.
         """
-        self.left_motor.set(TalonSRX.ControlMode.Position, self.initial_angle)
+        return self.move_to(self.initial_angle)
 
     def set_height(self, inches):
         """
@@ -124,6 +170,9 @@ class RD4BLift:
 
         Args:
             inches: the height in inches to move the RD4B to.
+
+        Returns:
+            The time, in seconds, the move is expected to take.
         """
         # calculate the final angle as per the equation given above.
         final_angle_radians = math.asin(
@@ -137,7 +186,7 @@ class RD4BLift:
 
         # set the left motor to run to this position (the right motor will
         # follow it)
-        self.left_motor.set(TalonSRX.ControlMode.Position, native_units)
+        return self.move_to(native_units)
 
     def getHeight(self):
         """
@@ -172,13 +221,19 @@ class RD4BLift:
         """
         Check if the RD4B is in motion.
 
-        This function gets the closed loop error, which will be very small if
-        the motor is not currently in motion.
+        The movement is finished once the motion profile has run to
+        completion and the closed loop error is very small.
 
         Returns:
             True if the RD4B is not in motion
             False if the RD4B is currently still in motion.
         """
+        if (
+            self.profile is not None
+            and not self.profile.is_finished(self.profile_timer.get())
+        ):
+            return False
+
         return self.left_motor.getClosedLoopError(0) < 10
 
     def stop(self):
@@ -190,4 +245,5 @@ class RD4BLift:
         """
 
         # change the control mode to percent vbus and then set the speed to 0.
+        self.profile = None
         self.left_motor.set(TalonSRX.ControlMode.PercentVBus, 0)
@@ -1,51 +1,295 @@
+"""
+Simulation model for the swerve drive.
+
+All eight swerve Talons are simulated together with NumPy arrays:
+
+- each Talon's closed loop (Position / Velocity) is emulated with the gains
+  configured on it, falling back to default gains where the robot code
+  leaves them to the Talon's flash (as it does for the steer loops, and for
+  everything but kF in the drive velocity loop)
+- the motors are first-order systems: velocity approaches
+  ``output * free speed`` with a time constant
+- steer angles are integrated into the analog sensor positions, and wheel
+  travel into the drive quadrature encoders
+- the chassis motion is the least-squares fit of the module velocities, and
+  is fed to the simulated navX through pyfrc's device gyro support
+
+Wheel slip and sensor errors can be added for testing robustness (see
+``PhysicsEngine.wheel_slip`` and ``TalonGroup.sensor_scale`` /
+``sensor_noise``); by default there are none.
+
+Sensor phase and motor inversion are assumed to be set up correctly, i.e.
+positive output always moves the selected sensor positive.
+"""
 import math
+import numpy as np
 import constants
-from pyfrc.physics.drivetrains import four_motor_swerve_drivetrain
+from swerve.constants import swerve_defaults
+from swerve.odometry import drive_ticks_per_inch
+
+# Talon control modes (see ctre.ControlMode)
+_percent_output = 0
+_position = 1
+_velocity = 2
+
+# The closed loops are run at this rate, like the real Talons do.
+_control_dt = 0.001
+
+#: Free speed (ticks / 100ms), time constant (s) and feedback sensor of each
+#: motor type.
+motor_types = {
+    'steer': (300, 0.04, 'analog'),  # 1024 ticks / rev of the analog sensor
+    'drive': (470, 0.12, 'quad'),
+}
+
+#: Gains standing in for the Talons' flash: used for each gain the robot code
+#: leaves at zero in the selected slot. Order: (kP, kI, kD, kF).
+default_gains = {
+    'steer': {_position: (12.0, 0.0, 0.0, 0.0)},
+    'drive': {
+        _position: (1.0, 0.0, 0.0, 0.0),
+        _velocity: (1.0, 0.0, 0.0, 1023 / motor_types['drive'][0]),
+    },
+}
+
+#: navX hal_data key (navX MXP on the SPI MXP port)
+navx_angle_key = 'navxmxp_spi_4_angle'
+
+
+class TalonGroup(object):
+    """
+    A set of Talons simulated together.
+
+    Args:
+        ids: the Talons' CAN IDs.
+        kinds: each Talon's motor type (a key of ``motor_types``).
+    """
+
+    def __init__(self, ids, kinds):
+        self.ids = list(ids)
+        self.kinds = list(kinds)
+
+        self.free_speed = np.array([motor_types[k][0] for k in self.kinds])
+        self.tau = np.array([motor_types[k][1] for k in self.kinds])
+        self.sensors = [motor_types[k][2] for k in self.kinds]
+
+        n = len(self.ids)
+        self.position = np.zeros(n)  # ticks
+        self.velocity = np.zeros(n)  # ticks / 100ms
+        self.prev_error = np.zeros(n)
+        self.i_accum = np.zeros(n)
+
+        #: Sensor errors: each reading is ``position * sensor_scale`` plus
+        #: gaussian noise with a standard deviation of ``sensor_noise``
+        #: ticks (drawn from ``rng``).
+        self.sensor_scale = np.ones(n)
+        self.sensor_noise = np.zeros(n)
+        self.rng = np.random.RandomState(0)
+
+        self.written = [None] * n
+
+    def read_sensors(self, can):
+        # pick up sensor resets / changes made by the robot code since the
+        # last update (and keep our fractional positions otherwise)
+        for n, talon_id in enumerate(self.ids):
+            value = can[talon_id][self.sensors[n] + '_position']
+            if value != self.written[n]:
+                self.position[n] = value / self.sensor_scale[n]
+
+    def read_commands(self, can):
+        """
+        Get each Talon's control mode, setpoint and gains as arrays.
+        """
+        modes = np.array([can[i]['control_mode'] for i in self.ids])
+        targets = np.zeros(len(self.ids))
+        gains = np.zeros((4, len(self.ids)))
+
+        for n, talon_id in enumerate(self.ids):
+            data = can[talon_id]
+            mode = modes[n]
+
+            if mode == _percent_output:
+                targets[n] = data['value']
+                continue
+            elif mode not in (_position, _velocity):
+                continue
+
+            targets[n] = data['pid0_target']
+
+            slot = data['profile_slot_select']
+            configured = tuple(
+                data['profile%d_%s' % (slot, gain)]
+                for gain in ('p', 'i', 'd', 'f')
+            )
+
+            flash = default_gains[self.kinds[n]].get(mode, (0, 0, 0, 0))
+            gains[:, n] = [
+                gain if gain else default
+                for gain, default in zip(configured, flash)
+            ]
+
+        return modes, targets, gains
+
+    def step(self, modes, targets, gains, dt):
+        """
+        Advance the closed loops and motors by ``dt`` seconds, in 1ms steps.
+        """
+        kP, kI, kD, kF = gains / 1023
+        is_velocity = modes == _velocity
+        is_closed_loop = (modes == _position) | is_velocity
+
+        # PercentOutput is just a constant "feedforward"
+        feedforward = np.where(is_closed_loop, kF * targets, 0)
+        feedforward[modes == _percent_output] = \
+            targets[modes == _percent_output]
 
-# Conversion factor between talon native velocity units and ft/s
-_talon_vel_conv = (10 * 4 * math.pi) / (80 * 6.67 * 12)
-_max_speed = 370  # in talon native units
+        kP = np.where(is_closed_loop, kP, 0)
+        kI = np.where(is_closed_loop, kI, 0)
+        kD = np.where(is_closed_loop, kD, 0)
+        use_i, use_d = kI.any(), kD.any()
 
+        # (the arrays here are tiny, so the number of NumPy calls per
+        # iteration is what matters)
+        alpha = _control_dt / self.tau
+        free_speed = self.free_speed * alpha
+        position, velocity = self.position, self.velocity
+        sensor_scale = self.sensor_scale
 
-def talon_target(hal_data, talon_id):
-    hal_target = hal_data['CAN'][talon_id]['value']
-    return hal_target
+        for _ in range(max(int(round(dt / _control_dt)), 1)):
+            measured = np.where(is_velocity, velocity, position)
+            error = targets - (measured * sensor_scale)
+            output = feedforward + (kP * error)
 
+            if use_i:
+                self.i_accum += error
+                output += kI * self.i_accum
 
-def copy_talon_analog_pos(hal_data, talon_id):
-    hal_data['CAN'][talon_id]['analog_in_position'] = hal_data['CAN'][talon_id]['value']  # noqa:E501
+            if use_d:
+                output += kD * (error - self.prev_error)
+                self.prev_error = error
+
+            np.maximum(np.minimum(output, 1, out=output), -1, out=output)
+
+            # first-order motor response
+            velocity += (output * free_speed) - (velocity * alpha)
+            position += velocity * (10 * _control_dt)
+
+        # closed loop state isn't kept across mode changes
+        self.i_accum[~is_closed_loop] = 0
+
+    def write_sensors(self, can):
+        position = self.position * self.sensor_scale
+        velocity = self.velocity * self.sensor_scale
+
+        if self.sensor_noise.any():
+            position = position + self.rng.normal(0, self.sensor_noise)
+
+        for n, talon_id in enumerate(self.ids):
+            data = can[talon_id]
+            sensor = self.sensors[n]
+
+            self.written[n] = int(round(position[n]))
+            data[sensor + '_position'] = self.written[n]
+            data[sensor + '_velocity'] = int(round(velocity[n]))
+
+            if sensor == 'analog':
+                data['analog_in'] = self.written[n]
 
 
 class PhysicsEngine(object):
     def __init__(self, physics_controller):
         self.physics_controller = physics_controller
+        self.physics_controller.add_device_gyro_channel(navx_angle_key)
 
-    def update_sim(self, hal_data, now, tm_diff):
-        module_speeds = [
-            talon_target(hal_data, constants.swerve_config[1][2]) / _max_speed,
-            talon_target(hal_data, constants.swerve_config[0][2]) / _max_speed,
-            talon_target(hal_data, constants.swerve_config[3][2]) / _max_speed,
-            talon_target(hal_data, constants.swerve_config[2][2]) / _max_speed
-        ]
-
-        module_angles = [
-            talon_target(hal_data, constants.swerve_config[1][1]) * 180 / 512,
-            talon_target(hal_data, constants.swerve_config[0][1]) * 180 / 512,
-            talon_target(hal_data, constants.swerve_config[3][1]) * 180 / 512,
-            talon_target(hal_data, constants.swerve_config[2][1]) * 180 / 512,
-        ]
-
-        vx, vy, vw = four_motor_swerve_drivetrain(
-            *module_speeds,
-            *module_angles,
-            constants.chassis_length / 12,
-            constants.chassis_width / 12,
-            _max_speed * _talon_vel_conv
+        names = [config[0] for config in constants.swerve_config]
+        steer_ids = [config[1] for config in constants.swerve_config]
+        drive_ids = [config[2] for config in constants.swerve_config]
+
+        # one group, so all eight closed loops are stepped together
+        self.talons = TalonGroup(
+            steer_ids + drive_ids,
+            (['steer'] * len(steer_ids)) + (['drive'] * len(drive_ids))
         )
+        self.steer = slice(0, len(steer_ids))
+        self.drive = slice(len(steer_ids), len(self.talons.ids))
+
+        self.steer_offsets = np.array([
+            swerve_defaults[name]['Offset'] for name in names
+        ])
+        self.drive_signs = np.array([
+            -1 if swerve_defaults[name]['Reversed'] else 1 for name in names
+        ])
+
+        # module positions relative to the chassis centre, in inches
+        self.module_forward = np.array([
+            (1 if name.startswith('Front') else -1) for name in names
+        ]) * (constants.chassis_length / 2)
+        self.module_right = np.array([
+            (1 if name.endswith('Right') else -1) for name in names
+        ]) * (constants.chassis_width / 2)
+
+        #: Fraction of each wheel's speed lost to slipping on the carpet.
+        self.wheel_slip = np.zeros(len(names))
+
+        self.started = False
 
-        self.physics_controller.vector_drive(vx, vy, vw, tm_diff)
+    def start(self, can):
+        # start with all modules facing forwards
+        self.talons.position[self.steer] = self.steer_offsets
+        self.talons.write_sensors(can)
+        self.started = True
 
-        copy_talon_analog_pos(hal_data, constants.swerve_config[0][1])
-        copy_talon_analog_pos(hal_data, constants.swerve_config[1][1])
-        copy_talon_analog_pos(hal_data, constants.swerve_config[2][1])
-        copy_talon_analog_pos(hal_data, constants.swerve_config[3][1])
+    def get_module_states(self):
+        """
+        Get each module's wheel angle (radians, relative to the chassis) and
+        ground speed (inches / second).
+        """
+        angles = (
+            self.talons.position[self.steer] - self.steer_offsets
+        ) * (math.pi / 512)
+        speeds = (
+            self.talons.velocity[self.drive] * 10 / drive_ticks_per_inch
+        ) * self.drive_signs
+
+        return angles, speeds
+
+    def get_chassis_velocity(self):
+        """
+        Fit a chassis velocity to the module velocities.
+
+        Returns:
+            ``(forward, right, rotation)``: in inches / second, inches /
+            second and radians / second (clockwise).
+        """
+        angles, speeds = self.get_module_states()
+        speeds = speeds * (1 - self.wheel_slip)
+        v_forward = speeds * np.cos(angles)
+        v_right = speeds * np.sin(angles)
+
+        rotation = np.sum(
+            (self.module_forward * v_right) - (self.module_right * v_forward)
+        ) / np.sum(self.module_forward ** 2 + self.module_right ** 2)
+
+        return np.mean(v_forward), np.mean(v_right), rotation
+
+    def update_sim(self, hal_data, now, tm_diff):
+        can = hal_data['CAN']
+
+        # the Talons only show up once the robot code has created them
+        if not self.started:
+            if not all(talon_id in can for talon_id in self.talons.ids):
+                return
+
+            self.start(can)
+
+        self.talons.read_sensors(can)
+        modes, targets, gains = self.talons.read_commands(can)
+        self.talons.step(modes, targets, gains, tm_diff)
+        self.talons.write_sensors(can)
+
+        forward, right, rotation = self.get_chassis_velocity()
+
+        # pyfrc wants ft/s, with x to the right and y forwards
+        self.physics_controller.vector_drive(
+            right / 12, forward / 12, rotation, tm_diff
+        )
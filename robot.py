@@ -1,12 +1,17 @@
 import wpilib
+import config
 import constants
 import swerve
 import lift
 import winch
+import canbus
+import runtime
 import sys
 from teleop import Teleop
 from autonomous.baseline_simple import Autonomous
 from sensors.imu import IMU
+from sensors.pose_estimator import PoseEstimator
+from sensors.pose_history import PoseHistory
 
 
 def log(src, msg):
@@ -35,6 +40,7 @@ def log_exception(src, locstr):
 
 class Robot(wpilib.IterativeRobot):
     def robotInit(self):
+        self.config = config.reload()
         constants.load_control_config()
 
         wpilib.CameraServer.launch('driver_vision.py:main')
@@ -54,7 +60,6 @@ class Robot(wpilib.IterativeRobot):
             constants.chassis_width,
             constants.swerve_config
         )
-        self.drivetrain.load_config_values()
 
         self.lift = lift.ManualControlLift(
             constants.lift_ids['left'],
@@ -75,17 +80,148 @@ class Robot(wpilib.IterativeRobot):
 
         self.imu = IMU(wpilib.SPI.Port.kMXP)
 
+        self.heading = swerve.HeadingController(self.drivetrain, self.imu)
+        self.drivetrain.heading_controller = self.heading
+
+        self.odometry = swerve.SwerveOdometry(self.drivetrain, self.imu)
+        # (vision landmark sightings aren't fed into this yet; see
+        # sensors.pose_estimator)
+        self.pose_estimator = PoseEstimator()
+        self.pose_estimator.reset(self.odometry.pose)
+        self.drive_velocity = swerve.VelocityEstimator(self.drivetrain)
+
+        self.traction = swerve.TractionMonitor(
+            self.drivetrain, self.drive_velocity
+        )
+        self.drivetrain.traction = self.traction
+        self.odometry.traction = self.traction
+        self.pose_history = PoseHistory()
+
+        # Configure every Talon in one batched, verified pass.
+        self.status_frames = canbus.StatusFrameManager()
+        self.talon_config = canbus.TalonConfigurator()
+        for subsystem in [self.drivetrain, self.lift, self.claw, self.winch]:
+            self.status_frames.add_all(subsystem.get_status_frame_rates())
+            self.talon_config.add_all(subsystem.get_talon_config())
+
+        self.talon_config.add_status_frames(self.status_frames)
+        self.log_talon_config(self.talon_config.apply())
+
+        # Set when the roboRIO reports a brownout, so the Talon
+        # configuration is checked again at the next disable.
+        self.browned_out = False
+
+        can_load = self.status_frames.estimate_bus_load()
+        log('robot-init', 'Estimated CAN bus load: {:.1%} ({:.1%} with default status frame rates)'.format(  # noqa: E501
+            can_load, self.status_frames.estimate_default_bus_load()
+        ))
+
+        wpilib.SmartDashboard.putNumber('CAN Bus Load Estimate', can_load)
+
+        # Counts every Talon call when 'Debug: CAN Accounting' is turned on
+        # (before the robot code starts). It's off by default, even in
+        # simulation, since it costs a stack frame lookup on every call.
+        self.can_stats = canbus.CANAccounting(
+            enabled=self.config.can_accounting
+        )
+
+        for module in self.drivetrain.modules:
+            self.can_stats.instrument('swerve', module)
+
+        self.can_stats.instrument('lift', self.lift)
+        self.can_stats.instrument('claw', self.claw)
+        self.can_stats.instrument('winch', self.winch)
+
+        # Profiles the periodic methods when 'Debug: Profile Loop' is turned
+        # on.
+        self.profiler = runtime.LoopProfiler(
+            self, on_finish=self.log_profile
+        )
+
         self.sd_update_timer = wpilib.Timer()
         self.sd_update_timer.reset()
         self.sd_update_timer.start()
 
+        # Last, so that everything created above gets frozen if GC manual
+        # control is on.
+        self.gc_control = runtime.GCManager()
+
+    def log_talon_config(self, report):
+        for line in canbus.configurator.format_report(report):
+            log('talon-config', line)
+
+    def log_profile(self, profiler):
+        log('profiler', 'Profiled {} ticks ({}), written to {}'.format(
+            profiler.ticks, profiler.mode, profiler.output_path
+        ))
+
+        for line in profiler.format_top():
+            log('profiler', line)
+
+    def load_config(self):
+        """
+        Re-read the config from Preferences (in one pass) and apply it.
+        """
+        snapshot = config.reload()
+
+        for key, old, new in config.changed(self.config, snapshot):
+            log('config', '{} changed from {!r} to {!r}{}'.format(
+                key.name, old, new,
+                ' (reconfiguring Talons)' if key.reconfigure else ''
+            ))
+
+        self.config = snapshot
+
+        constants.load_control_config()
+        self.drivetrain.load_config_values()
+        self.lift.load_config_values()
+        self.profiler.load_config_values()
+        self.gc_control.load_config_values()
+
+    def update_pose(self):
+        now = wpilib.Timer.getFPGATimestamp()
+        pose = self.odometry.update()
+        self.pose_estimator.predict(
+            now, *self.odometry.displacement, pose.heading
+        )
+        self.pose_history.add(now, self.pose_estimator.get_pose())
+        self.drive_velocity.update(self.odometry.last_positions, now)
+        self.traction.update(self.odometry.last_angles, pose.heading, now)
+
+    def check_brownout(self):
+        if wpilib.RobotController.isBrownedOut():
+            self.browned_out = True
+
     def disabledInit(self):
-        pass
+        # Talons lose their configuration if they brown out, so check it
+        # (and fix it) after a brownout. Reading every setting back blocks
+        # for up to a second, so it isn't done on every disable.
+        if self.browned_out:
+            self.browned_out = False
+            try:
+                log('disabled', 'Browned out while enabled, checking Talon configuration')  # noqa: E501
+                self.log_talon_config(self.talon_config.repair())
+            except:  # noqa: E772
+                log_exception('disabled', 'when checking Talon configuration')
+
+        # Teleop is the last part of a match, so dump the CAN stats once it
+        # ends.
+        if 'teleop' in self.can_stats.modes:
+            try:
+                log('disabled', 'CAN transaction statistics for this match:')
+                self.can_stats.dump(sys.stderr)
+                self.can_stats.reset()
+            except:  # noqa: E772
+                log_exception('disabled', 'when dumping CAN statistics')
+
+            for line in self.gc_control.format_stats():
+                log('gc', line)
 
     def disabledPeriodic(self):
+        self.gc_control.begin_tick()
+
         try:
-            self.lift.load_config_values()
-            self.drivetrain.load_config_values()
+            self.load_config()
         except:  # noqa: E772
             log_exception('disabled', 'when loading config')
 
@@ -94,6 +230,8 @@ class Robot(wpilib.IterativeRobot):
             self.imu.update_smart_dashboard()
             self.lift.update_smart_dashboard()
             self.winch.update_smart_dashboard()
+            self.can_stats.update_smart_dashboard()
+            self.gc_control.update_smart_dashboard()
 
             wpilib.SmartDashboard.putNumber(
                 "Throttle Pos", self.throttle.getRawAxis(constants.liftAxis)
@@ -106,10 +244,12 @@ class Robot(wpilib.IterativeRobot):
         except:  # noqa: E772
             log_exception('disabled', 'when checking lift limit switch')
 
+        self.can_stats.end_tick('disabled')
+        self.gc_control.end_tick('disabled')
+
     def autonomousInit(self):
         try:
-            self.drivetrain.load_config_values()
-            self.lift.load_config_values()
+            self.load_config()
         except:  # noqa: E772
             log_exception('auto-init', 'when loading config')
 
@@ -133,14 +273,41 @@ class Robot(wpilib.IterativeRobot):
         except:  # noqa: E772
             log_exception('auto-init', 'when checking lift limit switch')
 
+        try:
+            self.odometry.reset()
+            self.pose_estimator.reset(
+                self.odometry.pose, wpilib.Timer.getFPGATimestamp()
+            )
+            self.pose_history.clear()
+            self.drive_velocity.reset()
+            self.traction.reset()
+        except:  # noqa: E772
+            log_exception('auto-init', 'when resetting odometry')
+
     def autonomousPeriodic(self):
+        self.gc_control.begin_tick()
+
+        try:
+            self.update_pose()
+        except:  # noqa: E772
+            log_exception('auto', 'when updating odometry')
+
+        try:
+            self.check_brownout()
+        except:  # noqa: E772
+            log_exception('auto', 'when checking for brownouts')
+
         try:
             if self.sd_update_timer.hasPeriodPassed(0.5):
                 self.auto.update_smart_dashboard()
                 self.imu.update_smart_dashboard()
                 self.drivetrain.update_smart_dashboard()
+                self.drive_velocity.update_smart_dashboard()
+                self.traction.update_smart_dashboard()
                 self.lift.update_smart_dashboard()
                 self.winch.update_smart_dashboard()
+                self.can_stats.update_smart_dashboard()
+                self.gc_control.update_smart_dashboard()
         except:  # noqa: E772
             log_exception('auto', 'when updating SmartDashboard')
 
@@ -160,6 +327,9 @@ class Robot(wpilib.IterativeRobot):
         except:  # noqa: E772
             log_exception('auto', 'when checking lift limit switch')
 
+        self.can_stats.end_tick('autonomous')
+        self.gc_control.end_tick('autonomous')
+
     def teleopInit(self):
         try:
             self.teleop = Teleop(self)
@@ -167,9 +337,7 @@ class Robot(wpilib.IterativeRobot):
             log_exception('teleop-init', 'in Teleop constructor')
 
         try:
-            self.drivetrain.load_config_values()
-            self.lift.load_config_values()
-            constants.load_control_config()
+            self.load_config()
         except:  # noqa: E772
             log_exception('teleop-init', 'when loading config')
 
@@ -179,6 +347,18 @@ class Robot(wpilib.IterativeRobot):
             log_exception('teleop-init', 'when checking lift limit switch')
 
     def teleopPeriodic(self):
+        self.gc_control.begin_tick()
+
+        try:
+            self.update_pose()
+        except:  # noqa: E772
+            log_exception('teleop', 'when updating odometry')
+
+        try:
+            self.check_brownout()
+        except:  # noqa: E772
+            log_exception('teleop', 'when checking for brownouts')
+
         try:
             self.teleop.drive()
         except:  # noqa: E772
@@ -215,21 +395,91 @@ class Robot(wpilib.IterativeRobot):
 
         if self.sd_update_timer.hasPeriodPassed(0.5):
             try:
-                constants.load_control_config()
-                self.drivetrain.load_config_values()
-                self.lift.load_config_values()
+                self.load_config()
             except:  # noqa: E772
                 log_exception('teleop', 'when loading config')
 
             try:
                 self.drivetrain.update_smart_dashboard()
+                self.drive_velocity.update_smart_dashboard()
+                self.traction.update_smart_dashboard()
                 self.teleop.update_smart_dashboard()
                 self.imu.update_smart_dashboard()
                 self.lift.update_smart_dashboard()
                 self.winch.update_smart_dashboard()
+                self.can_stats.update_smart_dashboard()
+                self.gc_control.update_smart_dashboard()
             except:  # noqa: E772
                 log_exception('teleop', 'when updating SmartDashboard')
 
+        self.can_stats.end_tick('teleop')
+        self.gc_control.end_tick('teleop')
+
+    def testInit(self):
+        self.characterization = None
+
+        try:
+            self.load_config()
+        except:  # noqa: E772
+            log_exception('test-init', 'when loading config')
+
+        # Characterizing the drive motors' feedforward spins every drive
+        # motor, so it only runs when asked for. Put the robot on blocks
+        # first!
+        if not self.config.drive_characterization:
+            log('test-init', "Not characterizing the drive (turn on 'Test: Drive Characterization' first)")  # noqa: E501
+            return
+
+        try:
+            log('test-init', 'Starting drive characterization...')
+            self.characterization = swerve.DriveCharacterization(
+                self.drivetrain
+            )
+        except:  # noqa: E772
+            log_exception('test-init', 'in DriveCharacterization constructor')
+
+    def testPeriodic(self):
+        self.gc_control.begin_tick()
+
+        try:
+            if (
+                self.characterization is not None
+                and not self.characterization.finished
+                and self.characterization.periodic()
+            ):
+                self.finish_characterization()
+        except:  # noqa: E772
+            log_exception('test', 'in drive characterization')
+            self.drivetrain.immediate_stop()
+            self.characterization.finished = True
+
+        self.gc_control.end_tick('test')
+
+    def finish_characterization(self):
+        # so that enabling Test mode again doesn't start another run
+        wpilib.Preferences.getInstance().putBoolean(
+            'Test: Drive Characterization', False
+        )
+
+        results = self.characterization.results
+        rejected = self.characterization.save(
+            self.config.characterization_min_r_squared
+        )
+
+        for module in self.drivetrain.modules:
+            result = results.get(module.name)
+            if result is None:
+                log('test', '{}: not enough data to fit'.format(module.name))
+                continue
+
+            log('test', '{}: kS={:.4f} kV={:.6f} kA={:.6f} (r^2={:.3f}, {} samples){}'.format(  # noqa: E501
+                module.name, *result,
+                ' - not saved: ' + rejected[module.name]
+                if module.name in rejected else ''
+            ))
+
+        self.load_config()
+
 
 if __name__ == "__main__":
     wpilib.run(Robot)
@@ -0,0 +1,2 @@
+from .profiler import LoopProfiler  # noqa: F401
+from .gc_control import GCManager  # noqa: F401
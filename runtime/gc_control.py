@@ -0,0 +1,230 @@
+"""
+Garbage collection control for the robot loop.
+
+CPython's cyclic garbage collector runs whenever enough objects have been
+allocated, which in the robot loop means in the middle of whatever tick
+happens to cross the threshold. With ``GC: Manual Control`` on,
+:class:`GCManager` takes over:
+
+- the objects created by ``robotInit`` (subsystems, Talons, config) are
+  frozen, so collections never have to look at them again (Python 3.7+;
+  on older versions this is skipped);
+- automatic collection is turned off;
+- at the end of each enabled tick, if at least ``GC: Min Idle Time``
+  milliseconds of the 20ms loop period are left, the young generations are
+  collected;
+- while disabled, everything is collected once a second.
+
+So that memory can't grow without bound when ticks never leave enough idle
+time, a young collection is forced once far more objects than usual have
+piled up.
+
+Every collection, automatic or not, is timed through :data:`gc.callbacks`,
+and the pause times and counts are put on the SmartDashboard.
+"""
+import gc
+import time
+import wpilib
+import config
+
+#: The robot loop period, in seconds.
+loop_period = 0.020
+
+#: How often to do a full collection while disabled, in seconds.
+full_collection_period = 1.0
+
+#: A young collection is forced once this many times the generation 0
+#: threshold of objects have been allocated.
+forced_collection_factor = 10
+
+
+class GCStats:
+    """
+    Collection counts and pause times for each generation, as recorded by
+    :func:`_gc_callback`.
+
+    Attributes:
+        collections: the number of collections of each generation.
+        total_pause: the total time spent in collections of each generation,
+            in seconds.
+        max_pause: the longest collection of each generation, in seconds.
+        last_pause: how long the most recent collection took, in seconds.
+        collected: the number of unreachable objects found.
+    """
+
+    def __init__(self):
+        self.reset()
+        self.__start = None
+
+    def reset(self):
+        self.collections = [0, 0, 0]
+        self.total_pause = [0.0, 0.0, 0.0]
+        self.max_pause = [0.0, 0.0, 0.0]
+        self.last_pause = 0.0
+        self.collected = 0
+
+    def start(self):
+        self.__start = time.perf_counter()
+
+    def stop(self, generation, collected):
+        if self.__start is None:
+            return
+
+        pause = time.perf_counter() - self.__start
+        self.__start = None
+
+        self.collections[generation] += 1
+        self.total_pause[generation] += pause
+        if pause > self.max_pause[generation]:
+            self.max_pause[generation] = pause
+
+        self.last_pause = pause
+        self.collected += collected
+
+
+#: The garbage collector is shared by the whole process, and so are its
+#: statistics.
+stats = GCStats()
+
+
+def _gc_callback(phase, info):
+    if phase == 'start':
+        stats.start()
+    else:
+        stats.stop(info['generation'], info['collected'])
+
+
+class GCManager:
+    """
+    Runs garbage collections between loop ticks instead of during them,
+    when ``GC: Manual Control`` is on.
+
+    Call :meth:`begin_tick` at the start of every periodic method and
+    :meth:`end_tick` at its end.
+
+    Attributes:
+        manual: whether automatic collection is turned off.
+        forced: the number of young collections forced because there was
+            no idle time to run them in.
+        stats: the process-wide :class:`GCStats`.
+    """
+
+    def __init__(self):
+        self.manual = False
+        self.forced = 0
+        self.stats = stats
+
+        self.__tick_start = time.perf_counter()
+        self.__last_full = None
+
+        if _gc_callback not in gc.callbacks:
+            gc.callbacks.append(_gc_callback)
+
+        self.load_config_values()
+
+    def load_config_values(self):
+        """
+        Read the GC settings from the current config snapshot (see
+        :func:`config.get`), and switch manual control on or off to match.
+        """
+        cfg = config.get()
+
+        self.min_idle = cfg.gc_min_idle_time / 1000
+
+        if cfg.gc_manual_control and not self.manual:
+            self.enable()
+        elif not cfg.gc_manual_control and self.manual:
+            self.disable()
+
+    def enable(self):
+        """
+        Freeze everything allocated so far, and turn off automatic
+        collection.
+        """
+        gc.collect()
+        if hasattr(gc, 'freeze'):
+            gc.freeze()
+
+        gc.disable()
+        self.manual = True
+
+    def disable(self):
+        """
+        Go back to automatic collection.
+        """
+        if hasattr(gc, 'unfreeze'):
+            gc.unfreeze()
+
+        gc.enable()
+        self.manual = False
+
+    def begin_tick(self):
+        self.__tick_start = time.perf_counter()
+
+    def end_tick(self, mode):
+        """
+        Collect garbage, if there's time left in this tick.
+
+        Args:
+            mode: the robot mode (``'disabled'``, ``'autonomous'``, etc.).
+                Full collections are only done while disabled.
+        """
+        if not self.manual:
+            return
+
+        now = time.perf_counter()
+
+        if mode == 'disabled':
+            if self.__last_full is None or (
+                now - self.__last_full >= full_collection_period
+            ):
+                gc.collect()
+                self.__last_full = now
+
+            return
+
+        self.__last_full = None
+
+        threshold0, threshold1, _ = gc.get_threshold()
+        count0, count1, _ = gc.get_count()
+
+        idle = loop_period - (now - self.__tick_start)
+        if idle >= self.min_idle:
+            if count1 >= threshold1:
+                gc.collect(1)
+            elif count0 >= threshold0:
+                gc.collect(0)
+        elif count0 >= threshold0 * forced_collection_factor:
+            gc.collect(0)
+            self.forced += 1
+
+    def format_stats(self):
+        """
+        Get a summary of the collections so far, as lines of text.
+        """
+        return [
+            'gen {}: {} collections, {:.2f}ms max pause, {:.2f}ms total'.format(  # noqa: E501
+                generation, self.stats.collections[generation],
+                self.stats.max_pause[generation] * 1000,
+                self.stats.total_pause[generation] * 1000
+            )
+            for generation in range(3)
+        ] + ['{} forced young collections'.format(self.forced)]
+
+    def update_smart_dashboard(self):
+        wpilib.SmartDashboard.putBoolean('GC Manual Control', self.manual)
+        wpilib.SmartDashboard.putNumber(
+            'GC Last Pause (ms)', self.stats.last_pause * 1000
+        )
+        wpilib.SmartDashboard.putNumber('GC Forced Collections', self.forced)
+
+        for generation in range(3):
+            wpilib.SmartDashboard.putNumber(
+                'GC Gen {} Collections'.format(generation),
+                self.stats.collections[generation]
+            )
+
+            wpilib.SmartDashboard.putNumber(
+                'GC Gen {} Max Pause (ms)'.format(generation),
+                self.stats.max_pause[generation] * 1000
+            )
@@ -0,0 +1,389 @@
+"""
+On-robot profiling of the periodic loop.
+
+:class:`LoopProfiler` profiles the robot's periodic methods for a set number
+of loop ticks, when the ``Debug: Profile Loop`` Preferences flag is turned
+on (from the dashboard, say). It has two modes:
+
+- ``cprofile``: a deterministic profile with :mod:`cProfile`. Every Python
+  function call is timed, so the results are exact call counts, but each
+  call costs more and the loop runs slower while profiling.
+- ``sampling``: a background thread looks at the main thread's stack every
+  ``sample_interval`` seconds, and counts which function it's in. This
+  barely slows the loop down, but only gives an estimate of where the time
+  goes (and can't sample more often than the interpreter switches threads,
+  every 5ms by default).
+
+Either way, the results are written to a file (a ``.prof`` file for
+:mod:`pstats` / snakeviz, or a ``.folded`` stack file for flamegraph.pl),
+and the top functions by self time are put on the SmartDashboard. This is
+done on a background thread, so that the file I/O stays out of the loop
+and a failure to write can't take the robot code down with it.
+
+While it isn't profiling, the periodic methods are left untouched, so it
+costs nothing beyond reading its config.
+"""
+import cProfile
+import os
+import pstats
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+import wpilib
+import config
+
+#: The robot methods profiled.
+periodic_methods = (
+    'disabledPeriodic', 'autonomousPeriodic', 'teleopPeriodic',
+    'testPeriodic',
+)
+
+#: Profiling modes.
+modes = ('cprofile', 'sampling')
+
+
+def _label(filename, line, name):
+    # like pstats.func_std_string, but shorter
+    return '{}:{}({})'.format(os.path.basename(filename), line, name)
+
+
+def default_output_dir():
+    """
+    Get where profiles are written by default: ``/home/lvuser/profiles`` on
+    the robot, or the temporary directory in simulation.
+    """
+    if wpilib.RobotBase.isSimulation():
+        return os.path.join(tempfile.gettempdir(), 'robot-profiles')
+
+    return '/home/lvuser/profiles'
+
+
+class StackSampler(threading.Thread):
+    """
+    Samples another thread's stack at a fixed interval, while :attr:`active`
+    is set.
+
+    Attributes:
+        samples: the number of stacks sampled.
+        self_counts: a Counter of samples by the function at the top of the
+            stack, keyed by ``(filename, line, name)``.
+        stack_counts: a Counter of samples by whole stack (outermost
+            function first).
+    """
+
+    def __init__(self, thread_id, interval, root_code=None):
+        super().__init__(name='LoopProfiler sampler', daemon=True)
+
+        self.thread_id = thread_id
+        self.interval = interval
+        self.root_code = root_code
+        self.active = False
+
+        self.samples = 0
+        self.self_counts = Counter()
+        self.stack_counts = Counter()
+
+        self.__stop_event = threading.Event()
+
+    def stop(self):
+        self.__stop_event.set()
+        self.join()
+
+    def run(self):
+        while not self.__stop_event.wait(self.interval):
+            if self.active:
+                self.sample()
+
+    def sample(self):
+        frame = sys._current_frames().get(self.thread_id)
+
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            if code is self.root_code:
+                break
+
+            stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+            frame = frame.f_back
+
+        if not stack:
+            return
+
+        self.samples += 1
+        self.self_counts[stack[0]] += 1
+        self.stack_counts[tuple(reversed(stack))] += 1
+
+
+class LoopProfiler:
+    """
+    Profiles a robot's periodic methods on demand.
+
+    Parameters:
+        robot: the robot whose periodic methods to profile.
+        output_dir: where to write profiles; see :func:`default_output_dir`.
+        on_finish: called with this profiler once a profile has been written.
+        sample_interval: how often the sampling profiler samples, in
+            seconds.
+
+    Attributes:
+        running: whether a profile is being captured.
+        mode: the mode of the current (or last) profile.
+        ticks: the number of ticks in the current (or last) profile.
+        top: the top functions by self time from the last profile, as
+            ``(label, self seconds, fraction of profiled time)`` tuples.
+        total_time: the total time spent in the profiled ticks, in seconds.
+        output_path: the file the last profile was written to.
+    """
+
+    def __init__(self, robot, output_dir=None, on_finish=None,
+                 sample_interval=0.001):
+        self.robot = robot
+        self.output_dir = output_dir
+        self.on_finish = on_finish
+        self.sample_interval = sample_interval
+
+        self.running = False
+        self.mode = None
+        self.top = []
+        self.total_time = 0
+        self.output_path = None
+
+        self.__was_enabled = False
+        self.__ticks_left = 0
+        self.__originals = {}
+        self.__profile = None
+        self.__sampler = None
+        self.__writer = None
+        self.__tick_start = 0
+
+        self.load_config_values()
+
+    def load_config_values(self):
+        """
+        Read the profiler settings from the current config snapshot (see
+        :func:`config.get`), and start profiling if ``Debug: Profile Loop``
+        has just been turned on.
+        """
+        cfg = config.get()
+
+        self.ticks = cfg.profiler_ticks
+        self.top_n = cfg.profiler_top_n
+
+        enabled = cfg.profile_loop
+        if enabled and not self.__was_enabled and not self.running:
+            self.start(cfg.profiler_mode, self.ticks)
+
+        self.__was_enabled = enabled
+
+    def start(self, mode, ticks):
+        """
+        Profile the next ``ticks`` periodic method calls.
+
+        Args:
+            mode: one of :data:`modes`.
+            ticks: the number of ticks to profile.
+        """
+        if mode not in modes:
+            raise ValueError('unknown profiler mode {!r}'.format(mode))
+
+        if self.running:
+            self.stop()
+
+        self.mode = mode
+        self.ticks = ticks
+        self.total_time = 0
+        self.__ticks_left = ticks
+
+        if mode == 'cprofile':
+            self.__profile = cProfile.Profile()
+        else:
+            self.__sampler = StackSampler(
+                threading.get_ident(), self.sample_interval
+            )
+
+        # Shadow each periodic method with a profiled one on the instance;
+        # stop() puts the originals back.
+        for name in periodic_methods:
+            self.__originals[name] = vars(self.robot).get(name)
+            setattr(self.robot, name, self.__wrap(getattr(self.robot, name)))
+
+        if self.__sampler is not None:
+            self.__sampler.root_code = self.__profiled_code
+            self.__sampler.start()
+
+        self.running = True
+
+    def __wrap(self, periodic):
+        def profiled():
+            self.__begin_tick()
+            try:
+                periodic()
+            finally:
+                self.__end_tick()
+
+        self.__profiled_code = profiled.__code__
+        return profiled
+
+    def __begin_tick(self):
+        self.__tick_start = time.perf_counter()
+
+        if self.__profile is not None:
+            self.__profile.enable()
+        else:
+            self.__sampler.active = True
+
+    def __end_tick(self):
+        if self.__profile is not None:
+            self.__profile.disable()
+        else:
+            self.__sampler.active = False
+
+        self.total_time += time.perf_counter() - self.__tick_start
+
+        self.__ticks_left -= 1
+        if self.__ticks_left <= 0:
+            self.stop()
+
+    def stop(self):
+        """
+        Stop profiling, and write and publish the results.
+
+        This is called from the last profiled tick, so the results are
+        written and published from a background thread (see :meth:`join`);
+        an error while writing them is logged, and never reaches the robot
+        loop.
+        """
+        if not self.running:
+            return
+
+        self.running = False
+
+        for name, original in self.__originals.items():
+            if original is None:
+                delattr(self.robot, name)
+            else:
+                setattr(self.robot, name, original)
+
+        self.__originals = {}
+
+        self.__writer = threading.Thread(
+            target=self.__write_results,
+            args=(self.__profile, self.__sampler),
+            name='LoopProfiler writer', daemon=True
+        )
+
+        self.__profile = None
+        self.__sampler = None
+
+        self.__writer.start()
+
+    def join(self, timeout=None):
+        """
+        Wait for the results of the last profile to be written.
+
+        Returns:
+            False if they still haven't been written after ``timeout``
+            seconds.
+        """
+        if self.__writer is not None:
+            self.__writer.join(timeout)
+            return not self.__writer.is_alive()
+
+        return True
+
+    def __write_results(self, profile, sampler):
+        try:
+            if sampler is not None:
+                sampler.stop()
+
+            output_dir = self.output_dir
+            if output_dir is None:
+                output_dir = default_output_dir()
+
+            os.makedirs(output_dir, exist_ok=True)
+            stem = os.path.join(output_dir, 'loop-{}'.format(
+                time.strftime('%Y%m%d-%H%M%S')
+            ))
+
+            if profile is not None:
+                path = stem + '.prof'
+                self.top = self.__finish_cprofile(profile, path)
+            else:
+                path = stem + '.folded'
+                self.top = self.__finish_sampling(sampler, path)
+
+            self.output_path = path
+        except Exception as e:
+            print(
+                "[profiler] Couldn't write the {} profile: {!r}".format(
+                    self.mode, e
+                ),
+                file=sys.stderr
+            )
+            return
+        finally:
+            # so that turning the flag on again starts another profile
+            wpilib.Preferences.getInstance().putBoolean(
+                'Debug: Profile Loop', False
+            )
+
+        self.update_smart_dashboard()
+
+        if self.on_finish is not None:
+            self.on_finish(self)
+
+    def __finish_cprofile(self, profile, path):
+        profile.dump_stats(path)
+
+        stats = pstats.Stats(profile).stats
+        by_self_time = sorted(
+            stats.items(), key=lambda item: item[1][2], reverse=True
+        )
+
+        total = self.total_time
+        return [
+            (_label(*func), tt, tt / total if total > 0 else 0)
+            for func, (cc, nc, tt, ct, callers) in by_self_time[:self.top_n]
+        ]
+
+    def __finish_sampling(self, sampler, path):
+        with open(path, 'w') as f:
+            for stack, count in sampler.stack_counts.most_common():
+                f.write('{} {}\n'.format(
+                    ';'.join(_label(*func) for func in stack), count
+                ))
+
+        if sampler.samples == 0:
+            return []
+
+        # spread the measured tick time over the samples
+        return [
+            (
+                _label(*func),
+                self.total_time * count / sampler.samples,
+                count / sampler.samples
+            )
+            for func, count in sampler.self_counts.most_common(self.top_n)
+        ]
+
+    def format_top(self):
+        """
+        Get the top functions from the last profile as lines of text.
+        """
+        return [
+            '{:5.1f}% {:8.2f}ms  {}'.format(
+                fraction * 100, seconds * 1000, label
+            )
+            for label, seconds, fraction in self.top
+        ]
+
+    def update_smart_dashboard(self):
+        wpilib.SmartDashboard.putBoolean('Profiler Running', self.running)
+        wpilib.SmartDashboard.putStringArray(
+            'Profiler Top Functions', self.format_top()
+        )
+        wpilib.SmartDashboard.putString(
+            'Profiler Output', self.output_path or ''
+        )
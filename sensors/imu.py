@@ -1,5 +1,6 @@
 import math
 import wpilib
+import config
 from robotpy_ext.common_drivers.navx.ahrs import AHRS
 
 
@@ -7,7 +8,6 @@ class IMU:
     def __init__(self, port, imu_type='navx', interface='spi'):
         self.type = imu_type
         self.iface = interface
-        self.prefs = wpilib.Preferences.getInstance()
         self.angle_offset = 0
 
         if imu_type == 'navx':
@@ -49,7 +49,7 @@ class IMU:
         elif abs_hdg < 0:
             abs_hdg += (2*math.pi)
 
-        if self.prefs.getBoolean('Reverse Heading Direction', False):
+        if config.get().reverse_heading:
             abs_hdg = (2*math.pi) - abs_hdg
 
         return abs_hdg
@@ -64,7 +64,7 @@ class IMU:
 
         yaw += self.angle_offset
 
-        if self.prefs.getBoolean('Reverse Heading Direction', False):
+        if config.get().reverse_heading:
             yaw *= -1
 
         return yaw
@@ -0,0 +1,73 @@
+import wpilib
+
+
+class LimitSwitch:
+    """
+    Edge-triggered, debounced monitor for an active-low limit switch.
+
+    Call :meth:`update` once per loop; it returns an edge (``PRESSED`` or
+    ``RELEASED``) only on the loop where the debounced switch state changes,
+    so callers can act exactly once per press instead of on every tick the
+    switch is held down.
+
+    Parameters:
+        channel: the DIO channel the switch is connected to.
+        debounce_time: how long, in seconds, a new reading has to stay stable
+            before it is accepted.
+
+    Attributes:
+        pressed: the current debounced switch state.
+        press_time: the FPGA timestamp at which the most recent press was
+            first seen, or None if the switch has not been pressed yet.
+        press_count: the number of debounced presses seen so far.
+    """
+    PRESSED = 'pressed'
+    RELEASED = 'released'
+
+    def __init__(self, channel, debounce_time=0.02):
+        self.switch = wpilib.DigitalInput(channel)
+        self.debounce_time = debounce_time
+
+        self.pressed = False
+        self.press_time = None
+        self.press_count = 0
+
+        self.__raw_state = False
+        self.__raw_change_time = wpilib.Timer.getFPGATimestamp()
+
+    def get_raw(self):
+        """
+        Read the switch directly, without debouncing.
+        Returns True if the switch is pressed.
+        """
+        return not self.switch.get()
+
+    def update(self):
+        """
+        Sample the switch and update the debounced state.
+
+        Returns:
+            ``LimitSwitch.PRESSED`` or ``LimitSwitch.RELEASED`` if the
+            debounced state changed on this call, None otherwise.
+        """
+        now = wpilib.Timer.getFPGATimestamp()
+        raw = self.get_raw()
+
+        if raw != self.__raw_state:
+            self.__raw_state = raw
+            self.__raw_change_time = now
+
+        if (
+            raw != self.pressed
+            and (now - self.__raw_change_time) >= self.debounce_time
+        ):
+            self.pressed = raw
+
+            if raw:
+                self.press_time = self.__raw_change_time
+                self.press_count += 1
+                return self.PRESSED
+            else:
+                return self.RELEASED
+
+        return None
@@ -0,0 +1,344 @@
+"""
+A fused estimate of the robot's pose on the field.
+
+:class:`PoseEstimator` is an extended Kalman filter over ``(x, y, heading)``
+(the same frame as :class:`sensors.pose_history.Pose`):
+
+- every loop, the swerve odometry's displacement and the change in IMU yaw
+  move the estimate forwards (the prediction step), and add uncertainty in
+  proportion to how far the robot moved;
+- a vision sighting of a landmark whose field position is known corrects the
+  estimate (the update step). Sightings arrive late, so the filter keeps a
+  fixed-size history of its past states and inputs; a sighting is applied
+  at the state from when its frame was captured, and the inputs since then
+  are replayed on top.
+
+All of the filter's state lives in NumPy arrays allocated up front, and every
+step works on them in place, so a loop tick costs the same (and creates no
+new arrays) however long the match has been running. Replaying after a late
+sighting costs at most one prediction step per stored tick.
+
+Sightings come from :class:`vision.targeting.VisionTargeting`, when it's
+given the estimator and a table of landmark positions. The robot doesn't
+create one yet (that needs a VisionMaster connection to the jetson, and the
+landmarks' positions in the odometry frame, which starts wherever the robot
+was at the start of autonomous), so for now the estimate only follows the
+odometry.
+"""
+import math
+import numpy as np
+from .pose_history import Pose
+
+
+class PoseEstimator:
+    """
+    Fuses swerve odometry, IMU yaw and vision landmark sightings into one
+    pose.
+
+    Parameters:
+        history_size: how many loop ticks of state to keep for replaying
+            late vision results. At 50 ticks per second the default covers
+            one second of latency.
+        translation_noise: standard deviation of the odometry error, as a
+            fraction of the distance driven.
+        rotation_noise: standard deviation of the IMU yaw error, as a
+            fraction of the change in heading.
+        heading_drift: standard deviation of the IMU yaw drift, in radians
+            per second.
+        gate: sightings whose innovation has a squared Mahalanobis distance
+            above this are rejected as outliers. The default rejects about
+            1 in 1000 good sightings.
+    """
+
+    def __init__(self, history_size=50, translation_noise=0.1,
+                 rotation_noise=0.02, heading_drift=0.002, gate=13.8):
+        self.history_size = history_size
+        self.translation_noise = translation_noise
+        self.rotation_noise = rotation_noise
+        self.heading_drift = heading_drift
+        self.gate = gate
+
+        # history ring buffer: the state and covariance *after* each tick's
+        # prediction, and the inputs that tick was predicted with
+        self.__times = np.zeros(history_size)
+        self.__states = np.zeros((history_size, 3))
+        self.__covs = np.zeros((history_size, 3, 3))
+        self.__inputs = np.zeros((history_size, 4))  # fwd, right, dhdg, dt
+
+        self.__state_rows = list(self.__states)
+        self.__cov_rows = list(self.__covs)
+        self.__input_rows = list(self.__inputs)
+
+        self.__head = 0  # index of the newest entry
+        self.__count = 0
+        self.__last_heading = None
+
+        # scratch space
+        self.__F = np.eye(3)
+        self.__Ft = self.__F.T
+        self.__FP = np.zeros((3, 3))
+        self.__H = np.zeros((2, 3))
+        self.__Ht = self.__H.T
+        self.__PHt = np.zeros((3, 2))
+        self.__S = np.zeros((2, 2))
+        self.__S_inv = np.zeros((2, 2))
+        self.__K = np.zeros((3, 2))
+        self.__HP = np.zeros((2, 3))
+        self.__KHP = np.zeros((3, 3))
+        self.__innovation = np.zeros(2)
+        self.__correction = np.zeros(3)
+
+        #: The number of sightings applied and rejected.
+        self.sightings = 0
+        self.rejected = 0
+
+        self.reset()
+
+    def reset(self, pose=None, timestamp=0, std=(1.0, 1.0, 0.01)):
+        """
+        Start again from a known pose, forgetting the history.
+
+        Args:
+            pose (Pose): the starting pose; defaults to the origin with
+                heading 0.
+            timestamp: the time of the starting pose, in seconds.
+            std: the starting uncertainty (standard deviations of x, y in
+                inches and heading in radians).
+        """
+        if pose is None:
+            pose = Pose(0, 0, 0)
+
+        self.__head = 0
+        self.__count = 1
+        self.__last_heading = None
+
+        self.__times[0] = timestamp
+        state = self.__state_rows[0]
+        state[0] = pose.x
+        state[1] = pose.y
+        state[2] = pose.heading
+
+        cov = self.__cov_rows[0]
+        cov.fill(0)
+        for i in range(3):
+            cov[i, i] = std[i] ** 2
+
+        self.__input_rows[0].fill(0)
+
+    def __len__(self):
+        return self.__count
+
+    def __predict(self, state, cov, forward, right, d_heading, dt):
+        # move by the robot-frame displacement, using the heading halfway
+        # through the tick (like SwerveOdometry)
+        mid_heading = state[2] + (d_heading / 2)
+        cos_h = math.cos(mid_heading)
+        sin_h = math.sin(mid_heading)
+
+        state[0] += (forward * cos_h) - (right * sin_h)
+        state[1] += (forward * sin_h) + (right * cos_h)
+        state[2] += d_heading
+
+        # cov = F cov F^T + Q
+        F = self.__F
+        F[0, 2] = -(forward * sin_h) - (right * cos_h)
+        F[1, 2] = (forward * cos_h) - (right * sin_h)
+
+        np.dot(F, cov, out=self.__FP)
+        np.dot(self.__FP, self.__Ft, out=cov)
+
+        dist = math.hypot(forward, right)
+        q_xy = (self.translation_noise * dist) ** 2
+        q_heading = ((self.rotation_noise * d_heading) ** 2) + (
+            (self.heading_drift * dt) ** 2
+        )
+
+        cov[0, 0] += q_xy
+        cov[1, 1] += q_xy
+        cov[2, 2] += q_heading
+
+    def predict(self, timestamp, forward, right, heading):
+        """
+        Move the estimate by one loop tick's odometry. Call this once per
+        loop, in increasing time order.
+
+        Args:
+            timestamp: when the sensors were read, in seconds.
+            forward, right: the robot-frame displacement since the last
+                tick, in inches (see
+                :attr:`swerve.odometry.SwerveOdometry.displacement`).
+            heading: the continuous IMU heading, in radians. Only changes in
+                it are used, so its zero doesn't have to match the field.
+        """
+        last = self.__head
+        last_heading = self.__last_heading
+        self.__last_heading = heading
+
+        if last_heading is None:
+            d_heading = dt = 0
+        else:
+            d_heading = heading - last_heading
+            dt = max(timestamp - self.__times[last], 0)
+
+        head = (last + 1) % self.history_size
+        state = self.__state_rows[head]
+        cov = self.__cov_rows[head]
+        np.copyto(state, self.__state_rows[last])
+        np.copyto(cov, self.__cov_rows[last])
+
+        inputs = self.__input_rows[head]
+        inputs[0] = forward
+        inputs[1] = right
+        inputs[2] = d_heading
+        inputs[3] = dt
+
+        self.__predict(state, cov, forward, right, d_heading, dt)
+
+        self.__times[head] = timestamp
+        self.__head = head
+        if self.__count < self.history_size:
+            self.__count += 1
+
+    def __update(self, state, cov, landmark_x, landmark_y, forward, right,
+                 variance):
+        cos_h = math.cos(state[2])
+        sin_h = math.sin(state[2])
+        dx = landmark_x - state[0]
+        dy = landmark_y - state[1]
+
+        # where the landmark should appear, relative to the robot
+        # (inverse_transform_point), and its Jacobian
+        expected_forward = (dx * cos_h) + (dy * sin_h)
+        expected_right = (dy * cos_h) - (dx * sin_h)
+
+        H = self.__H
+        H[0, 0] = -cos_h
+        H[0, 1] = -sin_h
+        H[0, 2] = expected_right
+        H[1, 0] = sin_h
+        H[1, 1] = -cos_h
+        H[1, 2] = -expected_forward
+
+        innovation = self.__innovation
+        innovation[0] = forward - expected_forward
+        innovation[1] = right - expected_right
+
+        # S = H cov H^T + R
+        PHt = self.__PHt
+        S = self.__S
+        np.dot(cov, self.__Ht, out=PHt)
+        np.dot(H, PHt, out=S)
+        S[0, 0] += variance
+        S[1, 1] += variance
+
+        det = (S[0, 0] * S[1, 1]) - (S[0, 1] * S[1, 0])
+        if det <= 0:
+            return False
+
+        S_inv = self.__S_inv
+        S_inv[0, 0] = S[1, 1] / det
+        S_inv[0, 1] = -S[0, 1] / det
+        S_inv[1, 0] = -S[1, 0] / det
+        S_inv[1, 1] = S[0, 0] / det
+
+        i0 = innovation[0]
+        i1 = innovation[1]
+        mahalanobis = (
+            (i0 * ((S_inv[0, 0] * i0) + (S_inv[0, 1] * i1)))
+            + (i1 * ((S_inv[1, 0] * i0) + (S_inv[1, 1] * i1)))
+        )
+        if mahalanobis > self.gate:
+            return False
+
+        # K = cov H^T S^-1
+        K = self.__K
+        np.dot(PHt, S_inv, out=K)
+
+        np.dot(K, innovation, out=self.__correction)
+        np.add(state, self.__correction, out=state)
+
+        # cov = cov - K H cov, kept symmetric
+        np.dot(H, cov, out=self.__HP)
+        np.dot(K, self.__HP, out=self.__KHP)
+        np.subtract(cov, self.__KHP, out=cov)
+        np.add(cov, cov.T, out=self.__KHP)
+        np.multiply(self.__KHP, 0.5, out=cov)
+
+        return True
+
+    def add_landmark(self, timestamp, landmark_x, landmark_y, forward, right,
+                     std=6.0):
+        """
+        Correct the estimate with a sighting of a landmark whose field
+        position is known.
+
+        Args:
+            timestamp: when the sighting's frame was captured, on the same
+                clock as :meth:`predict`.
+            landmark_x, landmark_y: the landmark's field position, in
+                inches.
+            forward, right: where the landmark was seen, relative to the
+                robot, in inches (e.g. from
+                :meth:`vision.targeting.VisionTargeting.camera_to_robot`).
+            std: the standard deviation of the sighting, in inches.
+
+        Returns:
+            True if the sighting was applied; False if it was too old for
+            the history, or rejected as an outlier.
+        """
+        # find the newest entry at or before the capture time
+        n = self.history_size
+        index = None
+        for age in range(self.__count):
+            i = (self.__head - age) % n
+            if self.__times[i] <= timestamp:
+                index = i
+                break
+
+        if index is None:
+            self.rejected += 1
+            return False
+
+        if not self.__update(
+            self.__state_rows[index], self.__cov_rows[index], landmark_x,
+            landmark_y, forward, right, std ** 2
+        ):
+            self.rejected += 1
+            return False
+
+        # replay the ticks since then
+        while index != self.__head:
+            prev = index
+            index = (index + 1) % n
+            state = self.__state_rows[index]
+            cov = self.__cov_rows[index]
+            np.copyto(state, self.__state_rows[prev])
+            np.copyto(cov, self.__cov_rows[prev])
+
+            inputs = self.__input_rows[index]
+            self.__predict(
+                state, cov, inputs[0], inputs[1], inputs[2], inputs[3]
+            )
+
+        self.sightings += 1
+        return True
+
+    def get_pose(self):
+        """
+        Get the current pose estimate.
+
+        Returns:
+            :class:`sensors.pose_history.Pose`
+        """
+        state = self.__state_rows[self.__head]
+        return Pose(float(state[0]), float(state[1]), float(state[2]))
+
+    def get_std(self):
+        """
+        Get the current uncertainty, as standard deviations of ``(x, y,
+        heading)``.
+        """
+        cov = self.__cov_rows[self.__head]
+        return (
+            math.sqrt(cov[0, 0]), math.sqrt(cov[1, 1]), math.sqrt(cov[2, 2])
+        )
@@ -0,0 +1,178 @@
+"""
+A time-indexed history of robot poses.
+
+Sensor results that arrive late (vision in particular) describe the world as
+it was when their data was captured, not as it is now. Looking up where the
+robot was at that time lets them be corrected for the robot's motion since.
+"""
+import math
+from collections import namedtuple
+
+#: A robot pose on the field.
+#:
+#: ``x`` is along the robot's starting forward direction and ``y`` is to the
+#: right of it, both in inches; ``heading`` is the continuous (unwrapped)
+#: IMU heading in radians, clockwise positive, as returned by
+#: :meth:`swerve.odometry.SwerveOdometry.read_heading` (so it's the opposite
+#: of :meth:`sensors.imu.IMU.get_continuous_heading` when ``Reverse Heading
+#: Direction`` is set).
+Pose = namedtuple('Pose', ['x', 'y', 'heading'])
+
+
+def transform_point(pose, forward, right):
+    """
+    Convert a point relative to the robot into field coordinates.
+
+    Args:
+        pose (Pose): the robot pose.
+        forward: the distance of the point ahead of the robot.
+        right: the distance of the point to the right of the robot.
+
+    Returns:
+        An ``(x, y)`` tuple.
+    """
+    cos_h = math.cos(pose.heading)
+    sin_h = math.sin(pose.heading)
+
+    return (
+        pose.x + (forward * cos_h) - (right * sin_h),
+        pose.y + (forward * sin_h) + (right * cos_h)
+    )
+
+
+def inverse_transform_point(pose, x, y):
+    """
+    Convert a field point into coordinates relative to the robot.
+    The inverse of :func:`transform_point`.
+
+    Returns:
+        A ``(forward, right)`` tuple.
+    """
+    dx = x - pose.x
+    dy = y - pose.y
+    cos_h = math.cos(pose.heading)
+    sin_h = math.sin(pose.heading)
+
+    return (
+        (dx * cos_h) + (dy * sin_h),
+        (dy * cos_h) - (dx * sin_h)
+    )
+
+
+class PoseHistory:
+    """
+    A fixed-size ring buffer of timestamped poses, interpolated by time.
+
+    Samples must be added in increasing time order (e.g. once per loop tick,
+    stamped with :func:`wpilib.Timer.getFPGATimestamp`). Once the buffer is
+    full, each new sample overwrites the oldest one, so memory use and the
+    cost of adding a sample stay constant for the whole match.
+
+    Parameters:
+        capacity: the number of samples to keep. At 50 samples per second
+            the default keeps the last 2 seconds.
+    """
+
+    def __init__(self, capacity=100):
+        self.capacity = capacity
+        self.__times = [0.0] * capacity
+        self.__poses = [None] * capacity
+        self.__head = 0  # index the next sample will be written to
+        self.__count = 0
+
+    def __len__(self):
+        return self.__count
+
+    def clear(self):
+        self.__head = 0
+        self.__count = 0
+
+    def add(self, timestamp, pose):
+        """
+        Record the robot's pose at a given time.
+
+        Args:
+            timestamp: the time of the sample, in seconds.
+            pose (Pose): the robot's pose at that time.
+        """
+        self.__times[self.__head] = timestamp
+        self.__poses[self.__head] = pose
+        self.__head = (self.__head + 1) % self.capacity
+
+        if self.__count < self.capacity:
+            self.__count += 1
+
+    def __index(self, i):
+        # physical index of the i-th oldest sample
+        return (self.__head - self.__count + i) % self.capacity
+
+    def latest(self):
+        """
+        Get the most recent ``(timestamp, pose)`` sample, or None if the
+        history is empty.
+        """
+        if self.__count == 0:
+            return None
+
+        idx = self.__index(self.__count - 1)
+        return self.__times[idx], self.__poses[idx]
+
+    def oldest_time(self):
+        """Get the time of the oldest sample, or None if empty."""
+        if self.__count == 0:
+            return None
+
+        return self.__times[self.__index(0)]
+
+    def get_pose(self, timestamp):
+        """
+        Look up the robot's pose at a given time, linearly interpolating
+        between the samples on either side of it.
+
+        Times before the oldest sample or after the newest one are clamped
+        to those samples.
+
+        Args:
+            timestamp: the time to look up, in seconds.
+
+        Returns:
+            A :class:`Pose`, or None if the history is empty.
+        """
+        if self.__count == 0:
+            return None
+
+        times = self.__times
+        poses = self.__poses
+
+        # binary search for the first sample at or after timestamp
+        lo, hi = 0, self.__count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if times[self.__index(mid)] < timestamp:
+                lo = mid + 1
+            else:
+                hi = mid
+
+        if lo == 0:
+            return poses[self.__index(0)]
+        elif lo == self.__count:
+            return poses[self.__index(self.__count - 1)]
+
+        before = self.__index(lo - 1)
+        after = self.__index(lo)
+
+        t0 = times[before]
+        t1 = times[after]
+        if t1 <= t0:
+            return poses[after]
+
+        frac = (timestamp - t0) / (t1 - t0)
+        p0 = poses[before]
+        p1 = poses[after]
+
+        # headings are continuous, so there is no wraparound to deal with
+        return Pose(
+            p0.x + (p1.x - p0.x) * frac,
+            p0.y + (p1.y - p0.y) * frac,
+            p0.heading + (p1.heading - p0.heading) * frac
+        )
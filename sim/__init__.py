@@ -0,0 +1,3 @@
+from .field import HeadlessPhysics  # noqa: F401
+from .match import Match, MatchScript, run_match, \
+    talon_notifiers_disabled  # noqa: F401
@@ -0,0 +1,35 @@
+"""
+Run a simulated match from the command line:
+
+    python -m sim [starting position] [game message] [teleop seconds]
+
+e.g. ``python -m sim Left LRL 0`` runs just autonomous from the left.
+"""
+import math
+import sys
+from .match import MatchScript, run_match
+
+
+def main(position='Middle-Baseline', game_message='LRL', teleop_time=135):
+    from robot import Robot
+
+    script = MatchScript(
+        game_message, choices={'Robot Starting Position': position}
+    )
+    match = run_match(Robot, script, teleop_time=float(teleop_time))
+
+    print('[sim] {:.1f} s match simulated in {:.3f} s'.format(
+        match.end_time, match.wall_time
+    ))
+
+    for mode in ('autonomous', 'teleop'):
+        samples = [s for s in match.samples if s.mode == mode]
+        if samples:
+            end = samples[-1]
+            print('[sim] end of {}: x={:.2f} ft, y={:.2f} ft, angle={:.1f} deg'.format(  # noqa: E501
+                mode, end.x, end.y, math.degrees(end.angle)
+            ))
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
@@ -0,0 +1,85 @@
+"""
+Headless stand-in for pyfrc's PhysicsInterface.
+
+The pyfrc simulator only hands its PhysicsInterface to physics.py when the
+GUI is running, and pyfrc's tests don't run physics.py at all. This tracks
+the robot on the field the same way, so a PhysicsEngine can be stepped
+without either.
+"""
+import math
+import hal  # noqa: F401 (hal has to be loaded before hal_impl)
+from hal_impl.data import hal_data
+
+
+class HeadlessPhysics(object):
+    """
+    Keeps track of where the robot is on the field.
+
+    Positions are in feet and radians, in pyfrc's field frame: the robot
+    starts at the origin facing along +x, and angles are clockwise.
+
+    Args:
+        x (float): starting position along the field, in feet.
+        y (float): starting position across the field, in feet.
+        angle (float): starting heading, in radians.
+    """
+
+    def __init__(self, x=0, y=0, angle=0):
+        self.x = x
+        self.y = y
+        self.angle = angle
+
+        self.robot_enabled = False
+        self.analog_gyro_channels = []
+        self.device_gyro_channels = []
+
+    def add_analog_gyro_channel(self, ch):
+        self.analog_gyro_channels.append(ch)
+
+    def add_device_gyro_channel(self, angle_key):
+        hal_data['robot'][angle_key] = 0
+        self.device_gyro_channels.append(angle_key)
+
+    def drive(self, speed, rotation_speed, tm_diff):
+        """
+        Move the robot along its heading (see PhysicsInterface.drive).
+        """
+        self.vector_drive(0, speed, rotation_speed, tm_diff)
+
+    def vector_drive(self, vx, vy, vw, tm_diff):
+        """
+        Move the robot by a robot-relative velocity.
+
+        Args:
+            vx (float): speed to the right, in feet / second.
+            vy (float): speed forwards, in feet / second.
+            vw (float): clockwise rotation, in radians / second.
+            tm_diff (float): how long the robot moved for, in seconds.
+        """
+        if not self.robot_enabled:
+            return
+
+        # integrate about the middle of the step
+        angle = vw * tm_diff
+        heading = self.angle + (angle / 2)
+        c, s = math.cos(heading), math.sin(heading)
+
+        self.x += ((vy * c) - (vx * s)) * tm_diff
+        self.y += ((vy * s) + (vx * c)) * tm_diff
+        self.angle += angle
+
+        for key in self.device_gyro_channels:
+            hal_data['robot'][key] += math.degrees(angle)
+
+        # same scaling as pyfrc's analog gyro model
+        for ch in self.analog_gyro_channels:
+            hal_data['analog_in'][ch]['accumulator_value'] += (
+                math.degrees(angle) / 2.7901785714285715e-12
+            )
+
+    def get_position(self):
+        """
+        Returns:
+            ``(x, y, angle)``: in feet and radians.
+        """
+        return self.x, self.y, self.angle
@@ -0,0 +1,370 @@
+"""
+Headless match runner.
+
+Runs the robot code through a whole match (disabled, autonomous, teleop) on
+pyfrc's fake clock instead of the wall clock, so everything timed with
+wpilib.Timer runs as fast as the CPU allows: a full match takes a few
+seconds, and the same inputs always give the same match.
+
+Driver station, joystick and FMS inputs come from a MatchScript. From a
+pyfrc test, use the robot / control fixtures::
+
+    def test_auto(control, robot):
+        match = Match(robot, MatchScript(game_message='LRL'))
+        control.run_test(match.on_step)
+
+and anywhere else, use run_match::
+
+    from robot import Robot
+    match = run_match(Robot, MatchScript(game_message='LRL'))
+"""
+import bisect
+import contextlib
+import time
+from collections import namedtuple
+from hal_impl import mode_helpers
+from hal_impl.data import hal_data
+from networktables import NetworkTables
+from .field import HeadlessPhysics
+
+#: One physics step of a match: the time (seconds since the start of
+#: autonomous), robot mode and robot position on the field.
+MatchSample = namedtuple('MatchSample', ['time', 'mode', 'x', 'y', 'angle'])
+
+
+class MatchScript(object):
+    """
+    Timed driver station and FMS inputs for a match.
+
+    Event times are in seconds since the start of autonomous (negative times
+    happen before the match). Events at the same time are applied in the
+    order they were added.
+
+    Args:
+        game_message (str): the FMS game specific message.
+        game_message_delay (float): how long after the start of autonomous
+            the game message arrives; 0 sends it along with the mode change,
+            like the pyfrc simulator does.
+        alliance_station (int): a ``hal.AllianceStationID`` value, or None to
+            leave it as it is.
+        choices (dict): SmartDashboard chooser name -> selected option, e.g.
+            ``{'Robot Starting Position': 'Left'}``.
+    """
+
+    def __init__(self, game_message='LRL', alliance_station=None,
+                 choices=None, game_message_delay=0):
+        self.game_message = game_message
+        self.game_message_delay = game_message_delay
+        self.alliance_station = alliance_station
+        self.choices = dict(choices or {})
+
+        self.times = []
+        self.events = []
+
+        if game_message_delay > 0:
+            def send_game_message(hal_data):
+                hal_data['event']['game_specific_message'] = game_message
+
+            self.at(game_message_delay, send_game_message)
+
+    def choose(self, chooser, selection):
+        """
+        Select an option on a SmartDashboard chooser before the match.
+        """
+        self.choices[chooser] = selection
+        return self
+
+    def at(self, t, fn):
+        """
+        Call ``fn(hal_data)`` at time ``t``.
+        """
+        i = bisect.bisect_right(self.times, t)
+        self.times.insert(i, t)
+        self.events.insert(i, fn)
+        return self
+
+    def axis(self, t, stick, axis, value):
+        """
+        Move a joystick axis to ``value`` at time ``t``.
+        """
+        def set_axis(hal_data):
+            hal_data['joysticks'][stick]['axes'][axis] = value
+
+        return self.at(t, set_axis)
+
+    def button(self, t, stick, button, pressed=True):
+        """
+        Press (or release) a joystick button at time ``t``.
+        """
+        def set_button(hal_data):
+            hal_data['joysticks'][stick]['buttons'][button] = pressed
+
+        return self.at(t, set_button)
+
+    def hold_button(self, t, duration, stick, button):
+        """
+        Press a joystick button at time ``t`` and release it after
+        ``duration`` seconds.
+        """
+        self.button(t, stick, button, True)
+        return self.button(t + duration, stick, button, False)
+
+    def neutral(self, t, stick):
+        """
+        Center all of a joystick's axes and release all of its buttons.
+        """
+        def set_neutral(hal_data):
+            joystick = hal_data['joysticks'][stick]
+            joystick['axes'][:] = [0] * len(joystick['axes'])
+            joystick['buttons'][1:] = [False] * (len(joystick['buttons']) - 1)
+
+        return self.at(t, set_neutral)
+
+    def setup(self):
+        """
+        Apply the pre-match settings; called before the robot code starts
+        its first step.
+        """
+        if self.alliance_station is not None:
+            hal_data['alliance_station'] = self.alliance_station
+
+        sd_table = NetworkTables.getTable('SmartDashboard')
+        for chooser, selection in self.choices.items():
+            sd_table.getSubTable(chooser).putString('selected', selection)
+
+    def apply(self, start, end):
+        """
+        Apply the events with ``start < t <= end``.
+        """
+        lo = bisect.bisect_right(self.times, start)
+        hi = bisect.bisect_right(self.times, end)
+
+        for fn in self.events[lo:hi]:
+            fn(hal_data)
+
+
+class Match(object):
+    """
+    Steps a robot through a match; pass ``on_step`` to pyfrc's fake clock
+    (e.g. ``control.run_test(match.on_step)``), which calls it every driver
+    station packet (20ms).
+
+    Args:
+        robot: the robot instance.
+        script (MatchScript): inputs for the match.
+        physics_engine: a PhysicsEngine class (as in physics.py) to move the
+            robot with, or None to run without physics.
+        pre_match_time (float): seconds disabled before autonomous.
+        autonomous_time (float): length of autonomous, in seconds.
+        transition_time (float): seconds disabled between autonomous and
+            teleop.
+        teleop_time (float): length of teleop, in seconds; 0 ends the
+            match after autonomous.
+        on_step: optional function called with the match time (seconds
+            since the start of autonomous) every step; returning False ends
+            the match early.
+    """
+
+    def __init__(self, robot, script=None, physics_engine=None,
+                 pre_match_time=1, autonomous_time=15, transition_time=1,
+                 teleop_time=135, on_step=None):
+        self.robot = robot
+        self.script = script if script is not None else MatchScript()
+        self.pre_match_time = pre_match_time
+        self.autonomous_time = autonomous_time
+        self.transition_time = transition_time
+        self.teleop_time = teleop_time
+        self.user_on_step = on_step
+
+        self.field = HeadlessPhysics()
+        self.physics = None
+        if physics_engine is not None:
+            self.physics = physics_engine(self.field)
+
+        self.teleop_start = autonomous_time + transition_time
+        if teleop_time > 0:
+            self.end_time = self.teleop_start + teleop_time
+        else:
+            self.end_time = autonomous_time
+
+        self.mode = None
+        self.match_time = None
+        self.last_tm = None
+        self.samples = []
+
+        #: The pyfrc FakeTime running the match (the ``fake_time`` fixture
+        #: in tests); only needed for delay_next_step.
+        self.clock = None
+
+        # wall clock time taken by the match
+        self.wall_time = 0
+        self._wall_start = None
+
+    def get_mode(self, match_time):
+        """
+        Which mode the robot is in at a match time.
+
+        Returns:
+            'disabled', 'autonomous' or 'teleop'; None once the match is
+            over.
+        """
+        if match_time < 0:
+            return 'disabled'
+        elif match_time < self.autonomous_time:
+            return 'autonomous'
+        elif match_time >= self.end_time:
+            return None
+        elif match_time < self.teleop_start:
+            return 'disabled'
+
+        return 'teleop'
+
+    def set_mode(self, mode):
+        if mode == 'autonomous':
+            game_message = None
+            if not self.script.game_message_delay:
+                game_message = self.script.game_message
+
+            mode_helpers.set_mode(
+                'auto', True, game_specific_message=game_message
+            )
+        elif mode == 'teleop':
+            mode_helpers.set_mode('teleop', True)
+        elif self.match_time < 0:
+            mode_helpers.set_mode('auto', False)
+        else:
+            mode_helpers.set_mode('teleop', False)
+
+        self.mode = mode
+        self.field.robot_enabled = hal_data['control']['enabled']
+
+    def delay_next_step(self, delay):
+        """
+        Make the next driver station packet (and so the next robot loop)
+        arrive ``delay`` seconds late, e.g. to simulate loop jitter.
+        """
+        self.clock.next_ds_time += delay
+
+    def on_step(self, tm):
+        """
+        Advance the match to fake time ``tm``.
+
+        Returns:
+            False when the match is over.
+        """
+        if self.last_tm is None:
+            self._wall_start = time.perf_counter()
+            self.script.setup()
+            last_match_time = float('-inf')
+        else:
+            last_match_time = self.match_time
+
+        self.match_time = tm - self.pre_match_time
+        mode = self.get_mode(self.match_time)
+
+        if mode is None:
+            self.wall_time = time.perf_counter() - self._wall_start
+            return False
+
+        self.script.apply(last_match_time, self.match_time)
+
+        if mode != self.mode:
+            self.set_mode(mode)
+
+        if self.physics is not None and self.last_tm is not None:
+            self.physics.update_sim(hal_data, tm, tm - self.last_tm)
+            self.samples.append(
+                MatchSample(self.match_time, mode, *self.field.get_position())
+            )
+
+        self.last_tm = tm
+        self.wall_time = time.perf_counter() - self._wall_start
+
+        if self.user_on_step is not None:
+            if self.user_on_step(self.match_time) is False:
+                return False
+
+        return True
+
+
+@contextlib.contextmanager
+def talon_notifiers_disabled():
+    """
+    Stop the simulated Talons from starting their 1ms closed loop threads.
+
+    physics.py runs the swerve Talons' closed loops itself, and waking eight
+    threads up every millisecond of fake time takes most of the time of a
+    simulated match.
+    """
+    from ctre._impl import MotController
+
+    notifier = MotController.Notifier
+    MotController.Notifier = None
+    try:
+        yield
+    finally:
+        MotController.Notifier = notifier
+
+
+def run_match(robot_class, script=None, physics_engine=None, setup=None,
+              **kwargs):
+    """
+    Run a match outside of pyfrc's test runner.
+
+    This sets up the simulated HAL, fake clock and NetworkTables the same way
+    pyfrc's tests do, and resets them afterwards, so it can be called
+    repeatedly (but not from inside a pyfrc test - use Match there). The
+    Talons' own closed loop threads are disabled for speed, so the physics
+    engine has to run the closed loops (physics.py does).
+
+    Args:
+        robot_class: the robot class to run, e.g. ``robot.Robot``.
+        script (MatchScript): inputs for the match.
+        physics_engine: PhysicsEngine class; defaults to the one in
+            physics.py.
+        setup: optional function called with the Match before the robot
+            code starts.
+        **kwargs: passed to Match.
+
+    Returns:
+        Match: the finished match.
+    """
+    import hal_impl
+    import wpilib
+    import wpilib._impl.utils
+    from pyfrc.test_support import fake_time, pyfrc_fake_hooks
+
+    if physics_engine is None:
+        import physics
+        physics_engine = physics.PhysicsEngine
+
+    clock = fake_time.FakeTime()
+    hal_impl.functions.hooks = pyfrc_fake_hooks.PyFrcFakeHooks(clock)
+
+    NetworkTables.startTestMode()
+    clock.initialize()
+    hal_impl.functions.reset_hal()
+
+    try:
+        wpilib.RobotBase.initializeHardwareConfiguration()
+        robot = robot_class()
+
+        match = Match(robot, script, physics_engine, **kwargs)
+        match.clock = clock
+        if setup is not None:
+            setup(match)
+
+        clock.ds_cond._on_step = match.on_step
+        clock.set_time_limit(match.pre_match_time + match.end_time + 1)
+
+        with talon_notifiers_disabled():
+            try:
+                robot.startCompetition()
+            except fake_time.TestEnded:
+                pass
+    finally:
+        clock.teardown()
+        wpilib._impl.utils.reset_wpilib()
+        NetworkTables.shutdown()
+
+    return match
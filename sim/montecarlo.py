@@ -0,0 +1,361 @@
+"""
+Monte Carlo evaluation of autonomous routines.
+
+Each autonomous routine is run from every starting position with every FMS
+game message, many times over, with random errors added to the simulation:
+
+- wheel slip: each wheel loses a random fraction of its speed on the carpet
+- encoders: each drive encoder gets a random scale error (wheel wear,
+  calibration) and noise on every reading
+- IMU drift: the navX heading drifts at a random rate
+- loop jitter: each robot loop runs up to a random amount late
+- FMS latency: the game message arrives a random time into autonomous
+
+Every case is also run once without any errors; a noisy run succeeds if it
+scores where the error-free run scored (or crosses the auto line, if the
+error-free run doesn't score). The trials are spread over a process pool,
+so a big batch can run overnight instead of taking practice field time::
+
+    python -m sim.montecarlo [trials per case] [processes]
+"""
+import importlib
+import itertools
+import math
+import multiprocessing
+import os
+import sys
+from collections import namedtuple
+import numpy as np
+
+#: Standard deviations (or maximums, for the uniform ones) of the errors
+#: added to a trial:
+#:
+#: - ``wheel_slip``: fraction of each wheel's speed lost (half-normal)
+#: - ``encoder_scale``: fractional scale error of each drive encoder
+#: - ``encoder_noise``: noise on each encoder reading, in ticks
+#: - ``imu_drift``: navX drift rate, in degrees / second
+#: - ``loop_jitter``: maximum lateness of each robot loop, in seconds
+#: - ``fms_latency``: maximum delay of the game message, in seconds
+NoiseModel = namedtuple('NoiseModel', [
+    'wheel_slip', 'encoder_scale', 'encoder_noise', 'imu_drift',
+    'loop_jitter', 'fms_latency',
+])
+
+no_noise = NoiseModel(0, 0, 0, 0, 0, 0)
+default_noise = NoiseModel(
+    wheel_slip=0.05, encoder_scale=0.02, encoder_noise=2, imu_drift=0.1,
+    loop_jitter=0.005, fms_latency=0.25,
+)
+
+#: An autonomous routine to evaluate. ``path`` is ``'module:Class'``, and
+#: ``params`` are attributes to override on the routine after it has been
+#: constructed (e.g. ``{'drive_speed': 200}``).
+Routine = namedtuple('Routine', ['name', 'path', 'params'])
+
+default_routines = [
+    Routine('baseline', 'autonomous.baseline_simple:Autonomous', {}),
+]
+
+#: Options of the 'Robot Starting Position' chooser.
+default_positions = ['Middle-Baseline', 'Middle-Placement', 'Left', 'Right']
+
+#: Game messages the FMS can send in 2018.
+default_game_messages = ['RRR', 'RLR', 'LRL', 'LLL']
+
+#: How far the robot has to drive to cross the auto line, in feet.
+auto_line_distance = 10
+
+#: Claw output below this counts as ejecting the cube.
+eject_power = -0.25
+
+Trial = namedtuple('Trial', [
+    'routine', 'position', 'game_message', 'seed', 'noise',
+])
+
+#: ``score_pose`` and ``final_pose`` are ``(x, y, angle)`` on the field, in
+#: feet and radians; ``score_time`` is seconds into autonomous.
+TrialResult = namedtuple('TrialResult', [
+    'trial', 'scored', 'score_time', 'score_pose', 'final_pose',
+])
+
+CaseSummary = namedtuple('CaseSummary', [
+    'routine', 'position', 'game_message', 'trials', 'success_rate',
+    'nominal_scored', 'score_time', 'pose_error', 'heading_error',
+])
+
+
+def load_routine(routine):
+    """
+    Get the autonomous class for a Routine, with its params applied.
+    """
+    module_name, class_name = routine.path.split(':')
+    cls = getattr(importlib.import_module(module_name), class_name)
+
+    if not routine.params:
+        return cls
+
+    params = dict(routine.params)
+
+    class TunedRoutine(cls):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+
+            for name, value in params.items():
+                setattr(self, name, value)
+
+    return TunedRoutine
+
+
+def run_trial(trial):
+    """
+    Run one autonomous period.
+
+    Returns:
+        TrialResult
+    """
+    import constants
+    import physics
+    import robot
+    from hal_impl.data import hal_data
+    from .match import MatchScript, run_match
+
+    noise = trial.noise
+    rng = np.random.RandomState(trial.seed)
+
+    script = MatchScript(
+        trial.game_message,
+        choices={'Robot Starting Position': trial.position},
+        game_message_delay=rng.uniform(0, noise.fms_latency)
+    )
+
+    n_wheels = len(constants.swerve_config)
+    wheel_slip = np.abs(rng.normal(0, noise.wheel_slip, n_wheels))
+    wheel_slip = np.minimum(wheel_slip, 0.9)
+    encoder_scale = 1 + rng.normal(0, noise.encoder_scale, n_wheels)
+    imu_drift = rng.normal(0, noise.imu_drift)
+
+    score = []
+
+    def setup(match):
+        engine = match.physics
+        engine.wheel_slip[:] = wheel_slip
+        engine.talons.sensor_scale[engine.drive] = encoder_scale
+        engine.talons.sensor_noise[engine.drive] = noise.encoder_noise
+        engine.talons.rng = rng
+
+        last_time = [None]
+
+        def on_step(match_time):
+            if match.mode != 'autonomous':
+                return
+
+            if last_time[0] is not None:
+                hal_data['robot'][physics.navx_angle_key] += (
+                    imu_drift * (match_time - last_time[0])
+                )
+            last_time[0] = match_time
+
+            claw = hal_data['CAN'].get(constants.claw_id)
+            if claw is not None and claw['value'] <= eject_power:
+                if not score:
+                    score.append((match_time, match.field.get_position()))
+
+            if noise.loop_jitter:
+                match.delay_next_step(rng.uniform(0, noise.loop_jitter))
+
+        match.user_on_step = on_step
+
+    autonomous = robot.Autonomous
+    robot.Autonomous = load_routine(trial.routine)
+    try:
+        match = run_match(robot.Robot, script, setup=setup, teleop_time=0)
+    finally:
+        robot.Autonomous = autonomous
+
+    final_pose = tuple(float(v) for v in match.field.get_position())
+
+    if score:
+        score_time, score_pose = score[0]
+        return TrialResult(
+            trial, True, score_time, tuple(float(v) for v in score_pose),
+            final_pose
+        )
+
+    return TrialResult(trial, False, None, None, final_pose)
+
+
+def is_success(result, nominal, score_tolerance):
+    """
+    Did a trial do what the error-free run of the same case did?
+
+    Args:
+        result (TrialResult): the trial.
+        nominal (TrialResult): the error-free run.
+        score_tolerance (float): how far from where the error-free run
+            scored the cube can be scored, in feet.
+    """
+    if nominal.scored:
+        if not result.scored:
+            return False
+
+        return math.hypot(
+            result.score_pose[0] - nominal.score_pose[0],
+            result.score_pose[1] - nominal.score_pose[1]
+        ) <= score_tolerance
+
+    return result.final_pose[0] >= auto_line_distance
+
+
+def _percentiles(values, q=(50, 90, 100)):
+    if len(values) == 0:
+        return None
+
+    return tuple(float(v) for v in np.percentile(values, q))
+
+
+def summarize(nominal_results, results, score_tolerance=1.5):
+    """
+    Work out the success rate and error distributions of each case.
+
+    Args:
+        nominal_results: error-free TrialResults, one per case.
+        results: the noisy TrialResults.
+        score_tolerance: see is_success.
+
+    Returns:
+        list of CaseSummary, in the order of ``nominal_results``. The time to
+        score and pose errors are ``(median, 90th percentile, maximum)``.
+    """
+    def case(result):
+        trial = result.trial
+        return (trial.routine.name, trial.position, trial.game_message)
+
+    by_case = {}
+    for result in results:
+        by_case.setdefault(case(result), []).append(result)
+
+    summaries = []
+    for nominal in nominal_results:
+        trials = by_case.get(case(nominal), [])
+
+        successes = [is_success(r, nominal, score_tolerance) for r in trials]
+        score_times = [r.score_time for r in trials if r.scored]
+
+        nx, ny, nangle = nominal.final_pose
+        pose_errors = [
+            math.hypot(r.final_pose[0] - nx, r.final_pose[1] - ny)
+            for r in trials
+        ]
+        heading_errors = [
+            abs(math.degrees(r.final_pose[2] - nangle)) for r in trials
+        ]
+
+        summaries.append(CaseSummary(
+            nominal.trial.routine.name, nominal.trial.position,
+            nominal.trial.game_message, len(trials),
+            np.mean(successes) if trials else 0.0,
+            nominal.scored,
+            _percentiles(score_times),
+            _percentiles(pose_errors),
+            _percentiles(heading_errors),
+        ))
+
+    return summaries
+
+
+def _init_worker():
+    # the robot code logs a lot; keep the workers quiet
+    devnull = open(os.devnull, 'w')
+    sys.stdout = devnull
+    sys.stderr = devnull
+
+    import logging
+    logging.disable(logging.WARNING)
+
+
+def evaluate(routines=None, positions=None, game_messages=None, trials=20,
+             noise=default_noise, processes=None, seed=0,
+             score_tolerance=1.5):
+    """
+    Run every routine from every position with every game message.
+
+    Args:
+        routines: list of Routine; defaults to ``default_routines``.
+        positions: starting positions; defaults to ``default_positions``.
+        game_messages: defaults to ``default_game_messages``.
+        trials (int): noisy runs per case.
+        noise (NoiseModel): the errors to add.
+        processes (int): size of the process pool; defaults to the number
+            of CPUs.
+        seed (int): seed of the first trial; the same seed always gives the
+            same results.
+        score_tolerance (float): see is_success.
+
+    Returns:
+        list of CaseSummary
+    """
+    cases = list(itertools.product(
+        routines or default_routines,
+        positions or default_positions,
+        game_messages or default_game_messages
+    ))
+
+    nominal = [
+        Trial(routine, position, message, seed, no_noise)
+        for routine, position, message in cases
+    ]
+    noisy = [
+        Trial(routine, position, message, seed + (i * trials) + j, noise)
+        for i, (routine, position, message) in enumerate(cases)
+        for j in range(trials)
+    ]
+
+    with multiprocessing.Pool(processes, initializer=_init_worker) as pool:
+        nominal_results = pool.map(run_trial, nominal)
+        results = pool.map(run_trial, noisy)
+
+    return summarize(nominal_results, results, score_tolerance)
+
+
+def format_report(summaries):
+    """
+    Format CaseSummaries as a table.
+    """
+    def fmt(values, scale=1):
+        if values is None:
+            return '{:>17}'.format('-')
+
+        return '{:5.1f} {:5.1f} {:5.1f}'.format(
+            *(v * scale for v in values)
+        )
+
+    lines = [
+        '{:<10} {:<16} {:<4} {:>6} {:>5}  {:>17}  {:>17}  {:>17}'.format(
+            'routine', 'position', 'fms', 'trials', 'ok%',
+            'score time (s)', 'pose err (in)', 'heading err (deg)'
+        ),
+    ]
+
+    for s in summaries:
+        lines.append(
+            '{:<10} {:<16} {:<4} {:>6} {:>5.0f}  {}  {}  {}'.format(
+                s.routine, s.position, s.game_message, s.trials,
+                s.success_rate * 100, fmt(s.score_time),
+                fmt(s.pose_error, 12), fmt(s.heading_error)
+            )
+        )
+
+    lines.append('(distributions are median / 90th percentile / maximum)')
+    return '\n'.join(lines)
+
+
+def main(trials=20, processes=None):
+    summaries = evaluate(
+        trials=int(trials),
+        processes=int(processes) if processes is not None else None
+    )
+    print(format_report(summaries))
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
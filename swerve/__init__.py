@@ -1,2 +1,7 @@
 from .swerve_drive import SwerveDrive  # noqa: F401
 from .swerve_module import SwerveModule  # noqa: F401
+from .odometry import SwerveOdometry  # noqa: F401
+from .heading import HeadingController  # noqa: F401
+from .velocity import VelocityEstimator  # noqa: F401
+from .traction import TractionMonitor  # noqa: F401
+from .characterization import DriveCharacterization  # noqa: F401
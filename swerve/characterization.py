@@ -0,0 +1,317 @@
+"""
+Drive motor feedforward characterization.
+
+Each module's drive is modelled as::
+
+    output = kS * sign(velocity) + kV * velocity + kA * acceleration
+
+with ``output`` in percent output (-1 to 1), ``velocity`` in native Talon
+units (ticks / 100ms) and ``acceleration`` in ticks / 100ms per second.
+:class:`DriveCharacterization` drives every module through slow
+(quasistatic) ramps and sudden steps, forwards and backwards, records how
+the wheels respond and fits the three gains by least squares. Fits that
+pass :func:`check_feedforward` are saved as the ``<module>-Drive kS/kV/kA``
+Preferences, which :meth:`swerve_module.SwerveModule.set_drive_speed` turns
+into the velocity loop's kF and an arbitrary feedforward.
+
+Run it in Test mode, with the robot on blocks (or in the simulator), after
+turning on ``Test: Drive Characterization``.
+"""
+from collections import namedtuple
+import numpy as np
+import wpilib
+
+#: Fitted feedforward gains for one module. ``r_squared`` is how much of the
+#: variation in output the fit explains, and ``samples`` how many data points
+#: it used.
+Feedforward = namedtuple('Feedforward', ['ks', 'kv', 'ka', 'r_squared',
+                                         'samples'])
+
+#: Plausible ranges for the fitted gains. kS can come out a little below zero
+#: from noise when there's hardly any static friction; 1 / kV is the free
+#: speed in ticks / 100ms; and kA / kV is the drive's time constant, in
+#: seconds.
+ks_limits = (-0.02, 0.3)
+kv_limits = (1 / 5000, 1 / 100)
+time_constant_limits = (0, 1)
+
+#: One phase of the routine: ``(name, duration, output(t))``, where ``t`` is
+#: the time since the phase started.
+Phase = namedtuple('Phase', ['name', 'duration', 'output'])
+
+
+def default_phases(ramp_rate=0.05, ramp_time=8, step_output=0.5,
+                   step_time=2, rest_time=1.5):
+    """
+    Get the standard sequence of phases: a quasistatic ramp and a step, in
+    each direction, with rests in between so the wheels stop.
+
+    Args:
+        ramp_rate (number): How fast the quasistatic ramps increase the
+            output, in percent output per second.
+        ramp_time (number): How long each ramp lasts, in seconds.
+        step_output (number): The output for the steps.
+        step_time (number): How long each step lasts, in seconds.
+        rest_time (number): How long to stop between phases, in seconds.
+    """
+    def rest(t):
+        return 0
+
+    phases = []
+    for direction, label in ((1, 'forwards'), (-1, 'backwards')):
+        phases += [
+            Phase('quasistatic ' + label, ramp_time,
+                  lambda t, d=direction: d * ramp_rate * t),
+            Phase('rest', rest_time, rest),
+            Phase('step ' + label, step_time,
+                  lambda t, d=direction: d * step_output),
+            Phase('rest', rest_time, rest),
+        ]
+
+    return phases
+
+
+def fit_feedforward(outputs, velocities, accelerations, min_velocity=1):
+    """
+    Fit kS, kV and kA by least squares.
+
+    Samples where the wheel is (nearly) stopped are left out: static
+    friction makes the output needed to hold still anything up to kS.
+
+    Args:
+        outputs, velocities, accelerations: Equal-length sequences of
+            samples, in the units described in this module's docstring.
+        min_velocity (number): Samples slower than this (in ticks / 100ms)
+            are left out.
+
+    Returns:
+        :data:`Feedforward`
+    """
+    outputs = np.asarray(outputs, dtype=np.float64)
+    velocities = np.asarray(velocities, dtype=np.float64)
+    accelerations = np.asarray(accelerations, dtype=np.float64)
+
+    moving = np.abs(velocities) >= min_velocity
+    outputs = outputs[moving]
+    velocities = velocities[moving]
+    accelerations = accelerations[moving]
+
+    if len(outputs) < 3:
+        raise ValueError(
+            'not enough moving samples to fit ({})'.format(len(outputs))
+        )
+
+    a = np.column_stack([np.sign(velocities), velocities, accelerations])
+    (ks, kv, ka), _, _, _ = np.linalg.lstsq(a, outputs, rcond=None)
+
+    residuals = outputs - a.dot((ks, kv, ka))
+    total = np.sum((outputs - np.mean(outputs)) ** 2)
+    r_squared = 1 - (np.sum(residuals ** 2) / total) if total > 0 else 0
+
+    return Feedforward(ks, kv, ka, r_squared, len(outputs))
+
+
+def check_feedforward(result, min_r_squared):
+    """
+    Check that a fit explains the data well enough, and that its gains are
+    plausible enough, to drive with.
+
+    Args:
+        result (:data:`Feedforward`): The fit to check.
+        min_r_squared (number): The lowest acceptable ``r_squared``.
+
+    Returns:
+        None if the fit is usable, otherwise why it isn't.
+    """
+    if not result.r_squared >= min_r_squared:
+        return 'r^2 {:.3f} is below {:.3f}'.format(
+            result.r_squared, min_r_squared
+        )
+
+    if not ks_limits[0] <= result.ks <= ks_limits[1]:
+        return 'kS {:.4f} is outside {}'.format(result.ks, ks_limits)
+
+    if not kv_limits[0] <= result.kv <= kv_limits[1]:
+        return 'kV {:.6f} is outside {}'.format(result.kv, kv_limits)
+
+    time_constant = result.ka / result.kv
+    if not time_constant_limits[0] <= time_constant <= time_constant_limits[1]:  # noqa: E501
+        return 'kA / kV {:.3f}s is outside {}'.format(
+            time_constant, time_constant_limits
+        )
+
+    return None
+
+
+def differentiate(times, positions):
+    """
+    Get velocities (ticks / 100ms) and accelerations (ticks / 100ms per
+    second) from timestamped drive positions.
+
+    The results are for each interval between two samples (so there's one
+    fewer of them than there are samples): the velocity is the average over
+    the interval, and the acceleration is taken at its midpoint.
+    """
+    times = np.asarray(times, dtype=np.float64)
+    positions = np.asarray(positions, dtype=np.float64)
+
+    if len(times) < 3:
+        return np.zeros(max(len(times) - 1, 0)), \
+            np.zeros(max(len(times) - 1, 0))
+
+    dt = np.diff(times)
+    velocities = np.diff(positions) / dt / 10
+    accelerations = np.gradient(velocities, times[:-1] + (dt / 2))
+
+    return velocities, accelerations
+
+
+class DriveCharacterization:
+    def __init__(self, drivetrain, phases=None):
+        """
+        Drives every swerve module through a sequence of open-loop outputs
+        and fits its feedforward gains.
+
+        Args:
+            drivetrain (:class:`swerve_drive.SwerveDrive`): The drivetrain to
+                characterize. All modules are run at once, pointing
+                forwards.
+            phases (list): The :data:`Phase` sequence to run. Defaults to
+                :func:`default_phases`.
+
+        Attributes:
+            results (dict): :data:`Feedforward` by module name, once
+                finished. Modules whose fit failed are left out.
+            finished (bool): Whether every phase has run.
+        """
+        self.drivetrain = drivetrain
+        self.phases = default_phases() if phases is None else phases
+
+        self.phase_index = 0
+        self.phase_start = None
+        self.finished = False
+        self.results = {}
+
+        # per phase: times, and per module (output, position) samples
+        self.__segments = []
+
+    @property
+    def phase(self):
+        if self.finished:
+            return None
+
+        return self.phases[self.phase_index]
+
+    def periodic(self, now=None):
+        """
+        Run one loop of the routine: record the last output's effect, and
+        apply the next one. Stops the modules and fits the results once
+        every phase is done.
+
+        Returns:
+            True once finished.
+        """
+        if self.finished:
+            return True
+
+        if now is None:
+            now = wpilib.Timer.getFPGATimestamp()
+
+        if self.phase_start is None:
+            self.phase_start = now
+            self.__segments.append(
+                ([], [[] for _ in self.drivetrain.modules])
+            )
+
+        elapsed = now - self.phase_start
+        if elapsed >= self.phase.duration:
+            self.phase_index += 1
+            self.phase_start = None
+
+            if self.phase_index >= len(self.phases):
+                self.drivetrain.immediate_stop()
+                self.finished = True
+                self.fit()
+                return True
+
+            return self.periodic(now)
+
+        output = self.phase.output(elapsed)
+        times, samples = self.__segments[-1]
+        times.append(now)
+
+        for module, module_samples in zip(self.drivetrain.modules, samples):
+            position = module.drive_talon.getQuadraturePosition()
+            if module.drive_reversed:
+                position *= -1
+
+            # a module steered backwards drives the other way
+            module.set_steer_angle(0)
+            if module.drive_temp_flipped:
+                module_samples.append((-output, position))
+            else:
+                module_samples.append((output, position))
+
+            module.set_drive_percent_out(output)
+
+        return False
+
+    def fit(self):
+        """
+        Fit every module's feedforward from the recorded samples.
+
+        Each sample pairs an output with the position read on the same
+        tick, just before that output was applied, so the output drove the
+        wheel until the next sample.
+        """
+        for i, module in enumerate(self.drivetrain.modules):
+            outputs = []
+            velocities = []
+            accelerations = []
+
+            for times, samples in self.__segments:
+                module_samples = samples[i]
+                if len(module_samples) < 4:
+                    continue
+
+                positions = [position for _, position in module_samples]
+                velocity, acceleration = differentiate(times, positions)
+
+                # skip the ends of the segment (one-sided differences)
+                for n in range(1, len(velocity) - 1):
+                    outputs.append(module_samples[n][0])
+                    velocities.append(velocity[n])
+                    accelerations.append(acceleration[n])
+
+            try:
+                self.results[module.name] = fit_feedforward(
+                    outputs, velocities, accelerations
+                )
+            except (ValueError, np.linalg.LinAlgError):
+                pass
+
+        return self.results
+
+    def save(self, min_r_squared):
+        """
+        Save the fitted gains that pass :func:`check_feedforward` to
+        Preferences.
+
+        Returns:
+            dict: Why each fit that wasn't saved was rejected, by module
+            name.
+        """
+        preferences = wpilib.Preferences.getInstance()
+        rejected = {}
+
+        for name, result in self.results.items():
+            problem = check_feedforward(result, min_r_squared)
+            if problem is not None:
+                rejected[name] = problem
+                continue
+
+            preferences.putFloat(name+'-Drive kS', result.ks)
+            preferences.putFloat(name+'-Drive kV', result.kv)
+            preferences.putFloat(name+'-Drive kA', result.ka)
+
+        return rejected
@@ -1,30 +1,3 @@
-swerve_defaults = {
-    'Back Left': {
-        'Sensor Reverse': True,
-        'Steer Sensor Reverse': True,
-        'Offset': -1643,
-        'Reversed': True,
-        'Steer Reversed': False
-    },
-    'Back Right': {
-        'Sensor Reverse': False,
-        'Steer Sensor Reverse': True,
-        'Offset': 992,
-        'Reversed': False,
-        'Steer Reversed': False
-    },
-    'Front Left': {
-        'Sensor Reverse': True,
-        'Steer Sensor Reverse': True,
-        'Offset': -1035,
-        'Reversed': True,
-        'Steer Reversed': False
-    },
-    'Front Right': {
-        'Sensor Reverse': False,
-        'Steer Sensor Reverse': False,
-        'Offset': 107,
-        'Reversed': False,
-        'Steer Reversed': True
-    },
-}
+# The per-module defaults are declared with the rest of the configuration
+# (see config/schema.py).
+from config.schema import module_defaults as swerve_defaults  # noqa: F401
@@ -0,0 +1,168 @@
+"""
+Closed-loop heading control for the swerve drive.
+"""
+import math
+import wpilib
+import config
+
+
+def wrap_angle(angle):
+    """
+    Wrap an angle in radians into :math:`[-\\pi, \\pi)`.
+    """
+    return ((angle + math.pi) % (2 * math.pi)) - math.pi
+
+
+class HeadingController(object):
+    def __init__(self, drivetrain, imu):
+        """
+        Turns the robot in place to a heading, or holds a heading while it
+        translates.
+
+        Headings are in the frame of
+        :meth:`sensors.imu.IMU.get_continuous_heading`. With ``Reverse
+        Heading Direction`` set up for the robot, that increases the
+        opposite way to the one a positive ``rotate_cw`` in
+        :meth:`swerve_drive.SwerveDrive.drive` turns the robot.
+
+        The yaw rate is worked out from successive headings, since the
+        navX's own rate is in degrees per sample rather than per second.
+
+        Args:
+            drivetrain (:class:`swerve_drive.SwerveDrive`): The drivetrain to
+                turn.
+            imu (:class:`sensors.imu.IMU`): The IMU to get the heading and
+                yaw rate from.
+
+        Attributes:
+            rotation_angles (list): The module angles (radians) for turning
+                in place, in module order. These only depend on the chassis
+                dimensions.
+            hold_target: The heading being held, or None if there isn't one
+                (yet).
+        """
+        self.drivetrain = drivetrain
+        self.imu = imu
+
+        # module angles from SwerveDrive.drive(0, 0, 1)
+        length = drivetrain.length / drivetrain.radius
+        width = drivetrain.width / drivetrain.radius
+        self.rotation_angles = [
+            math.atan2(-length, width),
+            math.atan2(-length, -width),
+            math.atan2(length, width),
+            math.atan2(length, -width),
+        ]
+
+        self.hold_target = None
+        self.last_heading = None
+        self.last_time = 0
+
+        self.load_config_values()
+
+    def load_config_values(self):
+        """
+        Cache the controller gains from the current config snapshot (see
+        :func:`config.get`).
+        """
+        cfg = config.get()
+
+        self.turn_kp = cfg.turn_kp
+        self.turn_kd = cfg.turn_kd
+        self.turn_min_speed = cfg.turn_min_wheel_speed
+        self.turn_max_speed = cfg.turn_max_wheel_speed
+        self.turn_tolerance = math.radians(cfg.turn_tolerance)
+
+        self.hold_kp = cfg.heading_hold_kp
+        self.hold_kd = cfg.heading_hold_kd
+        self.hold_max_output = cfg.heading_hold_max_output
+        self.hold_settle_rate = cfg.heading_hold_settle_rate
+
+    def read(self):
+        """
+        Get the heading and yaw rate.
+
+        Returns:
+            ``(heading, rate)``, in radians and radians / second. The rate
+            is 0 if the last reading is more than 0.1 seconds old.
+        """
+        heading = self.imu.get_continuous_heading()
+        now = wpilib.Timer.getFPGATimestamp()
+
+        dt = now - self.last_time
+        if self.last_heading is None or dt <= 0 or dt > 0.1:
+            rate = 0
+        else:
+            rate = (heading - self.last_heading) / dt
+
+        self.last_heading = heading
+        self.last_time = now
+
+        return heading, rate
+
+    def turn_to_angle(self, target_angle):
+        """
+        Turn the robot in place towards a heading, taking the shortest way
+        round. Call this every loop until it returns True.
+
+        Args:
+            target_angle (number): The heading to turn to, in radians. Only
+                the direction matters; it doesn't have to be in the same
+                revolution as the current heading.
+
+        Returns:
+            True (and stops the drive motors) once the robot is within the
+            ``Turn Error Tolerance`` of the target.
+        """
+        heading, rate = self.read()
+        err = wrap_angle(target_angle - heading)
+
+        if abs(err) < self.turn_tolerance:
+            for module in self.drivetrain.modules:
+                module.set_drive_speed(0, True)
+            return True
+
+        # turning clockwise (positive speed) decreases the heading
+        spd = (self.turn_kd * rate) - (self.turn_kp * err)
+        spd = math.copysign(
+            min(max(abs(spd), self.turn_min_speed), self.turn_max_speed), spd
+        )
+
+        modules = self.drivetrain.modules
+        for module, angle in zip(modules, self.rotation_angles):
+            module.set_steer_angle(angle)
+            module.set_drive_speed(spd, True)
+
+        return False
+
+    def hold(self):
+        """
+        Get the rotation needed to hold the robot's heading while it
+        translates.
+
+        The heading to hold is taken once the robot has (nearly) stopped
+        turning, so it doesn't get pulled back after the driver lets go of
+        the rotation control.
+
+        Returns:
+            A ``rotate_cw`` value for :meth:`swerve_drive.SwerveDrive.drive`.
+        """
+        heading, rate = self.read()
+
+        if self.hold_target is None:
+            if abs(rate) > self.hold_settle_rate:
+                return 0
+
+            self.hold_target = heading
+
+        err = wrap_angle(self.hold_target - heading)
+        output = (self.hold_kd * rate) - (self.hold_kp * err)
+
+        return math.copysign(min(abs(output), self.hold_max_output), output)
+
+    def release(self):
+        """
+        Stop holding the current heading, e.g. while the driver is turning
+        or after the IMU has been zeroed. :meth:`hold` picks a new one.
+        """
+        self.hold_target = None
@@ -0,0 +1,168 @@
+"""
+Dead-reckoning position tracking for the swerve drive.
+"""
+import math
+import config
+from sensors.pose_history import Pose
+
+#: Drive encoder ticks per inch of wheel travel
+#: (80 * 6.67 ticks per wheel rotation, 4 inch wheels).
+drive_ticks_per_inch = (80 * 6.67) / (4 * math.pi)
+
+
+def module_positions(drivetrain):
+    """
+    Get where each swerve module is relative to the chassis centre.
+
+    Args:
+        drivetrain (:class:`swerve_drive.SwerveDrive`): The drivetrain. The
+            positions are in the units of its chassis dimensions (inches).
+
+    Returns:
+        ``(forward, right)``: lists of each module's offsets, in module
+        order.
+    """
+    forward = [
+        (1 if module.name.startswith('Front') else -1)
+        * (drivetrain.length / 2)
+        for module in drivetrain.modules
+    ]
+    right = [
+        (1 if module.name.endswith('Right') else -1)
+        * (drivetrain.width / 2)
+        for module in drivetrain.modules
+    ]
+
+    return forward, right
+
+
+class SwerveOdometry:
+    def __init__(self, drivetrain, imu, ticks_per_inch=drive_ticks_per_inch):
+        """
+        Tracks the robot's position on the field by combining each swerve
+        module's drive distance and steering angle with the IMU heading.
+
+        Args:
+            drivetrain (:class:`swerve_drive.SwerveDrive`): The drivetrain to
+                track.
+            imu (:class:`sensors.imu.IMU`): The IMU to get the robot heading
+                from.
+            ticks_per_inch (number): Drive encoder ticks per inch of wheel
+                travel.
+
+        Attributes:
+            pose (:class:`sensors.pose_history.Pose`): The current estimated
+                pose. Positions are in inches from where the robot was when
+                this object was created (or last reset).
+            last_angles (list): Each module's steering angle (radians) at
+                the last update.
+            displacement: ``(forward, right)``, how far the robot moved
+                (in inches, in the robot frame) at the last update.
+            traction (:class:`traction.TractionMonitor`): If set, modules
+                it flagged as slipping at its last update are left out.
+        """
+        self.drivetrain = drivetrain
+        self.imu = imu
+        self.ticks_per_inch = ticks_per_inch
+        self.traction = None
+        self.last_angles = [0] * len(drivetrain.modules)
+        self.displacement = (0, 0)
+        self.module_forward, self.module_right = module_positions(drivetrain)
+
+        self.pose = Pose(0, 0, self.read_heading())
+        self.last_heading = self.pose.heading
+        self.last_positions = self.__read_positions()
+
+    def read_heading(self):
+        """
+        Get the continuous IMU heading, clockwise positive (the convention
+        the module positions and :class:`sensors.pose_history.Pose` use)
+        whether or not ``Reverse Heading Direction`` is set.
+        """
+        heading = self.imu.get_continuous_heading()
+        if config.get().reverse_heading:
+            heading *= -1
+
+        return heading
+
+    def __read_positions(self):
+        return [
+            module.drive_talon.getQuadraturePosition()
+            for module in self.drivetrain.modules
+        ]
+
+    def reset(self, pose=None):
+        """
+        Reset the tracked position.
+
+        Args:
+            pose (:class:`sensors.pose_history.Pose`): The pose to reset to.
+                Defaults to the origin, with the current IMU heading.
+        """
+        if pose is None:
+            pose = Pose(0, 0, self.read_heading())
+
+        self.pose = pose
+        self.last_heading = self.read_heading()
+        self.last_positions = self.__read_positions()
+
+    def update(self):
+        """
+        Integrate module motion since the last call. Call this once per loop.
+
+        Returns:
+            The updated :class:`sensors.pose_history.Pose`.
+        """
+        heading = self.read_heading()
+        positions = self.__read_positions()
+
+        slipping = None
+        if self.traction is not None and not all(self.traction.slipping):
+            slipping = self.traction.slipping
+
+        # Average the module displacements in the robot frame, after taking
+        # off each module's share of the rotation measured by the IMU
+        # (clockwise, see read_heading()). With all four modules the rotation
+        # would cancel out anyway, but not when one is left out.
+        rotation = heading - self.last_heading
+
+        forward = 0
+        right = 0
+        n_modules = 0
+        for i, (module, pos, last_pos, fwd_pos, right_pos) in enumerate(zip(
+            self.drivetrain.modules, positions, self.last_positions,
+            self.module_forward, self.module_right
+        )):
+            angle = module.get_steer_angle()
+            self.last_angles[i] = angle
+
+            if slipping is not None and slipping[i]:
+                continue
+
+            dist = (pos - last_pos) / self.ticks_per_inch
+            if module.drive_reversed:
+                dist *= -1
+
+            forward += (dist * math.cos(angle)) + (rotation * right_pos)
+            right += (dist * math.sin(angle)) - (rotation * fwd_pos)
+            n_modules += 1
+
+        forward /= n_modules
+        right /= n_modules
+        self.displacement = (forward, right)
+
+        # Rotate into the field frame using the heading halfway through the
+        # tick.
+        mid_heading = (self.pose.heading + heading) / 2
+        cos_h = math.cos(mid_heading)
+        sin_h = math.sin(mid_heading)
+
+        self.pose = Pose(
+            self.pose.x + (forward * cos_h) - (right * sin_h),
+            self.pose.y + (forward * sin_h) + (right * cos_h),
+            heading
+        )
+        self.last_positions = positions
+        self.last_heading = heading
+
+        return self.pose
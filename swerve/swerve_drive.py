@@ -4,6 +4,8 @@ Implements a full swerve drive.
 import wpilib
 import math
 import numpy as np
+import config
+from .heading import HeadingController
 from .swerve_module import SwerveModule
 
 
@@ -47,8 +49,8 @@ class SwerveDrive(object):
         """
 
         self.modules = []
-        for config in config_tuples:
-            self.modules.append(SwerveModule(*config))
+        for module_config in config_tuples:
+            self.modules.append(SwerveModule(*module_config))
 
         self.length = length
         self.width = width
@@ -68,6 +70,14 @@ class SwerveDrive(object):
         # autonomous code would fail to function properly anyways.
         self.fallback_to_pct_out = False
 
+        #: The :class:`heading.HeadingController` used by turn_to_angle().
+        self.heading_controller = None
+
+        #: A :class:`traction.TractionMonitor`, if there is one. Slipping
+        #: modules are left out of get_module_distances(), and driven more
+        #: gently by drive() if that's enabled.
+        self.traction = None
+
     def drive(self, forward, strafe, rotate_cw, max_wheel_speed=370):
         """
         Compute and apply module angles and speeds to achieve a given
@@ -98,6 +108,10 @@ class SwerveDrive(object):
         if np.amax(speeds) > 1:
             speeds /= np.amax(speeds)
 
+        if self.traction is not None and self.traction.limit_output:
+            for i in range(len(speeds)):
+                speeds[i] *= self.traction.get_output_scale(i)
+
         # back-right, back-left, front-right, front-left?
         for module, angle, speed in zip(self.modules, angles, speeds):
             if self.fallback_to_pct_out:
@@ -111,62 +125,15 @@ class SwerveDrive(object):
                 )
 
     def turn_to_angle(self, imu, target_angle):
-        prefs = wpilib.Preferences.getInstance()
-
-        min_wheel_speed = prefs.getFloat('Turn Min Wheel Speed', 25)
-        max_wheel_speed = prefs.getFloat('Turn Max Wheel Speed', 100)
-        kP = prefs.getFloat('Turn kP', 50/math.pi)
-        kD = prefs.getFloat('Turn kD', 5)
-        tol = prefs.getFloat('Turn Error Tolerance', 1)
-
-        hdg = imu.get_continuous_heading()
-        n_rotations = math.trunc(hdg / (2*math.pi))
-        rate = imu.get_yaw_rate() * (math.pi / 180)
-
-        target_angle += (n_rotations * 2 * math.pi)
-
-        prefs = wpilib.Preferences.getInstance()
-        if prefs.getBoolean('Reverse Heading Direction', False):
-            target_angle += math.pi
-
-        err = target_angle - hdg
-
-        if err < 0:
-            rate *= -1
-
-        spd = (kP * err) - (kD * rate)
-        if abs(spd) < min_wheel_speed:
-            if spd < 0:
-                spd = -min_wheel_speed
-            else:
-                spd = min_wheel_speed
-
-        if abs(spd) > max_wheel_speed:
-            if spd < 0:
-                spd = -max_wheel_speed
-            else:
-                spd = max_wheel_speed
-
-        if math.degrees(abs(err)) < tol:
-            for module in self.modules:
-                module.set_drive_speed(0, True)
-            return True
-
-        a = -1 * (self.length / self.radius)
-        b = (self.length / self.radius)
-        c = -1 * (self.width / self.radius)
-        d = (self.width / self.radius)
-
-        t1 = np.array([a, a, b, b])
-        t2 = np.array([d, c, d, c])
-
-        angles = np.arctan2(t1, t2)
-
-        for module, angle in zip(self.modules, angles):
-            module.set_steer_angle(angle)
-            module.set_drive_speed(spd, True)
+        """
+        Turn in place towards a heading.
+        See :meth:`heading.HeadingController.turn_to_angle`.
+        """
+        if self.heading_controller is None or \
+                self.heading_controller.imu is not imu:
+            self.heading_controller = HeadingController(self, imu)
 
-        return False
+        return self.heading_controller.turn_to_angle(target_angle)
 
     def set_all_module_angles(self, angle_rad):
         for module in self.modules:
@@ -190,11 +157,34 @@ class SwerveDrive(object):
             module.set_drive_distance(dist_ticks)
 
     def get_module_distances(self):
-        return [
-            abs(module.drive_talon.getQuadraturePosition())
+        """
+        Get the distance (in encoder ticks) each module has driven since the
+        drive positions were last reset.
+
+        If there's a traction monitor, the distance each module slipped is
+        taken off, and modules that are slipping right now are left out
+        (unless they all are).
+        """
+        positions = [
+            module.drive_talon.getQuadraturePosition()
             for module in self.modules
         ]
 
+        if self.traction is None:
+            return [abs(pos) for pos in positions]
+
+        distances = [
+            abs(pos - slip)
+            for pos, slip in zip(positions, self.traction.slip_ticks)
+        ]
+
+        gripping = [
+            dist for dist, slipping in zip(distances, self.traction.slipping)
+            if not slipping
+        ]
+
+        return gripping or distances
+
     def get_closed_loop_error(self):
         return [
             module.steer_talon.getClosedLoopError(0)
@@ -205,6 +195,31 @@ class SwerveDrive(object):
         for module in self.modules:
             module.reset_drive_position()
 
+        if self.traction is not None:
+            self.traction.reset_slip_ticks()
+
+    def get_status_frame_rates(self):
+        """
+        Get the status frame declarations for every module's Talons.
+        See :meth:`swerve_module.SwerveModule.get_status_frame_rates`.
+        """
+        rates = []
+        for module in self.modules:
+            rates.extend(module.get_status_frame_rates())
+
+        return rates
+
+    def get_talon_config(self):
+        """
+        Get the persistent configuration for every module's Talons.
+        See :meth:`swerve_module.SwerveModule.get_talon_config`.
+        """
+        talon_config = []
+        for module in self.modules:
+            talon_config.extend(module.get_talon_config())
+
+        return talon_config
+
     def save_config_values(self):
         """
         Save configuration values for all modules within this swerve drive.
@@ -216,12 +231,13 @@ class SwerveDrive(object):
         """
         Load configuration values for all modules within this swerve drive.
         """
-        preferences = wpilib.Preferences.getInstance()
+        self.fallback_to_pct_out = config.get().fallback_to_pct_out
 
-        self.fallback_to_pct_out = preferences.getBoolean(
-            "Swerve: Disable Velocity Control",
-            False
-        )
+        if self.heading_controller is not None:
+            self.heading_controller.load_config_values()
+
+        if self.traction is not None:
+            self.traction.load_config_values()
 
         for module in self.modules:
             module.load_config_values()
@@ -5,9 +5,10 @@ import numpy as np
 import wpilib
 import math
 
-from .constants import swerve_defaults
+import config
 
 ControlMode = TalonSRX.ControlMode
+DemandType = TalonSRX.DemandType
 FeedbackDevice = TalonSRX.FeedbackDevice
 
 
@@ -23,6 +24,22 @@ _enable_debug_dashboard_values = False
 
 
 class SwerveModule(object):
+    #: Status frame periods (in ms) for the signals we read from each Talon.
+    #: See :mod:`canbus.status_frames`.
+    steer_status_frames = {
+        'general': 100,
+        'feedback': 20,  # steer position, read on every set_steer_angle()
+        'analog': 500,  # raw ADC reading, dashboard only
+        'closed_loop': 100,  # steer error, used by autonomous
+    }
+
+    drive_status_frames = {
+        'general': 100,
+        'feedback': 100,  # drive current, dashboard only
+        'quadrature': 20,  # drive distance, read by autonomous every tick
+        'closed_loop': 500,  # drive error, dashboard only
+    }
+
     def __init__(self, name, steer_id, drive_id):
         """
         Performs calculations and bookkeeping for a single swerve module.
@@ -53,19 +70,8 @@ class SwerveModule(object):
         self.steer_talon = TalonSRX(steer_id)
         self.drive_talon = TalonSRX(drive_id)
 
-        # Configure steering motors to use abs. encoders
-        # and closed-loop control
-        self.steer_talon.selectProfileSlot(0, 0)
-        self.steer_talon.configSelectedFeedbackSensor(FeedbackDevice.Analog, 0, 0)  # noqa: E501
-        self.steer_talon.configAllowableClosedloopError(
-            0, math.ceil(_acceptable_steer_err), 0
-        )
-
-        self.drive_talon.configSelectedFeedbackSensor(FeedbackDevice.QuadEncoder, 0, 0)  # noqa: E501
-        self.drive_talon.setQuadraturePosition(0, 0)
-        self.drive_talon.configAllowableClosedloopError(
-            0, math.ceil(_acceptable_drive_err), 0
-        )
+        # The Talons' persistent settings are sent (and checked) by a
+        # canbus.TalonConfigurator; see get_talon_config().
 
         self.name = name
         self.steer_target = 0
@@ -76,55 +82,103 @@ class SwerveModule(object):
         self.raw_drive_speeds = []
         self.raw_target = 0
 
+        # Last (ramped) velocity target, when it was set and whether the
+        # wheel was flipped at the time, for the kA feedforward. Cleared
+        # whenever the drive is run some other way.
+        self.last_drive_target = 0
+        self.last_drive_time = None
+        self.last_drive_flipped = False
+
+        # Sensor phase and inversion, and the velocity loop's kF, as last
+        # sent to the Talons.
+        self.talon_config = None
+        self.sent_drive_kf = None
+
         self.load_config_values()
 
+    def get_talon_config(self):
+        """
+        Get the persistent configuration for this module's Talons, as
+        ``(talon, settings)`` tuples. See :mod:`canbus.configurator`.
+
+        The steering motors use the absolute encoders and closed-loop
+        control; the drive motors use the quadrature encoders, starting from
+        zero.
+        """
+        return [
+            (self.steer_talon, {
+                'feedback_sensor': FeedbackDevice.Analog,
+                'allowable_error': math.ceil(_acceptable_steer_err),
+            }),
+            (self.drive_talon, {
+                'feedback_sensor': FeedbackDevice.QuadEncoder,
+                'allowable_error': math.ceil(_acceptable_drive_err),
+                'quadrature_position': 0,
+            }),
+        ]
+
+    def get_status_frame_rates(self):
+        """
+        Get the status frame declarations for this module's Talons, as
+        ``(talon, signal_rates)`` tuples.
+        """
+        return [
+            (self.steer_talon, self.steer_status_frames),
+            (self.drive_talon, self.drive_status_frames),
+        ]
+
     def load_config_values(self):
         """
-        Load saved configuration values for this module via WPILib's
-        Preferences interface.
+        Load this module's configuration values from the current config
+        snapshot (see :func:`config.get`).
 
         The key names are derived from the name passed to the
-        constructor.
+        constructor. Sensor phase, inversion and the drive velocity loop's
+        kF are only sent to the Talons when they change.
         """
         self.steer_talon.selectProfileSlot(0, 0)
 
-        preferences = wpilib.Preferences.getInstance()
-
-        self.max_speed = preferences.getFloat(
-            self.name+'-Max Wheel Speed',
-            370
-        )
+        module_config = config.get().modules[self.name]
 
-        self.drive_talon.setSensorPhase(preferences.getBoolean(
-            self.name+'-Sensor Reverse',
-            swerve_defaults[self.name]['Sensor Reverse']
-        ))
+        self.max_speed = module_config.max_speed
+        self.steer_offset = module_config.offset
 
-        self.steer_talon.setSensorPhase(preferences.getBoolean(
-            self.name+'-Steer Sensor Reverse',
-            swerve_defaults[self.name]['Steer Sensor Reverse']
-        ))
-
-        self.steer_offset = preferences.getFloat(
-            self.name+'-offset',
-            swerve_defaults[self.name]['Offset']
-        )
+        # Feedforward gains from swerve.characterization. Without them, kF
+        # just scales the target speed by the module's max speed.
+        self.drive_ks = module_config.drive_ks
+        self.drive_ka = module_config.drive_ka
+        if module_config.drive_kv > 0:
+            self.drive_kf = module_config.drive_kv * 1023
+        else:
+            self.drive_kf = 1023 / self.max_speed
 
         self.steer_min = 0
         self.steer_max = 1024
         self.steer_range = 1024
 
-        self.drive_reversed = preferences.getBoolean(
-            self.name+'-reversed',
-            swerve_defaults[self.name]['Reversed']
-        )
+        self.drive_reversed = module_config.reversed
+        self.steer_reversed = module_config.steer_reversed
 
-        self.steer_reversed = preferences.getBoolean(
-            self.name+'-steer-reversed',
-            swerve_defaults[self.name]['Steer Reversed']
+        talon_config = (
+            module_config.sensor_reverse,
+            module_config.steer_sensor_reverse,
+            module_config.steer_reversed
         )
 
-        self.steer_talon.setInverted(self.steer_reversed)
+        if talon_config != self.talon_config:
+            self.drive_talon.setSensorPhase(module_config.sensor_reverse)
+            self.steer_talon.setSensorPhase(
+                module_config.steer_sensor_reverse
+            )
+            self.steer_talon.setInverted(self.steer_reversed)
+
+            self.talon_config = talon_config
+
+        # set_drive_speed() uses profile slot 1 (slot 0 is the position loop
+        # used by set_drive_distance())
+        if self.drive_kf != self.sent_drive_kf:
+            self.drive_talon.config_kF(1, self.drive_kf, 0)
+            self.sent_drive_kf = self.drive_kf
 
     def save_config_values(self):
         """
@@ -145,7 +199,7 @@ class SwerveModule(object):
         Get the current angular position of the swerve module in
         radians.
         """
-        native_units = self.steer_talon.getSelectedSensorPosition()
+        native_units = self.steer_talon.getSelectedSensorPosition(0)
         native_units -= self.steer_offset
 
         # Position in rotations
@@ -165,14 +219,11 @@ class SwerveModule(object):
             angle_radians (number): The angle to steer towards in radians,
                 where 0 points in the chassis forward direction.
         """
-        n_rotations = math.trunc(
-            (self.steer_talon.getSelectedSensorPosition(0) - self.steer_offset)
-            / self.steer_range
-        )
+        current_pos = self.steer_talon.getSelectedSensorPosition(0)
+        current_pos -= self.steer_offset
 
-        current_angle = self.steer_talon.getSelectedSensorPosition(0)
-        current_angle -= self.steer_offset
-        current_angle *= (math.pi / 512)
+        n_rotations = math.trunc(current_pos / self.steer_range)
+        current_angle = current_pos * (math.pi / 512)
 
         adjusted_target = angle_radians + (n_rotations * 2 * math.pi)
 
@@ -223,14 +274,82 @@ class SwerveModule(object):
             speed *= -1
 
         self.drive_talon.selectProfileSlot(1, 0)
-        self.drive_talon.config_kF(0, 1023 / self.max_speed, 0)
 
-        if direct:
+        if not direct:
+            speed *= self.max_speed
+
+        if self.drive_ks == 0 and self.drive_ka == 0:
             self.drive_talon.set(ControlMode.Velocity, speed)
-        else:
-            self.drive_talon.set(ControlMode.Velocity, speed * self.max_speed)
+            return
+
+        # A flip reverses the target without the wheel changing speed, so
+        # the target's history doesn't say anything about acceleration.
+        if self.drive_temp_flipped != self.last_drive_flipped:
+            self.last_drive_time = None
+            self.last_drive_flipped = self.drive_temp_flipped
+
+        # static friction, and the output needed to accelerate to the new
+        # target
+        now = wpilib.Timer.getFPGATimestamp()
+        accel = 0
+        if self.last_drive_time is not None:
+            dt = now - self.last_drive_time
+            if 0 < dt < 0.1:
+                speed = self.ramp_drive_target(speed, dt)
+                accel = (speed - self.last_drive_target) / dt
+
+        self.last_drive_target = speed
+        self.last_drive_time = now
+
+        feedforward = (self.drive_ka * accel)
+        if speed > 0:
+            feedforward += self.drive_ks
+        elif speed < 0:
+            feedforward -= self.drive_ks
+
+        feedforward = max(min(feedforward, 1), -1)
+
+        self.drive_talon.set(
+            ControlMode.Velocity, speed,
+            DemandType.ArbitraryFeedForward, feedforward
+        )
+
+    def ramp_drive_target(self, speed, dt):
+        """
+        Limit how far the velocity target moves from the last one in ``dt``
+        seconds, to what the motor can do at full output given the drive
+        feedforward gains.
+
+        Without this a step in the target would ask for a huge kA term for
+        one tick (and then none), which the motor can't follow anyway.
+
+        Args:
+            speed (number): The new target, in ticks / 100ms.
+            dt (number): Seconds since the last target was set.
+
+        Returns:
+            number: The ramped target.
+        """
+        if self.drive_ka <= 0:
+            return speed
+
+        last = self.last_drive_target
+        kv = self.drive_kf / 1023
+
+        # output left over (either way) once static friction and the back
+        # EMF at the current speed are paid for
+        holding = (kv * last) + math.copysign(self.drive_ks, last)
+        if last == 0:
+            holding = 0
+
+        max_accel = (1 - holding) / self.drive_ka
+        min_accel = (-1 - holding) / self.drive_ka
+
+        return last + max(min(speed - last, max_accel * dt), min_accel * dt)
 
     def set_drive_percent_out(self, pct_out):
+        self.last_drive_time = None
+
         if self.drive_reversed:
             pct_out *= -1
 
@@ -240,6 +359,8 @@ class SwerveModule(object):
         self.drive_talon.set(ControlMode.PercentOutput, pct_out)
 
     def set_drive_distance(self, ticks):
+        self.last_drive_time = None
+
         if self.drive_reversed:
             ticks *= -1
 
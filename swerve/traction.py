@@ -0,0 +1,194 @@
+"""
+Wheel slip detection for the swerve drive.
+
+Each module's wheel velocity (from :class:`velocity.VelocityEstimator`) is
+compared with the velocity the module *should* have, given how the rest of
+the chassis is moving: the translation agreed on by the other modules, plus
+the rotation measured by the IMU. A module that is spinning freely, or being
+dragged sideways by a pushing robot, disagrees with the others and is
+flagged as slipping.
+"""
+import math
+import wpilib
+import config
+from .odometry import drive_ticks_per_inch, module_positions
+
+
+def _median(values):
+    values = sorted(values)
+    mid = len(values) // 2
+
+    if len(values) % 2:
+        return values[mid]
+
+    return (values[mid - 1] + values[mid]) / 2
+
+
+class TractionMonitor:
+    def __init__(self, drivetrain, velocity,
+                 ticks_per_inch=drive_ticks_per_inch):
+        """
+        Flags slipping swerve modules, so they can be left out of odometry
+        and distance measurements, and (optionally) driven more gently until
+        they grip again.
+
+        Args:
+            drivetrain (:class:`swerve_drive.SwerveDrive`): The drivetrain to
+                watch. Its chassis dimensions must be in inches.
+            velocity (:class:`velocity.VelocityEstimator`): Where to get the
+                module wheel velocities from.
+            ticks_per_inch (number): Drive encoder ticks per inch of wheel
+                travel.
+
+        Attributes:
+            slipping (list): Whether each module is currently slipping.
+            slip_ticks (list): For each module, how many drive encoder ticks
+                (raw, as read from the Talon) were due to slipping since the
+                drive positions were last reset.
+            residuals (list): How far (in inches / second) each module's
+                velocity was from the chassis motion at the last update.
+        """
+        self.drivetrain = drivetrain
+        self.velocity = velocity
+        self.ticks_per_inch = ticks_per_inch
+
+        # module positions relative to the chassis centre, in inches
+        self.module_forward, self.module_right = module_positions(drivetrain)
+
+        n_modules = len(drivetrain.modules)
+        self.slipping = [False] * n_modules
+        self.slip_ticks = [0] * n_modules
+        self.residuals = [0] * n_modules
+
+        self.last_heading = None
+        self.last_time = None
+
+        self.load_config_values()
+
+    def load_config_values(self):
+        """
+        Load the slip thresholds from the current config snapshot (see
+        :func:`config.get`).
+        """
+        cfg = config.get()
+
+        self.slip_threshold = cfg.slip_threshold
+        self.slip_ratio = cfg.slip_ratio
+        self.limit_output = cfg.traction_control
+        self.slipping_output_scale = cfg.slipping_output_scale
+
+    def reset(self):
+        """
+        Clear the slip flags and the per-tick state, e.g. when the robot is
+        re-enabled.
+        """
+        self.last_heading = None
+        self.last_time = None
+
+        for i in range(len(self.slipping)):
+            self.slipping[i] = False
+            self.residuals[i] = 0
+
+    def reset_slip_ticks(self):
+        """
+        Forget accumulated slip, when the drive positions are reset.
+        """
+        for i in range(len(self.slip_ticks)):
+            self.slip_ticks[i] = 0
+
+    def update(self, angles, heading, timestamp):
+        """
+        Check every module for slip. Call this once per loop, after updating
+        the velocity estimator.
+
+        Args:
+            angles (list): Each module's steering angle (radians), as read
+                by :class:`odometry.SwerveOdometry`.
+            heading (number): The robot heading, in radians (clockwise
+                positive, as in :class:`sensors.pose_history.Pose`).
+            timestamp (number): When the sensors were read, in seconds.
+        """
+        last_heading, last_time = self.last_heading, self.last_time
+        self.last_heading = heading
+        self.last_time = timestamp
+
+        if last_time is None:
+            return
+
+        dt = timestamp - last_time
+        if dt <= 0 or dt > self.velocity.max_dt:
+            return
+
+        # clockwise, like the heading (see sensors.pose_history.Pose)
+        rotation = (heading - last_heading) / dt
+
+        # each module's velocity, and the chassis translation it implies
+        measured = []
+        translations_fwd = []
+        translations_right = []
+        for vel, angle, fwd_pos, right_pos in zip(
+            self.velocity.velocities, angles, self.module_forward,
+            self.module_right
+        ):
+            v_fwd = vel * math.cos(angle)
+            v_right = vel * math.sin(angle)
+            measured.append((v_fwd, v_right, angle))
+            translations_fwd.append(v_fwd + (rotation * right_pos))
+            translations_right.append(v_right - (rotation * fwd_pos))
+
+        n_modules = len(measured)
+        for i, (v_fwd, v_right, angle) in enumerate(measured):
+            # the chassis translation according to the other modules
+            others = [j for j in range(n_modules) if j != i]
+            trans_fwd = _median([translations_fwd[j] for j in others])
+            trans_right = _median([translations_right[j] for j in others])
+
+            expected_fwd = trans_fwd - (rotation * self.module_right[i])
+            expected_right = trans_right + (rotation * self.module_forward[i])
+
+            residual = math.hypot(
+                v_fwd - expected_fwd, v_right - expected_right
+            )
+            limit = self.slip_threshold + (
+                self.slip_ratio * math.hypot(expected_fwd, expected_right)
+            )
+
+            # hysteresis, so a module doesn't flicker in and out
+            if self.slipping[i]:
+                limit /= 2
+
+            self.residuals[i] = residual
+            self.slipping[i] = residual > limit
+
+            if self.slipping[i]:
+                # wheel travel not matched by the chassis
+                expected_vel = (expected_fwd * math.cos(angle)) + (
+                    expected_right * math.sin(angle)
+                )
+                excess = (
+                    (self.velocity.velocities[i] - expected_vel)
+                    * dt * self.ticks_per_inch
+                )
+                if self.drivetrain.modules[i].drive_reversed:
+                    excess *= -1
+
+                self.slip_ticks[i] += excess
+
+    def get_output_scale(self, index):
+        """
+        Get the factor to scale a module's drive output by: less than 1
+        for slipping modules, if limiting them is enabled.
+        """
+        if self.limit_output and self.slipping[index]:
+            return self.slipping_output_scale
+
+        return 1
+
+    def update_smart_dashboard(self):
+        for module, slipping, residual in zip(
+            self.drivetrain.modules, self.slipping, self.residuals
+        ):
+            wpilib.SmartDashboard.putBoolean(module.name+' Slipping', slipping)
+            wpilib.SmartDashboard.putNumber(
+                module.name+' Slip Residual', residual
+            )
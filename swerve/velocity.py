@@ -0,0 +1,138 @@
+"""
+Low-latency drive wheel velocity and acceleration estimates.
+
+The Talons' own velocity measurement is averaged over a 100 ms window, and
+only sent every 100 ms (see the drive status frames in
+:class:`swerve_module.SwerveModule`). Differentiating the drive positions,
+which are already read every tick for odometry, gives a much fresher
+estimate; an alpha-beta-gamma filter smooths out the encoder quantization
+and the jitter in when each position sample arrived.
+"""
+import wpilib
+from .odometry import drive_ticks_per_inch
+
+
+def critically_damped_gains(theta):
+    """
+    Get ``(alpha, beta, gamma)`` gains for a critically damped
+    alpha-beta-gamma filter.
+
+    Args:
+        theta (number): The discount factor, between 0 and 1. Lower values
+            follow the measurements more closely (with more noise); higher
+            values smooth more (with more lag).
+    """
+    return (
+        1 - (theta ** 3),
+        1.5 * ((1 - theta) ** 2) * (1 + theta),
+        0.5 * ((1 - theta) ** 3)
+    )
+
+
+class VelocityEstimator:
+    def __init__(self, drivetrain, theta=0.5, max_dt=0.1,
+                 ticks_per_inch=drive_ticks_per_inch):
+        """
+        Estimates each swerve module's wheel velocity and acceleration from
+        timestamped drive encoder positions.
+
+        Args:
+            drivetrain (:class:`swerve_drive.SwerveDrive`): The drivetrain
+                whose modules to track.
+            theta (number): The filter's discount factor; see
+                :func:`critically_damped_gains`.
+            max_dt (number): If more time than this (in seconds) passes
+                between two samples, the filter starts again from the new
+                position instead of treating the gap as one long tick.
+            ticks_per_inch (number): Drive encoder ticks per inch of wheel
+                travel.
+
+        Attributes:
+            positions (list): Filtered wheel positions, in inches.
+            velocities (list): Estimated wheel velocities, in inches /
+                second, positive when the wheel drives in its forward
+                direction.
+            accelerations (list): Estimated wheel accelerations, in
+                inches / second^2.
+            last_time: The timestamp of the last sample, or None.
+        """
+        self.drivetrain = drivetrain
+        self.alpha, self.beta, self.gamma = critically_damped_gains(theta)
+        self.max_dt = max_dt
+        self.ticks_per_inch = ticks_per_inch
+
+        n_modules = len(drivetrain.modules)
+        self.positions = [0] * n_modules
+        self.velocities = [0] * n_modules
+        self.accelerations = [0] * n_modules
+        self.last_time = None
+
+    def reset(self):
+        """
+        Forget the filter state; the next sample starts it again from rest.
+        """
+        self.last_time = None
+
+    def update(self, positions, timestamp=None):
+        """
+        Add one sample of drive positions.
+
+        Args:
+            positions (list): Each module's raw drive encoder position, in
+                ticks, as read by :class:`odometry.SwerveOdometry`.
+            timestamp (number): When the positions were read, in seconds.
+                Defaults to the current FPGA time.
+        """
+        if timestamp is None:
+            timestamp = wpilib.Timer.getFPGATimestamp()
+
+        scale = 1 / self.ticks_per_inch
+        dt = None
+        if self.last_time is not None:
+            dt = timestamp - self.last_time
+
+            if dt <= 0:
+                # same sample as last time
+                return
+
+        for i, (module, ticks) in enumerate(
+            zip(self.drivetrain.modules, positions)
+        ):
+            measured = ticks * scale
+            if module.drive_reversed:
+                measured *= -1
+
+            if dt is None or dt > self.max_dt:
+                self.positions[i] = measured
+                self.velocities[i] = 0
+                self.accelerations[i] = 0
+                continue
+
+            pos = self.positions[i]
+            vel = self.velocities[i]
+            acc = self.accelerations[i]
+
+            # predict, then correct by the residual
+            pos += (vel * dt) + (0.5 * acc * dt * dt)
+            vel += acc * dt
+            residual = measured - pos
+
+            self.positions[i] = pos + (self.alpha * residual)
+            self.velocities[i] = vel + (self.beta * residual / dt)
+            self.accelerations[i] = acc + (
+                2 * self.gamma * residual / (dt * dt)
+            )
+
+        self.last_time = timestamp
+
+    def update_smart_dashboard(self):
+        for module, vel, acc in zip(
+            self.drivetrain.modules, self.velocities, self.accelerations
+        ):
+            wpilib.SmartDashboard.putNumber(
+                module.name+' Drive Velocity (Estimated)', vel
+            )
+
+            wpilib.SmartDashboard.putNumber(
+                module.name+' Drive Acceleration (Estimated)', acc
+            )
@@ -26,6 +26,13 @@ class Teleop:
         self.low_speed_button = ButtonDebouncer(self.stick, 9)
         self.high_speed_button = ButtonDebouncer(self.stick, 10)
 
+        # Lift preset buttons (on the throttle)
+        self.lift_preset_buttons = [
+            (ButtonDebouncer(self.throttle, 6), 'carry'),
+            (ButtonDebouncer(self.throttle, 7), 'switch'),
+            (ButtonDebouncer(self.throttle, 8), 'scale'),
+        ]
+
     def update_smart_dashboard(self):
         wpilib.SmartDashboard.putBoolean(
             'FOC Enabled', self.foc_enabled
@@ -35,6 +42,7 @@ class Teleop:
         if self.robot.imu.is_present():
             if self.zero_yaw_button.get():
                 self.robot.imu.reset()
+                self.robot.heading.release()
 
             if self.toggle_foc_button.get():
                 self.foc_enabled = not self.foc_enabled
@@ -61,6 +69,14 @@ class Teleop:
 
         wpilib.SmartDashboard.putNumber("Lift Power", liftPct)
 
+        for button, preset in self.lift_preset_buttons:
+            if button.get():
+                self.robot.lift.move_to_preset(preset)
+
+        # Let preset moves run unless the driver takes over manually.
+        if liftPct == 0 and self.robot.lift.is_profile_active():
+            return
+
         self.robot.lift.setLiftPower(liftPct)
 
     def claw_control(self):
@@ -155,22 +171,30 @@ class Teleop:
         tw *= constants.turn_sensitivity
 
         if linear_control_active or rotation_control_active:
-            self.last_applied_control = np.array([
-                ctrl[0],
-                ctrl[1],
-                tw
-            ])
-
             speed_coefficient = 0.75
             if self.low_speed_button.get():
                 speed_coefficient = 0.25
             elif self.high_speed_button.get():
                 speed_coefficient = 1
 
-            self.robot.drivetrain.drive(
+            tw *= speed_coefficient
+
+            # In field-oriented mode, hold the heading while just
+            # translating, so the robot doesn't drift round.
+            if self.foc_enabled and self.robot.imu.is_present():
+                if rotation_control_active:
+                    self.robot.heading.release()
+                else:
+                    tw = self.robot.heading.hold()
+
+            self.last_applied_control = np.array([
                 ctrl[0] * speed_coefficient,
                 ctrl[1] * speed_coefficient,
-                tw * speed_coefficient,
+                tw
+            ])
+
+            self.robot.drivetrain.drive(
+                *self.last_applied_control,
                 max_wheel_speed=constants.teleop_speed
             )
         else:
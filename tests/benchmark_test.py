@@ -0,0 +1,30 @@
+"""
+Runs the hot path benchmarks (see benchmarks/hotpaths.py) briefly.
+
+Times aren't checked here, since they depend on the machine, but hardware
+call counts are: if this fails, something in a hot path started making more
+Talon / joystick / Preferences / navX calls than when the baselines were
+recorded. Re-record them with ``python -m benchmarks.hotpaths save`` if
+that's intended.
+"""
+from benchmarks import hotpaths
+
+
+def test_hardware_calls_match_baselines():
+    results = hotpaths.run_benchmarks(min_time=0.001, repeat=1)
+    baselines = hotpaths.load_baselines()
+
+    assert {r.name for r in results} == set(baselines)
+    assert hotpaths.compare(results, baselines, check_time=False) == []
+
+
+def test_latency_regression_is_caught():
+    names = ['SwerveModule.set_steer_angle']
+    fast, = hotpaths.run_benchmarks(min_time=0.001, repeat=1, names=names)
+    slow, = hotpaths.run_benchmarks(
+        {'talon': 100e-6}, min_time=0.001, repeat=1, names=names
+    )
+
+    baselines = {fast.name: {'time_us': fast.time * 1e6, 'calls': fast.calls}}
+    assert hotpaths.compare([fast], baselines) == []
+    assert len(hotpaths.compare([slow], baselines)) == 1
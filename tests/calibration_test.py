@@ -0,0 +1,51 @@
+"""
+Checks the camera calibration lookup tables against the closed-form math.
+"""
+import math
+import pytest
+from vision.calibration import CameraCalibration
+
+
+def test_pixel_angles_match_pinhole_model():
+    camera = CameraCalibration.from_fov(320, 240, 60.0)
+    f = 160 / math.tan(math.radians(30))
+
+    azimuth, altitude = camera.pixel_to_angles(250.5, 40.25)
+    assert azimuth == pytest.approx(math.degrees(math.atan((250.5 - 160) / f)), abs=0.01)  # noqa: E501
+    assert altitude == pytest.approx(math.degrees(math.atan((120 - 40.25) / f)), abs=0.01)  # noqa: E501
+
+
+def test_undistort_inverts_distortion():
+    camera = CameraCalibration(
+        320, 240, 300, 300, distortion=(-0.3, 0.1, 0.001, -0.002, 0)
+    )
+
+    # distort a known normalised point by hand, then undistort it
+    x, y = 0.3, -0.2
+    r2 = x * x + y * y
+    radial = 1 - 0.3 * r2 + 0.1 * r2 * r2
+    xd = x * radial + 2 * 0.001 * x * y - 0.002 * (r2 + 2 * x * x)
+    yd = y * radial + 0.001 * (r2 + 2 * y * y) - 2 * 0.002 * x * y
+
+    ux, uy = camera.undistort(xd * 300 + 160, yd * 300 + 120)
+    assert ux == pytest.approx(x, abs=1e-4)
+    assert uy == pytest.approx(y, abs=1e-4)
+
+
+def test_ground_lookup_accounts_for_mount_pose():
+    camera = CameraCalibration.from_fov(
+        320, 240, 60.0, mount_height=30.0, mount_pitch=-20.0,
+        mount_forward=10.0
+    )
+
+    # straight down the optical axis: 20 degrees below horizontal
+    forward, right = camera.angles_to_robot(0, 0, target_height=0)
+    assert forward == pytest.approx(10 + 30 / math.tan(math.radians(20)), rel=1e-3)  # noqa: E501
+    assert right == pytest.approx(0, abs=1e-6)
+
+    distance, bearing = camera.angles_to_ground(10, -5, target_height=0)
+    assert bearing > 0
+    assert distance < forward
+
+    # rays above the horizon never reach the floor
+    assert camera.angles_to_robot(0, 22, target_height=0) is None
@@ -0,0 +1,59 @@
+"""
+Checks the number of CAN transactions the robot code makes per loop tick,
+using the CAN accounting built into the robot (see canbus/accounting.py),
+which these tests turn on.
+
+If one of these fails, something has started making (many) more CAN calls
+per tick than before. Look at the per-caller breakdown printed by the test
+to find out what.
+"""
+import sys
+import pytest
+import wpilib
+
+#: Maximum number of CAN transactions allowed in a single tick, per mode.
+tick_budgets = {
+    'disabled': {'get': 32, 'set': 0, 'config': 24},
+    'teleop': {'get': 40, 'set': 12, 'config': 50},
+}
+
+
+@pytest.fixture
+def can_accounting(robot):
+    wpilib.Preferences.getInstance().putBoolean('Debug: CAN Accounting', True)
+
+
+def check_budgets(robot, mode):
+    stats = robot.can_stats.modes[mode]
+    assert stats.ticks > 0
+
+    for kind, budget in tick_budgets[mode].items():
+        assert stats.max_per_tick[kind] <= budget, (
+            "{} tick made {} '{}' calls (budget is {})".format(
+                mode, stats.max_per_tick[kind], kind, budget
+            )
+        )
+
+
+def test_disabled_can_budget(control, robot, can_accounting):
+    control.set_operator_control(enabled=False)
+    control.run_test(lambda tm: tm < 2)
+
+    robot.can_stats.dump(sys.stdout)
+    check_budgets(robot, 'disabled')
+
+
+def test_teleop_can_budget(control, robot, can_accounting):
+    control.set_operator_control(enabled=True)
+    control.run_test(lambda tm: tm < 5)
+
+    robot.can_stats.dump(sys.stdout)
+    check_budgets(robot, 'teleop')
+
+
+def test_off_by_default(control, robot):
+    control.run_test(lambda tm: tm < 0.1)
+
+    assert not robot.can_stats.enabled
+    assert robot.can_stats.modes == {}
+    assert type(robot.lift.lift_main).__name__ == 'TalonSRX'
@@ -0,0 +1,204 @@
+"""
+Checks the drive feedforward fit, on made-up data and on the simulated
+drive motors.
+"""
+import numpy as np
+import pytest
+import physics
+import wpilib
+from sim import Match, talon_notifiers_disabled
+from swerve.characterization import DriveCharacterization, Feedforward, \
+    Phase, check_feedforward, fit_feedforward
+
+
+def test_fit_recovers_gains():
+    rng = np.random.RandomState(0)
+    velocities = np.concatenate([
+        np.linspace(5, 400, 100), -np.linspace(5, 400, 100)
+    ])
+    accelerations = rng.uniform(-2000, 2000, len(velocities))
+    outputs = (0.05 * np.sign(velocities)) + (0.002 * velocities) \
+        + (0.0003 * accelerations) + rng.normal(0, 0.002, len(velocities))
+
+    result = fit_feedforward(outputs, velocities, accelerations)
+
+    assert result.ks == pytest.approx(0.05, abs=0.005)
+    assert result.kv == pytest.approx(0.002, rel=0.02)
+    assert result.ka == pytest.approx(0.0003, rel=0.05)
+    assert result.r_squared > 0.99
+
+    with pytest.raises(ValueError):
+        fit_feedforward([0.1], [0], [0])
+
+
+def test_check_feedforward():
+    good = Feedforward(0.05, 1 / 470, 0.1 / 470, 0.98, 500)
+    assert check_feedforward(good, 0.9) is None
+
+    bad = [
+        good._replace(r_squared=0.5),
+        good._replace(ks=-0.2),
+        good._replace(kv=1 / 20),
+        good._replace(kv=-1 / 470),
+        good._replace(ka=-0.01),
+        good._replace(ka=5 / 470),
+        good._replace(r_squared=float('nan')),
+    ]
+    for result in bad:
+        assert check_feedforward(result, 0.9) is not None
+
+
+def test_characterization_is_opt_in(control, robot):
+    control.run_test(lambda tm: tm < 0.1)
+
+    robot.testInit()
+    assert robot.characterization is None
+
+    preferences = wpilib.Preferences.getInstance()
+    preferences.putBoolean('Test: Drive Characterization', True)
+    robot.testInit()
+    assert robot.characterization is not None
+
+    # a fit that doesn't explain the data isn't saved
+    preferences.putFloat('Front Left-Drive kV', 0.003)
+    robot.characterization.results = {
+        'Front Left': Feedforward(0, 1 / 470, 0.1 / 470, 0.3, 500),
+        'Back Left': Feedforward(0, 1 / 480, 0.1 / 480, 0.99, 500),
+    }
+    robot.finish_characterization()
+
+    assert preferences.getFloat('Front Left-Drive kV', 0) == \
+        pytest.approx(0.003)
+    assert preferences.getFloat('Back Left-Drive kV', 0) == \
+        pytest.approx(1 / 480)
+
+    # and it has to be turned on again for the next run
+    assert not preferences.getBoolean('Test: Drive Characterization', True)
+
+
+def test_characterize_simulated_drive(control, robot, hal_data):
+    def rest(t):
+        return 0
+
+    phases = [
+        Phase('quasistatic', 5, lambda t: 0.1 * t),
+        Phase('rest', 1, rest),
+        Phase('step', 1.5, lambda t: -0.6),
+        Phase('rest', 1, rest),
+    ]
+
+    match = Match(
+        robot, physics_engine=physics.PhysicsEngine,
+        autonomous_time=0, transition_time=0.5, teleop_time=9
+    )
+
+    # run the test mode code in teleop, with shorter phases
+    def teleop_init():
+        robot.characterization = DriveCharacterization(
+            robot.drivetrain, phases
+        )
+
+    robot.teleopInit = teleop_init
+    robot.teleopPeriodic = robot.testPeriodic
+
+    with talon_notifiers_disabled():
+        control.run_test(match.on_step)
+
+    assert robot.characterization.finished
+
+    # the simulated drive motors are first-order, with no static friction
+    free_speed, tau, _ = physics.motor_types['drive']
+    results = robot.characterization.results
+    assert len(results) == 4
+
+    for name, result in results.items():
+        assert result.kv == pytest.approx(1 / free_speed, rel=0.05)
+        assert result.ka == pytest.approx(tau / free_speed, rel=0.2)
+        assert result.ks == pytest.approx(0, abs=0.01)
+
+    # saved, and picked up by the velocity loop
+    for module in robot.drivetrain.modules:
+        assert module.drive_kf == pytest.approx(
+            results[module.name].kv * 1023
+        )
+
+        # (and only by the velocity loop: slot 0 is the position loop)
+        talon = hal_data['CAN'][module.drive_talon.getDeviceID()]
+        assert talon['profile1_f'] == pytest.approx(module.drive_kf)
+        assert talon['profile0_f'] == 0
+
+    # the simulated Talons run their velocity loops with the configured kF
+    # (the fit matches the simulated motors' default kF, so change it)
+    wpilib.Preferences.getInstance().putFloat('Front Left-Drive kV', 0.003)
+    robot.load_config()
+
+    for module in robot.drivetrain.modules:
+        module.set_drive_speed(0.5)
+
+    talons = match.physics.talons
+    modes, targets, gains = talons.read_commands(hal_data['CAN'])
+    for module in robot.drivetrain.modules:
+        n = talons.ids.index(module.drive_talon.getDeviceID())
+        assert modes[n] == 2  # velocity
+
+        if module.name == 'Front Left':
+            assert gains[3, n] == pytest.approx(0.003 * 1023)
+        else:
+            assert gains[3, n] == pytest.approx(
+                results[module.name].kv * 1023
+            )
+
+
+def test_acceleration_feedforward(control, robot, monkeypatch):
+    control.run_test(lambda tm: tm < 0.1)
+
+    preferences = wpilib.Preferences.getInstance()
+    preferences.putFloat('Front Left-Drive kS', 0.05)
+    preferences.putFloat('Front Left-Drive kV', 1 / 500)
+    preferences.putFloat('Front Left-Drive kA', 0.1 / 500)
+    robot.load_config()
+
+    module = next(
+        m for m in robot.drivetrain.modules if m.name == 'Front Left'
+    )
+    module.drive_reversed = False
+
+    now = [10.0]
+    monkeypatch.setattr(wpilib.Timer, 'getFPGATimestamp', lambda: now[0])
+
+    commands = []
+    module.drive_talon.set = lambda mode, target, *demand: \
+        commands.append((target, demand[1] if demand else None))
+
+    def drive(speed, dt=0.02):
+        now[0] += dt
+        module.set_drive_speed(speed, direct=True)
+        return commands[-1]
+
+    assert drive(0) == (0, 0)
+
+    # a step to full speed is ramped at what the motor can do with full
+    # output: (1 - 0) / kA ticks / 100ms per second, for 20ms
+    target, feedforward = drive(500)
+    assert target == pytest.approx(100)
+    assert feedforward == 1
+
+    # (which leaves less for accelerating as the speed goes up)
+    target, feedforward = drive(500)
+    assert target == pytest.approx(100 + 0.02 * (1 - 0.05 - 0.2) / 0.0002)
+
+    # flipping the wheel reverses the target, which isn't an acceleration
+    module.drive_temp_flipped = True
+    target, feedforward = drive(-300)
+    assert target == 300
+    assert feedforward == pytest.approx(0.05)
+    module.drive_temp_flipped = False
+
+    # nor is switching from another control mode
+    module.set_drive_percent_out(0.5)
+    target, feedforward = drive(200)
+    assert (target, feedforward) == (200, pytest.approx(0.05))
+
+    # a steady target only gets the static friction term
+    assert drive(200) == (200, pytest.approx(0.05))
+    assert drive(-200, dt=1) == (-200, pytest.approx(-0.05))
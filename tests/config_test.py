@@ -0,0 +1,104 @@
+"""
+Checks the configuration schema, snapshots and the saved ini files.
+"""
+import os
+import config
+from config import __main__ as config_main, ini
+from config.schema import all_keys
+
+ini_dir = os.path.join(os.path.dirname(__file__), '..')
+
+
+class DictPreferences(object):
+    def __init__(self, values):
+        self.values = values
+        self.reads = 0
+
+    def _get(self, key, backup):
+        self.reads += 1
+        return self.values.get(key, backup)
+
+    getBoolean = getInt = getFloat = getString = _get
+
+
+def test_schema_keys_are_unique():
+    names = [key.name for key in all_keys]
+    assert len(names) == len(set(names))
+
+    for key in all_keys:
+        assert key.default is None or isinstance(key.default, key.type)
+
+
+def test_load_snapshot():
+    prefs = DictPreferences({
+        'Control: Teleop Speed': 400.0,
+        'Lift: Invert Sensor Phase': False,
+        'Front Left-offset': -1000,
+    })
+
+    snapshot = config.load(prefs)
+
+    # every key is read exactly once
+    assert prefs.reads == len(all_keys)
+
+    assert snapshot.teleop_speed == 400
+    assert isinstance(snapshot.teleop_speed, int)
+    assert snapshot.lift_sensor_phase is False
+    assert snapshot.lift_upper_limit is None
+    assert snapshot.modules['Front Left'].offset == -1000.0
+    assert snapshot.modules['Front Right'].offset == 107.0
+
+    changes = config.changed(config.defaults(), snapshot)
+    assert [(key.name, key.reconfigure) for key, old, new in changes] == [
+        ('Control: Teleop Speed', False),
+        ('Lift: Invert Sensor Phase', True),
+        ('Front Left-offset', False),
+    ]
+
+
+def test_saved_ini_files_match_schema():
+    for name in ('Swerve_v3_constants.ini', 'Swerve_v4_constants.ini'):
+        entries = ini.read_ini(os.path.join(ini_dir, name))
+        assert entries
+        assert ini.validate(entries) == []
+
+
+def test_validate_ini(tmpdir):
+    path = tmpdir.join('test.ini')
+    path.write('\n'.join([
+        '[NetworkTables Storage 3.0]',
+        'double "/Preferences/Control: Teleop Sped"=400',
+        'boolean "/Preferences/Control: Teleop Speed"=true',
+        'double "/Preferences/Lift: Cruise Velocity"=1500.5',
+        'string "/Preferences/Selected Camera"="1"',
+        'double "/SmartDashboard/Heading"=1',
+    ]))
+
+    entries = ini.read_ini(str(path))
+    assert set(entries) == {
+        'Control: Teleop Sped', 'Control: Teleop Speed',
+        'Lift: Cruise Velocity', 'Selected Camera',
+    }
+
+    problems = ini.validate(entries)
+    assert len(problems) == 4
+    assert "did you mean 'Control: Teleop Speed'" in problems[0]
+
+
+def test_diff_ini():
+    old = {'Control: Teleop Speed': 370, 'Lift: Acceleration': 3000}
+    new = {'Control: Teleop Speed': 400, 'Lift: Acceleration': 3000,
+           'Foo': 1.0}
+
+    changes = ini.diff(old, new)
+    assert [(name, a, b) for name, a, b, key in changes] == [
+        ('Control: Teleop Speed', 370, 400),
+        ('Foo', None, 1.0),
+    ]
+    assert changes[1][3] is None
+
+
+def test_command_line_usage(capsys):
+    for args in ((), ('validate',), ('diff', 'old.ini'), ('bogus',)):
+        assert config_main.main(*args) == 2
+        assert 'python -m config validate' in capsys.readouterr().out
@@ -0,0 +1,147 @@
+"""
+Checks the NumPy target detector on synthetic frames: the HSV conversion,
+blob extraction, and region of interest tracking / frame skipping.
+"""
+import colorsys
+import numpy as np
+import pytest
+from vision.detector import Detector, bgr_to_hsv, rgb_to_hsv, find_blobs
+from vision.visionconstants import POWER_CUBE, SWITCH_LEFT
+
+# a yellow power cube, in BGR order
+CUBE_BGR = (20, 200, 230)
+
+
+def cube_frame(x, y, width=320, height=240, size=(52, 44)):
+    frame = np.full((height, width, 3), 30, dtype=np.uint8)
+    frame[y:y + size[1], x:x + size[0]] = CUBE_BGR
+    return frame
+
+
+def test_hsv_conversion():
+    rng = np.random.RandomState(0)
+    rgb = rng.randint(0, 256, (16, 16, 3)).astype(np.uint8)
+    hsv = rgb_to_hsv(rgb)
+
+    # same as opencv's 8-bit conversion: H in [0, 180), S and V in [0, 255]
+    for (r, g, b), (h, s, v) in zip(rgb.reshape(-1, 3), hsv.reshape(-1, 3)):
+        expected = colorsys.rgb_to_hsv(r / 255, g / 255, b / 255)
+        hue_error = abs(int(h) - expected[0] * 180)
+        assert min(hue_error, 180 - hue_error) <= 1
+        assert abs(int(s) - expected[1] * 255) <= 1
+        assert v == max(r, g, b)
+
+    # BGR frames give the same result once the channels are swapped
+    assert np.array_equal(bgr_to_hsv(rgb[..., ::-1]), hsv)
+
+    pixels = np.array([[CUBE_BGR, (0, 0, 255), (255, 0, 0), (90, 90, 90)]],
+                      dtype=np.uint8)
+    assert bgr_to_hsv(pixels).tolist() == [[
+        [25, 232, 230],   # yellow
+        [0, 255, 255],    # red
+        [120, 255, 255],  # blue
+        [0, 0, 90],       # grey
+    ]]
+
+
+def test_find_blobs():
+    mask = np.zeros((12, 16), dtype=bool)
+    mask[1:5, 1:7] = True    # 24px rectangle
+    mask[6, 10] = True       # diagonal chain...
+    mask[7, 11] = True
+    mask[8, 12] = True       # ...of 3px, which is 8-connected
+    mask[10, 0:2] = True     # 2px
+    mask[0, 15] = True       # single pixel in the corner
+
+    blobs = find_blobs(mask)
+    assert [(b.x, b.y, b.w, b.h, b.area) for b in blobs] == [
+        (1, 1, 6, 4, 24),
+        (10, 6, 3, 3, 3),
+        (0, 10, 2, 1, 2),
+        (15, 0, 1, 1, 1),
+    ]
+
+    assert len(find_blobs(mask, min_area=3)) == 2
+    assert find_blobs(np.zeros((4, 4), dtype=bool)) == []
+
+
+def test_detects_bgr_frames():
+    frame = cube_frame(134, 98)
+
+    detector = Detector(320, 240, fps=None)
+    azimuth, altitude = detector.detect(frame, [POWER_CUBE])[POWER_CUBE]
+    assert azimuth == pytest.approx(0, abs=0.5)
+    assert altitude == pytest.approx(0, abs=0.5)
+
+    # the same frame read as RGB is blue, not yellow
+    rgb_detector = Detector(320, 240, fps=None, channel_order='rgb')
+    assert rgb_detector.detect(frame, [POWER_CUBE]) == {}
+
+    with pytest.raises(ValueError):
+        Detector(320, 240, channel_order='hsv')
+
+
+def test_region_of_interest():
+    detector = Detector(320, 240, fps=None, refresh_interval=3)
+
+    blob = detector.locate(cube_frame(40, 50), POWER_CUBE)
+    assert (blob.x, blob.y) == (40, 50)
+    assert detector.frames_since_refresh[POWER_CUBE] == 0
+
+    # the next few frames only search around the last position, which still
+    # finds the cube after it moves a little
+    x0, y0, x1, y1 = detector.rois[POWER_CUBE]
+    assert x0 <= 40 and x1 >= 40 + 52
+    assert x1 - x0 < 320
+
+    for i in range(1, 4):
+        blob = detector.locate(cube_frame(40 + 5 * i, 50), POWER_CUBE)
+        assert blob.x == 40 + 5 * i
+        assert detector.frames_since_refresh[POWER_CUBE] == i
+
+    # then the whole frame is searched again
+    detector.locate(cube_frame(60, 50), POWER_CUBE)
+    assert detector.frames_since_refresh[POWER_CUBE] == 0
+
+    # a cube that jumps out of the region is found with a full search
+    blob = detector.locate(cube_frame(250, 180), POWER_CUBE)
+    assert (blob.x, blob.y) == (250, 180)
+    assert detector.frames_since_refresh[POWER_CUBE] == 0
+
+    # and once it's gone there's no region to search
+    assert detector.locate(cube_frame(0, 0, size=(0, 0)), POWER_CUBE) is None
+    assert POWER_CUBE not in detector.rois
+
+
+def test_frame_skipping():
+    now = [0]
+
+    def slow_clock():
+        # detect() reads the clock before and after processing, so every
+        # frame takes 0.1s to process: three camera frames at 30fps
+        now[0] += 0.1
+        return now[0]
+
+    detector = Detector(320, 240, fps=30, clock=slow_clock)
+    frame = cube_frame(134, 98)
+    empty = cube_frame(0, 0, size=(0, 0))
+
+    # the processing time is smoothed, so one slow frame isn't enough...
+    result = detector.detect(frame, [POWER_CUBE, SWITCH_LEFT])
+    assert list(result) == [POWER_CUBE]
+    assert detector.process_time == pytest.approx(0.02)
+    assert detector.skip_remaining == 0
+
+    # ...but two are, and then the next frame is dropped
+    result = detector.detect(frame, [POWER_CUBE])
+    assert list(result) == [POWER_CUBE]
+    assert detector.process_time == pytest.approx(0.036)
+    assert detector.skip_remaining == 1
+
+    # (with nothing to publish for it, not even the last frame's result)
+    assert detector.detect(frame, [POWER_CUBE]) is None
+    assert detector.frames_skipped == 1
+
+    # and the one after that is processed again
+    assert detector.detect(empty, [POWER_CUBE]) == {}
+    assert detector.frames_skipped == 1
@@ -0,0 +1,89 @@
+"""
+Checks the shared-memory frame ring hands out frames without copying,
+detects frames that were overwritten while in use, and gets replaced cleanly.
+"""
+import numpy as np
+import pytest
+from vision.frame_ring import FrameRingWriter, FrameRingReader
+
+
+@pytest.fixture
+def writer():
+    writer = FrameRingWriter('pytest', 8, 4, slots=3)
+    yield writer
+    writer.unlink()
+
+
+def test_reader_sees_frames_in_place(writer):
+    reader = FrameRingReader('pytest')
+    assert reader.latest() is None
+
+    writer.write(np.full((4, 8, 3), 7, dtype=np.uint8), timestamp=1.5)
+    frame = reader.latest()
+    assert frame.number == 1
+    assert frame.timestamp == 1.5
+    assert (frame.image == 7).all()
+
+    # captures into the slot show up in the reader's view directly
+    slot = writer.begin_write()
+    slot[...] = 9
+    assert reader.wait_next(1, timeout=0) is None
+    writer.commit()
+
+    assert (reader.wait_next(1, timeout=0).image == 9).all()
+
+
+def test_lapped_frames_are_invalid(writer):
+    reader = FrameRingReader('pytest')
+
+    writer.write(np.zeros((4, 8, 3), dtype=np.uint8))
+    frame = reader.latest()
+
+    for _ in range(2):
+        writer.write(np.zeros((4, 8, 3), dtype=np.uint8))
+    assert reader.is_valid(frame)
+
+    # the third write reuses frame 1's slot
+    writer.write(np.ones((4, 8, 3), dtype=np.uint8))
+    assert not reader.is_valid(frame)
+    assert reader.copy(frame) is None
+    assert reader.get(1) is None
+
+    # an aborted write leaves the slot unreadable until it's rewritten
+    writer.begin_write()
+    writer.abort()
+    assert reader.get(2) is None
+    writer.write(np.ones((4, 8, 3), dtype=np.uint8))
+    assert reader.latest().number == 5
+
+
+def test_replaced_ring_is_reopened(writer):
+    reader = FrameRingReader('pytest')
+    assert reader.generation == 1
+
+    writer.write(np.zeros((4, 8, 3), dtype=np.uint8))
+    assert reader.latest().number == 1
+    assert not reader.replaced()
+
+    # a new frame size: the old ring is closed (not leaked) and retired
+    new_writer = writer.replace(6, 2)
+    assert writer.mm.closed
+    assert new_writer.generation == 2
+
+    assert reader.replaced()
+    assert reader.wait_next(1) is None
+
+    assert reader.reopen()
+    assert not reader.replaced()
+    assert (reader.width, reader.height, reader.generation) == (6, 2, 2)
+
+    # frame numbers start again
+    new_writer.write(np.full((2, 6, 3), 5, dtype=np.uint8))
+    frame = reader.wait_next(0, timeout=0)
+    assert frame.number == 1
+    assert (frame.image == 5).all()
+
+    # reopening the same ring changes nothing
+    del frame
+    assert not reader.reopen()
+    new_writer.close()
@@ -0,0 +1,95 @@
+"""
+Checks the GC manual control mode (see runtime/gc_control.py) in the
+simulator.
+"""
+import gc
+import wpilib
+from runtime import gc_control
+
+
+def enable_manual_control(robot):
+    robot_init = robot.robotInit
+
+    def init_with_manual_gc():
+        wpilib.Preferences.getInstance().putBoolean('GC: Manual Control', True)
+        robot_init()
+
+    robot.robotInit = init_with_manual_gc
+
+
+def test_automatic_by_default(control, robot):
+    control.set_operator_control(enabled=True)
+    control.run_test(lambda tm: tm < 1)
+
+    assert not robot.gc_control.manual
+    assert gc.isenabled()
+
+
+def test_manual_control(control, robot):
+    enable_manual_control(robot)
+    stats = gc_control.stats
+
+    checks = {}
+
+    def check(tm):
+        if tm < 0.5:
+            checks['disabled'] = list(stats.collections)
+        elif tm < 3:
+            checks['teleop'] = list(stats.collections)
+            checks['gc_enabled'] = gc.isenabled()
+
+        # disabled for half a second, then enabled
+        control.set_operator_control(enabled=tm >= 0.5)
+        return tm < 3
+
+    try:
+        control.set_operator_control(enabled=False)
+        control.run_test(check)
+
+        assert robot.gc_control.manual
+        assert not checks['gc_enabled']
+        if hasattr(gc, 'get_freeze_count'):
+            assert gc.get_freeze_count() > 0
+
+        # full collections while disabled, young ones while enabled
+        start = checks['disabled']
+        assert start[2] > 0
+        assert checks['teleop'][0] > start[0]
+        assert checks['teleop'][2] == start[2]
+        assert robot.gc_control.forced == 0
+        assert stats.max_pause[0] > 0
+
+        robot.gc_control.disable()
+        assert gc.isenabled()
+    finally:
+        if robot.gc_control.manual:
+            robot.gc_control.disable()
+
+
+def test_forced_collection(control, robot):
+    control.set_operator_control(enabled=False)
+    control.run_test(lambda tm: tm < 0.1)
+
+    manager = robot.gc_control
+    manager.enable()
+    try:
+        # never any idle time
+        manager.min_idle = 1
+
+        manager.begin_tick()
+        manager.end_tick('teleop')
+        assert manager.forced == 0
+
+        threshold0 = gc.get_threshold()[0]
+        garbage = [
+            [] for _ in range(threshold0 * gc_control.forced_collection_factor)
+        ]
+
+        manager.begin_tick()
+        manager.end_tick('teleop')
+        assert manager.forced == 1
+        assert gc.get_count()[0] < threshold0
+
+        del garbage
+    finally:
+        manager.disable()
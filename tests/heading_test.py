@@ -0,0 +1,66 @@
+"""
+Checks turning to a heading and holding one in field-oriented teleop, in
+the physics simulation.
+"""
+import math
+import pytest
+import physics
+import teleop
+from sim import Match, MatchScript, talon_notifiers_disabled
+
+
+def run_teleop(control, robot, script, teleop_time, setup=None):
+    match = Match(
+        robot, script, physics.PhysicsEngine,
+        autonomous_time=0, transition_time=0.5, teleop_time=teleop_time
+    )
+
+    if setup is not None:
+        setup(match)
+
+    with talon_notifiers_disabled():
+        control.run_test(match.on_step)
+
+    return match
+
+
+@pytest.mark.parametrize('target_deg', [90, -60])
+def test_turn_to_angle(control, robot, target_deg):
+    turns = []
+
+    def turn():
+        turns.append(robot.heading.turn_to_angle(math.radians(target_deg)))
+
+    def setup(match):
+        robot.teleopPeriodic = turn
+
+    run_teleop(control, robot, MatchScript(), 8, setup)
+
+    assert any(turns)
+
+    heading = math.degrees(robot.imu.get_continuous_heading())
+    assert heading == pytest.approx(target_deg, abs=3)
+
+
+@pytest.mark.parametrize('foc', [False, True])
+def test_heading_hold(control, robot, monkeypatch, foc):
+    monkeypatch.setattr(teleop.Teleop, 'foc_enabled', foc)
+
+    # strafe right at full speed for a few seconds
+    script = MatchScript()
+    script.axis(0.5, 0, 0, 1)
+    script.neutral(3.5, 0)
+
+    def setup(match):
+        # one module slipping pulls the robot round
+        match.physics.wheel_slip[0] = 0.5
+
+    match = run_teleop(control, robot, script, 4, setup)
+
+    x, y, angle = match.field.get_position()
+    drift = abs(math.degrees(angle))
+
+    if foc:
+        assert drift < 3
+    else:
+        assert drift > 10
@@ -0,0 +1,193 @@
+"""
+Checks the lift's motion profiles, the MotionMagic gains sent to the lift
+Talon, and that autonomous waits for profiled lift moves to finish.
+"""
+import pytest
+import constants
+from autonomous.baseline_simple import Autonomous
+from lift.motion_profile import TrapezoidalProfile
+
+
+def test_trapezoidal_profile():
+    # 1500 ticks/100ms = 15000 ticks/s, reached after 0.5s and 3750 ticks
+    profile = TrapezoidalProfile(0, 20000, 1500, 3000)
+
+    assert profile.peak_velocity == 15000
+    assert profile.accel_time == pytest.approx(0.5)
+    assert profile.cruise_time == pytest.approx(12500 / 15000)
+    assert profile.duration == pytest.approx(1 + 12500 / 15000)
+
+    assert profile.sample(-1) == (0, 0)
+    assert profile.sample(profile.duration) == (20000, 0)
+
+    position, velocity = profile.sample(0.5)
+    assert position == pytest.approx(3750)
+    assert velocity == pytest.approx(1500)
+
+    # no jumps in position, and never faster than the cruise velocity
+    last = 0
+    for i in range(1, 101):
+        position, velocity = profile.sample(profile.duration * i / 100)
+        assert 0 <= position - last <= 15000 * profile.duration / 100 + 1e-6
+        assert 0 <= velocity <= 1500
+        last = position
+
+    assert not profile.is_finished(profile.duration - 0.01)
+    assert profile.is_finished(profile.duration)
+
+
+def test_triangular_profile():
+    # too short to reach the cruise velocity
+    profile = TrapezoidalProfile(1000, -1000, 1500, 3000)
+
+    assert profile.cruise_time == 0
+    assert profile.peak_velocity < profile.max_velocity
+    assert profile.duration == pytest.approx(2 * (2000 / 30000) ** 0.5)
+
+    position, velocity = profile.sample(profile.duration / 2)
+    assert position == pytest.approx(0)
+    assert velocity == pytest.approx(-profile.peak_velocity / 10)
+
+
+def test_profile_rejects_bad_limits():
+    with pytest.raises(ValueError):
+        TrapezoidalProfile(0, 100, 0, 3000)
+
+    with pytest.raises(ValueError):
+        TrapezoidalProfile(0, 100, 1500, -1)
+
+
+def test_motion_magic_gains(control, robot, hal_data):
+    control.run_test(lambda tm: tm < 0.1)
+
+    lift = robot.lift
+    talon = hal_data['CAN'][constants.lift_ids['left']]
+
+    kp, ki, kd, kf = lift.gains
+    assert talon['profile0_p'] == kp
+    assert talon['profile0_i'] == ki
+    assert talon['profile0_d'] == kd
+    assert talon['profile0_f'] == kf
+    assert kp > 0 and kf > 0
+
+    lift.lift_zero_found = True
+    assert lift.move_to_preset('switch') is not None
+    assert talon['profile_slot_select'] == lift.motion_slot
+    assert not lift.has_move_timed_out()
+
+
+class FakeTimer:
+    def __init__(self):
+        self.time = 0
+
+    def get(self):
+        return self.time
+
+
+class FakeLift:
+    """
+    A lift whose profiled move finishes (or times out) when told to.
+    """
+
+    def __init__(self, zeroed):
+        self.zeroed = zeroed
+        self.finished = False
+        self.timed_out = False
+        self.powers = []
+
+    def move_to_preset(self, name):
+        return 1.0 if self.zeroed else None
+
+    def is_move_finished(self):
+        return self.finished
+
+    def has_move_timed_out(self):
+        return self.timed_out
+
+    def setLiftPower(self, power):
+        self.powers.append(power)
+
+
+class FakeDrivetrain:
+    def set_all_module_angles(self, angle):
+        pass
+
+    def set_all_module_speeds(self, speed, direct=False):
+        pass
+
+    def reset_drive_position(self):
+        pass
+
+
+class FakeClaw:
+    def __init__(self):
+        self.power = 0
+
+    def set_power(self, power):
+        self.power = power
+
+
+class FakeRobot:
+    def __init__(self, lift):
+        self.lift = lift
+        self.drivetrain = FakeDrivetrain()
+        self.claw = FakeClaw()
+
+
+def make_auto(lift):
+    # skip the constructor, which waits for the field string
+    auto = Autonomous.__new__(Autonomous)
+    auto.robot = FakeRobot(lift)
+    auto.drive_angle = 0
+    auto.drive_speed = 250
+    auto.eject_cube = True
+    auto.startup_routine = True
+    auto.start_timer_started = True
+    auto.start_timer = FakeTimer()
+    auto.lift_raise_time = 1.5
+    auto.lift_profiled = False
+    auto.eject_start = None
+
+    return auto
+
+
+def run_until(auto, t):
+    auto.start_timer.time = t
+    auto.periodic()
+
+
+@pytest.mark.parametrize('outcome', ['finished', 'timed_out'])
+def test_eject_waits_for_lift(outcome):
+    lift = FakeLift(zeroed=True)
+    auto = make_auto(lift)
+
+    # well past the planned move, but the lift isn't there yet
+    for t in (4, 5, 6, 8):
+        run_until(auto, t)
+        assert auto.eject_start is None
+        assert auto.robot.claw.power == 0
+
+    setattr(lift, outcome, True)
+    run_until(auto, 8.5)
+    assert auto.eject_start == 8.5
+    assert auto.lift_profiled
+
+    run_until(auto, 9)
+    assert auto.robot.claw.power == -0.5
+
+    run_until(auto, 9.6)
+    assert auto.robot.claw.power == 0
+    assert not auto.startup_routine
+
+
+def test_eject_after_timed_raise_without_zero():
+    lift = FakeLift(zeroed=False)
+    auto = make_auto(lift)
+
+    run_until(auto, 5)
+    assert lift.powers[-1] == -0.3
+    assert auto.eject_start is None
+
+    run_until(auto, 4.5 + 1.5)
+    assert auto.eject_start == 6
+    assert not auto.lift_profiled
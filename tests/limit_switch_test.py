@@ -0,0 +1,109 @@
+"""
+Checks the limit switch debouncing against a fake clock, and that the lift
+only zeroes its encoders once per press.
+"""
+import pytest
+import wpilib
+import constants
+import lift
+from sensors.limit_switch import LimitSwitch
+
+CHANNEL = 9
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(wpilib.Timer, 'getFPGATimestamp', lambda: now[0])
+    return now
+
+
+def step(switch, hal_data, clock, t, pressed, channel=CHANNEL):
+    clock[0] = t
+    # the switch is active-low
+    hal_data['dio'][channel]['value'] = not pressed
+    return switch.update()
+
+
+def test_debounced_edges(robot, hal_data, clock):
+    hal_data['dio'][CHANNEL]['value'] = True
+    switch = LimitSwitch(CHANNEL, debounce_time=0.02)
+
+    assert step(switch, hal_data, clock, 0.00, False) is None
+    assert not switch.pressed
+
+    # a 10ms bounce is ignored
+    assert step(switch, hal_data, clock, 0.10, True) is None
+    assert step(switch, hal_data, clock, 0.11, False) is None
+    assert step(switch, hal_data, clock, 0.14, False) is None
+    assert switch.press_count == 0
+
+    # held for the debounce time: one rising edge, timed from the first
+    # reading of the press
+    assert step(switch, hal_data, clock, 0.20, True) is None
+    assert step(switch, hal_data, clock, 0.215, True) is None
+    assert step(switch, hal_data, clock, 0.225, True) == LimitSwitch.PRESSED
+    assert switch.pressed
+    assert switch.press_time == 0.20
+    assert switch.press_count == 1
+
+    # no more edges while it's held, even through a bounce
+    for t in (0.24, 0.26, 0.30):
+        assert step(switch, hal_data, clock, t, True) is None
+    assert step(switch, hal_data, clock, 0.31, False) is None
+    assert step(switch, hal_data, clock, 0.32, True) is None
+    assert switch.pressed
+
+    # released for the debounce time: one falling edge
+    assert step(switch, hal_data, clock, 0.40, False) is None
+    assert step(switch, hal_data, clock, 0.43, False) == LimitSwitch.RELEASED
+    assert step(switch, hal_data, clock, 0.50, False) is None
+    assert not switch.pressed
+    assert switch.press_time == 0.20
+
+    # and the next press is counted again
+    step(switch, hal_data, clock, 0.60, True)
+    assert step(switch, hal_data, clock, 0.625, True) == LimitSwitch.PRESSED
+    assert switch.press_time == 0.60
+    assert switch.press_count == 2
+
+
+def test_lift_zeroes_once_per_press(robot, hal_data, clock):
+    channel = constants.lift_limit_channel
+    hal_data['dio'][channel]['value'] = True
+
+    the_lift = lift.ManualControlLift(
+        constants.lift_ids['left'], constants.lift_ids['right'],
+        channel, constants.start_limit_channel
+    )
+
+    zeroed = []
+    the_lift.lift_main.setQuadraturePosition = \
+        lambda position, timeout_ms: zeroed.append(clock[0])
+
+    def tick(t, pressed):
+        clock[0] = t
+        hal_data['dio'][channel]['value'] = not pressed
+        the_lift.checkLimitSwitch()
+
+    # held down for a second, at 50Hz (the zero is captured one or two
+    # ticks after the press, once it's been debounced)
+    for i in range(5):
+        tick(i * 0.02, False)
+    for i in range(50):
+        tick(0.1 + i * 0.02, True)
+
+    assert len(zeroed) == 1
+    assert 0.1 < zeroed[0] < 0.15
+    assert the_lift.lift_zero_found
+    assert the_lift.zero_capture_time == pytest.approx(0.1)
+
+    # released, then pressed again: zeroed a second time
+    for i in range(10):
+        tick(1.2 + i * 0.02, False)
+    for i in range(10):
+        tick(1.4 + i * 0.02, True)
+
+    assert len(zeroed) == 2
+    assert 1.4 < zeroed[1] < 1.45
+    assert the_lift.zero_capture_time == pytest.approx(1.4)
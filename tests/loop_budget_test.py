@@ -0,0 +1,157 @@
+"""
+Checks how much work each robot loop tick does, over a scripted match in the
+simulator (autonomous, then some driving and lift / claw control in teleop).
+
+What's checked is the number of CAN transactions (Talon calls, counted by
+:class:`canbus.CANAccounting`) made in any one tick, which doesn't depend on
+the machine running the test. The worst ticks are the ones where
+``sd_update_timer`` fires (every 0.5s), when the config is reloaded and
+everything is written to the SmartDashboard.
+
+Wall times of each tick are only reported, like the benchmarks in
+``benchmarks/``: they're the robot code running against the simulated HAL on
+whatever machine runs the tests. The simulated hardware calls are cheap, but
+the roboRIO's CPU is much slower than a desktop's, so a tick that fits in
+the loop period here doesn't necessarily fit on the robot. Use
+``python -m benchmarks.hotpaths`` with a per-call latency to see how the hot
+paths cope with slower hardware calls.
+"""
+import time
+import numpy as np
+import physics
+import wpilib
+from sim import Match, MatchScript, talon_notifiers_disabled
+
+loop_period = 0.020
+
+#: The most CAN transactions of each kind (see :mod:`canbus.accounting`)
+#: that a single tick can make, in any mode.
+tick_call_budgets = {'get': 48, 'set': 16, 'config': 20}
+
+periodic_methods = {
+    'disabled': 'disabledPeriodic',
+    'autonomous': 'autonomousPeriodic',
+    'teleop': 'teleopPeriodic',
+}
+
+
+class TickTimer(object):
+    """
+    Times every call to the robot's periodic methods, and notes which calls
+    were dashboard / config updates.
+    """
+
+    def __init__(self, robot):
+        self.times = {mode: [] for mode in periodic_methods}
+        self.sd_ticks = {mode: [] for mode in periodic_methods}
+        self.sd_update = False
+
+        for mode, name in periodic_methods.items():
+            setattr(robot, name, self.wrap(mode, getattr(robot, name)))
+
+        # sd_update_timer is only created by robotInit
+        robot_init = robot.robotInit
+
+        def timed_robot_init():
+            robot_init()
+            self.watch_sd_timer(robot.sd_update_timer)
+
+        robot.robotInit = timed_robot_init
+
+    def watch_sd_timer(self, sd_update_timer):
+        has_period_passed = sd_update_timer.hasPeriodPassed
+
+        def sd_update_due(period):
+            due = has_period_passed(period)
+            self.sd_update = self.sd_update or due
+            return due
+
+        sd_update_timer.hasPeriodPassed = sd_update_due
+
+    def wrap(self, mode, periodic):
+        def timed():
+            self.sd_update = False
+
+            start = time.perf_counter()
+            periodic()
+            self.times[mode].append(time.perf_counter() - start)
+
+            self.sd_ticks[mode].append(self.sd_update)
+
+        return timed
+
+    def report(self, mode, can_stats=None):
+        times = np.array(self.times[mode]) * 1000
+        worst = np.argsort(times)[::-1][:5]
+
+        summary = (
+            '{}: {} ticks, median {:.2f}ms, p99 {:.2f}ms, max {:.2f}ms '
+            '({:.0%} of the loop period)'
+        )
+        print(summary.format(
+            mode, len(times), np.median(times), np.percentile(times, 99),
+            times.max(), times.max() / (loop_period * 1000)
+        ))
+        for i in worst:
+            print('    tick {:5d}: {:.2f}ms{}'.format(
+                i, times[i], ' (dashboard update)' if self.sd_ticks[mode][i]
+                else ''
+            ))
+
+        if can_stats is not None and mode in can_stats.modes:
+            stats = can_stats.modes[mode]
+            print('    CAN calls per tick: ' + ', '.join(
+                '{} {:.1f} (max {})'.format(
+                    kind, stats.per_tick(kind), stats.max_per_tick[kind]
+                )
+                for kind in sorted(tick_call_budgets)
+            ))
+
+
+def check_budgets(timer, can_stats, mode):
+    assert len(timer.times[mode]) > 0
+
+    # (disabledPeriodic updates the dashboard on every tick)
+    if mode != 'disabled':
+        assert any(timer.sd_ticks[mode])
+
+    stats = can_stats.modes[mode]
+    assert stats.ticks == len(timer.times[mode])
+
+    for kind, budget in tick_call_budgets.items():
+        assert stats.max_per_tick[kind] <= budget, (
+            '{} tick made {} CAN {} calls (budget is {})'.format(
+                mode, stats.max_per_tick[kind], kind, budget
+            )
+        )
+
+
+def test_loop_budget(control, robot):
+    script = MatchScript(
+        'LRL', choices={'Robot Starting Position': 'Middle-Placement'}
+    )
+
+    # drive around, turning, and work the lift and claw from the throttle
+    script.axis(18, 0, 1, -0.8)
+    script.axis(19, 0, 2, 0.5)
+    script.axis(20, 0, 0, 0.4)
+    script.neutral(22, 0)
+    script.axis(22, 1, 2, 0.6)
+    script.axis(23, 1, 5, -0.5)
+    script.neutral(25, 1)
+
+    wpilib.Preferences.getInstance().putBoolean(
+        'Debug: CAN Accounting', True
+    )
+
+    match = Match(robot, script, physics.PhysicsEngine, teleop_time=10)
+    timer = TickTimer(robot)
+
+    with talon_notifiers_disabled():
+        control.run_test(match.on_step)
+
+    for mode in periodic_methods:
+        timer.report(mode, robot.can_stats)
+
+    for mode in periodic_methods:
+        check_budgets(timer, robot.can_stats, mode)
@@ -0,0 +1,48 @@
+"""
+Runs scripted matches through the headless match runner.
+"""
+import physics
+from sim import Match, MatchScript, talon_notifiers_disabled
+
+
+def test_autonomous_drives_to_switch(control, robot):
+    script = MatchScript(
+        'LRL', choices={'Robot Starting Position': 'Middle-Placement'}
+    )
+    match = Match(robot, script, physics.PhysicsEngine, teleop_time=0)
+
+    with talon_notifiers_disabled():
+        control.run_test(match.on_step)
+
+    assert match.match_time >= 15
+    assert robot.auto.field_string == 'LRL'
+    assert robot.auto.eject_cube
+
+    # drove forwards, angled towards the left side of the switch
+    x, y, angle = match.field.get_position()
+    assert x > 10
+    assert y < -3
+
+
+def test_scripted_teleop(control, robot):
+    script = MatchScript()
+    script.axis(1, 0, 1, -1)  # full forwards on the drive stick...
+    script.neutral(2, 0)      # ...for a second
+
+    match = Match(
+        robot, script, physics.PhysicsEngine,
+        autonomous_time=0, transition_time=0.5, teleop_time=3
+    )
+
+    with talon_notifiers_disabled():
+        control.run_test(match.on_step)
+
+    modes = {sample.mode for sample in match.samples}
+    assert modes == {'disabled', 'teleop'}
+
+    def position_at(t):
+        return next(s for s in match.samples if s.time >= t)
+
+    assert position_at(1).x < 0.5
+    assert position_at(2).x > 3
+    assert position_at(3).x - position_at(2.5).x < 0.1
@@ -0,0 +1,49 @@
+"""
+Checks how Monte Carlo autonomous trials are scored and summarized.
+"""
+import pytest
+from sim.montecarlo import Routine, Trial, TrialResult, default_noise, \
+    no_noise, summarize
+
+routine = Routine('baseline', 'autonomous.baseline_simple:Autonomous', {})
+
+
+def result(position, seed, score_pose, final_pose, score_time=6.0):
+    trial = Trial(
+        routine, position, 'LRL', seed,
+        no_noise if seed == 0 else default_noise
+    )
+
+    if score_pose is None:
+        return TrialResult(trial, False, None, None, final_pose)
+
+    return TrialResult(trial, True, score_time, score_pose, final_pose)
+
+
+def test_summarize():
+    nominal = [
+        result('Left', 0, (12, 4, 0), (12, 4, 0)),
+        result('Middle-Baseline', 0, None, (14, 0, 0)),
+    ]
+    results = [
+        # scored close enough / too far away / not at all
+        result('Left', 1, (12.5, 4, 0), (12.5, 4, 0), 5.5),
+        result('Left', 2, (12, 6, 0), (12, 6, 0.1), 6.5),
+        result('Left', 3, None, (12, 4, 0)),
+        # crossed the auto line / didn't
+        result('Middle-Baseline', 4, None, (13, 0, 0)),
+        result('Middle-Baseline', 5, None, (8, 0, 0)),
+    ]
+
+    left, middle = summarize(nominal, results, score_tolerance=1)
+
+    assert left.trials == 3
+    assert left.nominal_scored
+    assert left.success_rate == pytest.approx(1 / 3)
+    assert left.score_time[0] == pytest.approx(6.0)
+    assert left.score_time[2] == pytest.approx(6.5)
+    assert left.pose_error[2] == pytest.approx(2)
+
+    assert middle.success_rate == pytest.approx(0.5)
+    assert middle.score_time is None
+    assert middle.pose_error[2] == pytest.approx(6)
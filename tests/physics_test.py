@@ -0,0 +1,48 @@
+"""
+Drives the robot through the swerve physics model and checks the robot code
+sees the motion (pyfrc doesn't run physics.py during tests by itself).
+"""
+import math
+import physics
+from sim import HeadlessPhysics
+
+
+def test_physics_moves_robot(control, robot, hal_data):
+    field = HeadlessPhysics()
+    field.robot_enabled = True
+    engine = physics.PhysicsEngine(field)
+    control.set_operator_control(enabled=True)
+
+    last_time = [None]
+    poses = {}
+
+    def on_step(tm):
+        if last_time[0] is not None:
+            engine.update_sim(hal_data, tm, tm - last_time[0])
+        last_time[0] = tm
+
+        axes = hal_data['joysticks'][0]['axes']
+        axes[0] = axes[1] = axes[2] = 0
+
+        if tm < 2:
+            axes[1] = -1  # forwards
+        elif tm < 4:
+            axes[2] = -0.8  # turn in place
+
+        for mark in (2, 4):
+            if mark not in poses and tm >= mark:
+                poses[mark] = robot.odometry.pose
+
+        return tm < 4.5
+
+    control.run_test(on_step)
+
+    # drove forwards...
+    assert poses[2].x > 50
+    assert abs(poses[2].y) < 0.1 * poses[2].x
+
+    # ...then turned without going anywhere
+    assert abs(poses[4].heading - poses[2].heading) > math.radians(45)
+    assert math.hypot(
+        poses[4].x - poses[2].x, poses[4].y - poses[2].y
+    ) < 10
@@ -0,0 +1,183 @@
+"""
+Checks the fused pose estimator: dead reckoning, landmark corrections and
+replaying late sightings.
+"""
+import math
+import os
+import tracemalloc
+import pytest
+from sensors.pose_estimator import PoseEstimator
+from sensors.pose_history import Pose, inverse_transform_point
+
+LANDMARK = (200.0, 50.0)
+
+
+def drive(estimator, ticks, start=0, scale=1.0, sightings=None):
+    """
+    Drive forwards at 100 in/s while turning clockwise at 0.2 rad/s. The
+    odometry over-reads by ``scale``.
+
+    Returns:
+        the true poses at each tick.
+    """
+    poses = []
+    x = y = heading = 0
+    if start == 0:
+        # the IMU heading at the start
+        estimator.predict(-0.02, 0, 0, 0)
+
+    for tick in range(start, start + ticks):
+        t = tick * 0.02
+        mid = heading + 0.002
+        x += 2 * math.cos(mid)
+        y += 2 * math.sin(mid)
+        heading += 0.004
+        poses.append(Pose(x, y, heading))
+
+        estimator.predict(t, 2 * scale, 0, heading)
+
+        if sightings is not None:
+            sightings(tick, t, poses)
+
+    return poses
+
+
+def test_dead_reckoning():
+    estimator = PoseEstimator()
+    poses = drive(estimator, 100)
+
+    pose = estimator.get_pose()
+    assert pose.x == pytest.approx(poses[-1].x)
+    assert pose.y == pytest.approx(poses[-1].y)
+    assert pose.heading == pytest.approx(poses[-1].heading)
+
+    # uncertainty grows with distance
+    std = estimator.get_std()
+    assert std[0] > 1 and std[1] > 1
+
+
+def test_landmarks_correct_drift():
+    def see_landmark(tick, t, poses):
+        if tick % 10 == 0:
+            forward, right = inverse_transform_point(poses[-1], *LANDMARK)
+            assert estimator.add_landmark(t, *LANDMARK, forward, right, 2)
+
+    odometry_only = PoseEstimator()
+    drifted = drive(odometry_only, 150, scale=1.1)
+    estimator = PoseEstimator()
+    drive(estimator, 150, scale=1.1, sightings=see_landmark)
+
+    true = drifted[-1]
+    odometry_error = math.hypot(
+        odometry_only.get_pose().x - true.x,
+        odometry_only.get_pose().y - true.y
+    )
+    fused_error = math.hypot(
+        estimator.get_pose().x - true.x, estimator.get_pose().y - true.y
+    )
+
+    assert odometry_error > 20
+    assert fused_error < odometry_error / 4
+    assert estimator.sightings == 15
+
+
+def test_late_sighting_is_replayed():
+    # one sighting applied on time...
+    on_time = PoseEstimator()
+    late = PoseEstimator()
+
+    def see_on_time(tick, t, poses):
+        if tick == 40:
+            forward, right = inverse_transform_point(poses[-1], *LANDMARK)
+            on_time.add_landmark(t, *LANDMARK, forward + 5, right, 2)
+
+    seen = {}
+
+    def see_late(tick, t, poses):
+        if tick == 40:
+            seen['sighting'] = (
+                t, inverse_transform_point(poses[-1], *LANDMARK)
+            )
+        elif tick == 55:
+            # ...and the same sighting, arriving 0.3s late
+            t, (forward, right) = seen['sighting']
+            late.add_landmark(t, *LANDMARK, forward + 5, right, 2)
+
+    drive(on_time, 80, scale=1.1, sightings=see_on_time)
+    drive(late, 80, scale=1.1, sightings=see_late)
+
+    assert late.get_pose() == pytest.approx(on_time.get_pose())
+    assert late.get_std() == pytest.approx(on_time.get_std())
+
+
+def test_rejects_outliers_and_old_sightings():
+    estimator = PoseEstimator(history_size=10)
+    poses = drive(estimator, 30)
+
+    # far too old for the history
+    forward, right = inverse_transform_point(poses[0], *LANDMARK)
+    assert not estimator.add_landmark(0, *LANDMARK, forward, right)
+
+    # 10 feet off
+    forward, right = inverse_transform_point(poses[-1], *LANDMARK)
+    assert not estimator.add_landmark(
+        0.58, *LANDMARK, forward + 120, right, 2
+    )
+    assert estimator.rejected == 2
+
+
+def test_updates_do_not_allocate():
+    estimator = PoseEstimator()
+    drive(estimator, 100)
+
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        drive(estimator, 500, start=100)
+        estimator.add_landmark(11.5, *LANDMARK, 100, 0, 50)
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+
+    grown = sum(
+        stat.size_diff for stat in after.compare_to(before, 'filename')
+        if stat.traceback[0].filename.endswith(
+            os.path.join('sensors', 'pose_estimator.py')
+        )
+    )
+    # (a few floats at most; nothing that grows with the number of ticks)
+    assert grown < 1024
+
+
+def test_vision_landmarks_feed_the_estimator():
+    from sensors.pose_history import PoseHistory
+    from vision.calibration import CameraCalibration
+    from vision.targeting import VisionTargeting, TARGET_HEIGHTS
+    from vision.visionconstants import POWER_CUBE
+
+    estimator = PoseEstimator()
+    history = PoseHistory()
+    camera = CameraCalibration.from_fov(
+        320, 240, 60.0, mount_height=TARGET_HEIGHTS[POWER_CUBE] + 10
+    )
+    targeting = VisionTargeting(
+        None, history, camera, max_age=1.0, pose_estimator=estimator,
+        landmarks={POWER_CUBE: (70, 0)}
+    )
+
+    # drive forwards at 100 in/s, with odometry reading 20% short
+    estimator.predict(0, 0, 0, 0)
+    for i in range(1, 26):
+        estimator.predict(i * 0.02, 1.6, 0, 0)
+        history.add(i * 0.02, estimator.get_pose())
+
+    # at t = 0.2 the robot was really at x = 20, 50in from the cube
+    altitude = -math.degrees(math.atan2(10, 50))
+    targeting.add_location(POWER_CUBE, {
+        'azimuth': 0, 'altitude': altitude,
+        'local_capture_time': 0.2, 'age': 0.3,
+    })
+
+    # (only a little: one sighting, with the default 6in uncertainty)
+    assert estimator.sightings == 1
+    assert estimator.get_pose().x > 40.1
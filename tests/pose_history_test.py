@@ -0,0 +1,60 @@
+"""
+Checks pose history interpolation and latency-compensated vision targeting.
+"""
+import math
+import pytest
+from sensors.pose_history import Pose, PoseHistory
+from vision.calibration import CameraCalibration
+from vision.targeting import VisionTargeting, TARGET_HEIGHTS
+from vision.visionconstants import POWER_CUBE
+
+
+def test_pose_history_interpolates():
+    history = PoseHistory(capacity=4)
+    assert history.get_pose(1.0) is None
+
+    for i in range(6):
+        history.add(i * 0.02, Pose(i * 10, 0, i * 0.1))
+
+    # only the 4 newest samples are kept
+    assert len(history) == 4
+    assert history.oldest_time() == pytest.approx(0.04)
+
+    pose = history.get_pose(0.07)
+    assert pose.x == pytest.approx(35)
+    assert pose.heading == pytest.approx(0.35)
+
+    # out of range times are clamped
+    assert history.get_pose(0).x == 20
+    assert history.get_pose(1).x == 50
+
+
+def test_targeting_compensates_for_motion():
+    history = PoseHistory()
+    camera = CameraCalibration.from_fov(
+        320, 240, 60.0, mount_height=TARGET_HEIGHTS[POWER_CUBE] + 10
+    )
+    targeting = VisionTargeting(None, history, camera, max_age=1.0)
+
+    # drive forwards at 100 in/s
+    for i in range(26):
+        history.add(i * 0.02, Pose(i * 2, 0, 0))
+
+    # the cube was 50in straight ahead when the frame was captured at
+    # t = 0.2, and the result only arrived at t = 0.5
+    altitude = -math.degrees(math.atan2(10, 50))
+    location = {
+        'azimuth': 0, 'altitude': altitude,
+        'local_capture_time': 0.2, 'age': 0.3,
+    }
+
+    # (positions come from interpolated calibration tables, so allow a
+    # little slack)
+    x, y = targeting.add_location(POWER_CUBE, location)
+    assert x == pytest.approx(70, abs=0.1)
+    assert y == pytest.approx(0, abs=0.1)
+
+    # we've since moved 30in closer
+    target = targeting.get_target(POWER_CUBE)
+    assert target['distance'] == pytest.approx(20, abs=0.1)
+    assert target['bearing'] == pytest.approx(0, abs=0.5)
@@ -0,0 +1,124 @@
+"""
+Checks the on-demand loop profiler (see runtime/profiler.py), in both modes,
+in the simulator.
+"""
+import os
+import pstats
+import sys
+import pytest
+import wpilib
+
+
+def start_profile(control, robot, output_dir, mode):
+    robot_init = robot.robotInit
+
+    def init_and_profile():
+        robot_init()
+        robot.profiler.output_dir = output_dir
+
+        preferences = wpilib.Preferences.getInstance()
+        preferences.putString('Debug: Profiler Mode', mode)
+        preferences.putInt('Debug: Profiler Ticks', 20)
+        preferences.putBoolean('Debug: Profile Loop', True)
+
+    robot.robotInit = init_and_profile
+
+    # disabledPeriodic reloads the config every tick
+    control.set_operator_control(enabled=False)
+    control.run_test(lambda tm: tm < 2)
+
+    # the results are written in the background
+    profiler = robot.profiler
+    assert profiler.join(10)
+    return profiler
+
+
+def run_profile(control, robot, tmpdir, mode):
+    profiler = start_profile(control, robot, str(tmpdir), mode)
+
+    assert not profiler.running
+    assert profiler.mode == mode
+    assert profiler.ticks == 20
+    assert os.path.dirname(profiler.output_path) == str(tmpdir)
+    assert os.path.exists(profiler.output_path)
+
+    # the periodic methods are back to normal, and the flag has been turned
+    # off again
+    assert 'disabledPeriodic' not in vars(robot)
+    assert not wpilib.Preferences.getInstance().getBoolean(
+        'Debug: Profile Loop', True
+    )
+
+    assert 0 < len(profiler.top) <= 10
+    assert profiler.total_time > 0
+    for label, seconds, fraction in profiler.top:
+        assert seconds >= 0
+        assert 0 <= fraction <= 1
+
+    return profiler
+
+
+def test_cprofile(control, robot, tmpdir):
+    profiler = run_profile(control, robot, tmpdir, 'cprofile')
+
+    stats = pstats.Stats(profiler.output_path)
+    profiled = {name for filename, line, name in stats.stats}
+    assert 'disabledPeriodic' in profiled
+    assert 'update_smart_dashboard' in profiled
+
+
+def test_sampling(control, robot, tmpdir):
+    # the simulated ticks take almost no real time, so let the sampler in
+    # more often than the default 5ms to be sure it sees some of them
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(0.0001)
+    try:
+        profiler = run_profile(control, robot, tmpdir, 'sampling')
+    finally:
+        sys.setswitchinterval(switch_interval)
+
+    with open(profiler.output_path) as f:
+        stacks = f.read().splitlines()
+
+    assert stacks
+    for line in stacks:
+        stack, count = line.rsplit(' ', 1)
+        assert stack.startswith('robot.py:')
+        assert int(count) > 0
+
+
+def test_unwritable_output(control, robot, tmpdir, capsys):
+    # not a directory, so the profile can't be written there
+    output_dir = tmpdir.join('profiles')
+    output_dir.write('')
+
+    profiler = start_profile(control, robot, str(output_dir), 'cprofile')
+
+    # the robot kept running, and the error was logged
+    assert not profiler.running
+    assert profiler.output_path is None
+    assert 'disabledPeriodic' not in vars(robot)
+    assert not wpilib.Preferences.getInstance().getBoolean(
+        'Debug: Profile Loop', True
+    )
+    assert "Couldn't write the cprofile profile" in capsys.readouterr().err
+
+
+def test_unknown_mode(control, robot):
+    control.set_operator_control(enabled=False)
+    control.run_test(lambda tm: tm < 0.1)
+
+    with pytest.raises(ValueError):
+        robot.profiler.start('instrumenting', 10)
+
+    assert not robot.profiler.running
+
+
+def test_disabled_profiler_leaves_robot_alone(control, robot):
+    control.set_operator_control(enabled=True)
+    control.run_test(lambda tm: tm < 1)
+
+    assert not robot.profiler.running
+    assert robot.profiler.output_path is None
+    for name in ('disabledPeriodic', 'teleopPeriodic'):
+        assert name not in vars(robot)
@@ -0,0 +1,103 @@
+"""
+Checks how status frame declarations are merged into periods, and the CAN
+bus load estimate.
+"""
+import pytest
+import constants
+from canbus import StatusFrameManager
+from canbus.status_frames import StatusFrame, default_periods, \
+    unused_frame_period
+
+
+class FakeTalon:
+    def __init__(self):
+        self.periods = {}
+
+    def setStatusFramePeriod(self, frame, period, timeout_ms):
+        self.periods[frame] = period
+
+
+def test_declarations_are_merged():
+    talon, other = FakeTalon(), FakeTalon()
+
+    manager = StatusFrameManager()
+    manager.add_all([
+        (talon, {'general': 100, 'feedback': 50}),
+        (other, {'quadrature': 500}),
+    ])
+    # a second declaration for the same Talon only ever speeds frames up
+    manager.add(talon, {'feedback': 20, 'general': 200, 'analog': 1000.5})
+
+    assert [t for t, _ in manager.talons] == [talon, other]
+
+    periods = dict(manager.talons)[talon]
+    assert periods[StatusFrame.Status_1_General] == 100
+    assert periods[StatusFrame.Status_2_Feedback0] == 20
+    # can't be slower than the slowest period
+    assert periods[StatusFrame.Status_4_AinTempVbat] == unused_frame_period
+    assert periods[StatusFrame.Status_3_Quadrature] == unused_frame_period
+
+    manager.apply()
+    assert talon.periods == periods
+    assert set(other.periods) == set(default_periods)
+    assert other.periods[StatusFrame.Status_1_General] == unused_frame_period
+
+    with pytest.raises(KeyError):
+        manager.add(other, {'current': 10})
+
+
+def test_leader_keeps_default_general_frame():
+    leader, follower = FakeTalon(), FakeTalon()
+
+    manager = StatusFrameManager()
+    manager.add_all([
+        (leader, {'general': 100, 'feedback': 20}, True),
+        (follower, {'general': 100}),
+    ])
+
+    periods = dict(manager.talons)
+    general = StatusFrame.Status_1_General
+    assert periods[leader][general] == default_periods[general]
+    assert periods[follower][general] == 100
+
+    # faster than the default is still allowed
+    manager.add(leader, {'general': 5}, leader=True)
+    assert periods[leader][general] == 5
+
+
+def test_bus_load_estimate():
+    manager = StatusFrameManager()
+    assert manager.estimate_bus_load() == 0
+
+    manager.add(FakeTalon(), {'general': 10, 'feedback': 20})
+
+    # 100 control frames/s, 100 + 50 frames/s of the declared signals, and
+    # five frames at 255ms; 150 bits each on a 1Mbit/s bus
+    frames_per_sec = 100 + 100 + 50 + 5 * 1000 / 255
+    assert manager.estimate_bus_load() == pytest.approx(
+        frames_per_sec * 150 / 1e6
+    )
+
+    default_frames = 100 + 100 + 50 + 5 * 1000 / 160
+    assert manager.estimate_default_bus_load() == pytest.approx(
+        default_frames * 150 / 1e6
+    )
+
+    # every registered Talon adds to the load
+    manager.add(FakeTalon(), {})
+    assert manager.estimate_bus_load() == pytest.approx(
+        (frames_per_sec + 100 + 7 * 1000 / 255) * 150 / 1e6
+    )
+
+
+def test_lift_leader_general_frame(control, robot):
+    control.run_test(lambda tm: tm < 0.1)
+
+    periods = {
+        talon.getDeviceID(): periods
+        for talon, periods in robot.status_frames.talons
+    }
+    general = StatusFrame.Status_1_General
+    main, follower = constants.lift_ids['left'], constants.lift_ids['right']
+    assert periods[main][general] == default_periods[general]
+    assert periods[follower][general] == 100
@@ -0,0 +1,35 @@
+"""
+Checks that the driver camera stream controller respects its bandwidth cap.
+"""
+from vision.stream_control import StreamController, build_ladder
+
+
+def stream_rate(mode):
+    # pretend jpegs cost 0.1 bytes per pixel at quality 70
+    return mode.width * mode.height * mode.fps * 0.1 * (
+        (0.25 + mode.quality / 100) / 0.95
+    )
+
+
+def run(controller, n):
+    for _ in range(n):
+        controller.update(stream_rate(controller.mode), controller.mode.fps)
+
+
+def test_steps_down_under_cap_and_back_up():
+    ladder = build_ladder(320, 240, 30)
+    controller = StreamController(ladder, stream_rate(ladder[0]) / 3)
+
+    run(controller, 10)
+    assert controller.level > 0
+    assert stream_rate(controller.mode) <= controller.bandwidth_cap
+
+    controller.set_bandwidth_cap(stream_rate(ladder[0]) * 2)
+    run(controller, 2 * controller.up_delay * len(ladder))
+    assert controller.level == 0
+
+
+def test_no_cap_keeps_best_mode():
+    controller = StreamController(build_ladder(320, 240, 30), 0)
+    assert controller.update(1e9, 30) is None
+    assert controller.level == 0
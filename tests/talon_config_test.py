@@ -0,0 +1,182 @@
+"""
+Checks that the Talon configurator verifies settings and retries only the
+ones that didn't stick.
+"""
+from collections import Counter
+import wpilib
+from ctre._impl import ParamEnum
+from ctre.talonsrx import TalonSRX
+from canbus import StatusFrameManager, TalonConfigurator
+
+FeedbackDevice = TalonSRX.FeedbackDevice
+
+
+class FakeTalon:
+    """
+    Remembers parameters so they can be read back, and can be told to lose
+    the next few of a kind of call (as if the frames were dropped).
+    """
+
+    def __init__(self, device_id):
+        self.device_id = device_id
+        self.params = {}
+        self.calls = Counter()
+        self.drop = Counter()
+        self.quadrature_position = None
+
+    def _set(self, method, param, ordinal, value):
+        self.calls[method] += 1
+        if self.drop[method] > 0:
+            self.drop[method] -= 1
+            return 1  # error code
+
+        self.params[(param, ordinal)] = value
+        return 0
+
+    def getDeviceID(self):
+        return self.device_id
+
+    def configSelectedFeedbackSensor(self, device, pid_idx, timeout_ms):
+        return self._set(
+            'feedback', ParamEnum.eFeedbackSensorType, pid_idx, device
+        )
+
+    def configAllowableClosedloopError(self, slot, value, timeout_ms):
+        return self._set(
+            'allowable_error', ParamEnum.eProfileParamSlot_AllowableErr, slot,
+            value
+        )
+
+    def setStatusFramePeriod(self, frame, period, timeout_ms):
+        return self._set(
+            'status_frame', ParamEnum.eStatusFramePeriod, int(frame), period
+        )
+
+    def setQuadraturePosition(self, position, timeout_ms):
+        error = self._set('quadrature', None, None, position)
+        if not error:
+            self.quadrature_position = position
+
+        return error
+
+    def configGetParameter(self, param, ordinal, timeout_ms):
+        self.calls['read'] += 1
+        return float(self.params.get((param, ordinal), -1))
+
+    def brown_out(self):
+        self.params = {}
+
+
+def make_configurator():
+    steer, drive = FakeTalon(1), FakeTalon(2)
+
+    configurator = TalonConfigurator()
+    configurator.add(steer, {
+        'feedback_sensor': FeedbackDevice.Analog,
+        'allowable_error': 3,
+    })
+    configurator.add(drive, {
+        'feedback_sensor': FeedbackDevice.QuadEncoder,
+        'quadrature_position': 0,
+    })
+
+    status_frames = StatusFrameManager()
+    status_frames.add(steer, {'feedback': 20})
+    configurator.add_status_frames(status_frames)
+
+    return configurator, steer, drive
+
+
+def test_apply_and_verify():
+    configurator, steer, drive = make_configurator()
+    report = configurator.apply()
+
+    assert report.failures == []
+    assert report.retried == 0
+    assert report.unverified == 0
+    assert report.settings == report.verified == 4 + 7
+
+    assert steer.calls['status_frame'] == 7
+    assert steer.calls['feedback'] == drive.calls['feedback'] == 1
+    assert drive.quadrature_position == 0
+
+
+def test_only_failures_are_retried():
+    configurator, steer, drive = make_configurator()
+    steer.drop['allowable_error'] = 1
+    drive.drop['quadrature'] = 1
+
+    report = configurator.apply()
+
+    assert report.failures == []
+    assert report.retried == 2
+    assert steer.calls['allowable_error'] == 2
+    assert drive.calls['quadrature'] == 2
+    assert steer.calls['feedback'] == drive.calls['feedback'] == 1
+    assert steer.calls['status_frame'] == 7
+
+
+def test_persistent_failure_is_reported():
+    configurator, steer, drive = make_configurator()
+    steer.drop['feedback'] = 10
+
+    report = configurator.apply()
+
+    assert len(report.failures) == 1
+    failure = report.failures[0]
+    assert failure.device == 'Talon 1'
+    assert failure.setting == 'feedback_sensor'
+    assert steer.calls['feedback'] == 1 + configurator.retries
+
+
+def test_repair_after_brown_out():
+    configurator, steer, drive = make_configurator()
+    configurator.apply()
+
+    # nothing wrong: only reads, nothing is re-sent
+    steer.calls.clear()
+    report = configurator.repair()
+    assert report.retried == 0
+    assert set(steer.calls) == {'read'}
+
+    steer.brown_out()
+    drive.quadrature_position = 1234
+
+    report = configurator.repair()
+    assert report.failures == []
+    assert report.retried == 2 + 7
+    assert steer.params[(ParamEnum.eFeedbackSensorType, 0)] == \
+        FeedbackDevice.Analog
+
+    # the drive encoder isn't zeroed again
+    assert drive.quadrature_position == 1234
+
+
+def test_robot_repairs_only_after_a_brownout(control, robot, monkeypatch):
+    control.run_test(lambda tm: tm < 0.1)
+
+    repairs = []
+    monkeypatch.setattr(
+        robot.talon_config, 'repair',
+        lambda: repairs.append(1) or robot.talon_config.apply()
+    )
+
+    browned_out = [False]
+    monkeypatch.setattr(
+        wpilib.RobotController, 'isBrownedOut', lambda: browned_out[0]
+    )
+
+    # an ordinary enable doesn't read every setting back when it ends
+    robot.check_brownout()
+    robot.disabledInit()
+    assert repairs == []
+
+    # a brownout does, once
+    browned_out[0] = True
+    robot.check_brownout()
+    browned_out[0] = False
+    robot.check_brownout()
+
+    robot.disabledInit()
+    robot.disabledInit()
+    assert repairs == [1]
@@ -0,0 +1,190 @@
+"""
+Checks that the traction monitor flags slipping modules, and only those.
+"""
+import math
+import pytest
+import config
+import config.snapshot
+import physics
+from sim import Match, MatchScript, talon_notifiers_disabled
+from swerve.odometry import SwerveOdometry, drive_ticks_per_inch
+from swerve.traction import TractionMonitor
+
+
+class FakeTalon:
+    def __init__(self):
+        self.position = 0
+
+    def getQuadraturePosition(self):
+        return self.position
+
+
+class FakeModule:
+    def __init__(self, name):
+        self.name = name
+        self.drive_reversed = False
+        self.drive_talon = FakeTalon()
+        self.angle = 0
+
+    def get_steer_angle(self):
+        return self.angle
+
+
+class FakeIMU:
+    def __init__(self):
+        self.heading = 0
+
+    def get_continuous_heading(self):
+        return self.heading
+
+
+class FakeDrivetrain:
+    length = 23
+    width = 27
+
+    def __init__(self):
+        self.modules = [
+            FakeModule(name) for name in (
+                'Front Right', 'Front Left', 'Back Right', 'Back Left'
+            )
+        ]
+
+
+class FakeVelocity:
+    max_dt = 0.1
+
+    def __init__(self):
+        self.velocities = [0, 0, 0, 0]
+
+
+def make_monitor():
+    drivetrain = FakeDrivetrain()
+    velocity = FakeVelocity()
+    return TractionMonitor(drivetrain, velocity), drivetrain, velocity
+
+
+def test_straight_and_turning_are_not_slip():
+    monitor, drivetrain, velocity = make_monitor()
+
+    # driving diagonally
+    velocity.velocities = [100] * 4
+    monitor.update([0.5] * 4, 0, 0)
+    monitor.update([0.5] * 4, 0, 0.02)
+    assert monitor.slipping == [False] * 4
+
+    # turning clockwise in place at 2 rad/s
+    rate = 2
+    angles = []
+    velocity.velocities = []
+    for fwd, right in zip(monitor.module_forward, monitor.module_right):
+        angles.append(math.atan2(rate * fwd, -rate * right))
+        velocity.velocities.append(rate * math.hypot(fwd, right))
+
+    for i in range(5):
+        monitor.update(angles, rate * i * 0.02, 1 + (i * 0.02))
+
+    assert monitor.slipping == [False] * 4
+    assert max(monitor.residuals) == pytest.approx(0, abs=1e-6)
+
+
+@pytest.mark.parametrize('reverse_heading', [False, True])
+def test_odometry_turning_in_place_with_a_module_left_out(
+        monkeypatch, reverse_heading):
+    monkeypatch.setattr(
+        config.snapshot, '_current',
+        config.defaults()._replace(reverse_heading=reverse_heading)
+    )
+
+    drivetrain = FakeDrivetrain()
+    imu = FakeIMU()
+    odometry = SwerveOdometry(drivetrain, imu)
+
+    class FakeTraction:
+        slipping = [False, False, True, False]
+
+    odometry.traction = FakeTraction()
+
+    # turn clockwise in place at 2 rad/s; the slipping module's wheel
+    # spins without going anywhere
+    rate = 2
+    dt = 0.02
+    for tick in range(50):
+        for module, fwd, right in zip(
+            drivetrain.modules, odometry.module_forward,
+            odometry.module_right
+        ):
+            module.angle = math.atan2(rate * fwd, -rate * right)
+            dist = rate * dt * math.hypot(fwd, right)
+            if module.name == 'Back Right':
+                dist *= 3
+
+            module.drive_talon.position += dist * drive_ticks_per_inch
+
+        # (which the IMU reports as anticlockwise with Reverse Heading
+        # Direction set)
+        imu.heading += (-rate if reverse_heading else rate) * dt
+        pose = odometry.update()
+
+    assert pose.x == pytest.approx(0, abs=1e-6)
+    assert pose.y == pytest.approx(0, abs=1e-6)
+    assert pose.heading == pytest.approx(2)
+
+
+def test_spinning_wheel_is_flagged():
+    monitor, drivetrain, velocity = make_monitor()
+
+    velocity.velocities = [100, 100, 180, 100]
+    for i in range(5):
+        monitor.update([0] * 4, 0, i * 0.02)
+
+    assert monitor.slipping == [False, False, True, False]
+
+    # 80 in/s of excess wheel travel, for 4 ticks
+    assert monitor.slip_ticks[2] == pytest.approx(
+        80 * 0.08 * drive_ticks_per_inch
+    )
+    assert monitor.slip_ticks[0] == 0
+
+    assert monitor.get_output_scale(2) == 1
+    monitor.limit_output = True
+    assert monitor.get_output_scale(2) == monitor.slipping_output_scale
+    assert monitor.get_output_scale(0) == 1
+
+    # back to normal, and the hysteresis lets go
+    velocity.velocities = [100] * 4
+    monitor.update([0] * 4, 0, 0.1)
+    assert monitor.slipping == [False] * 4
+
+    monitor.reset_slip_ticks()
+    assert monitor.slip_ticks == [0] * 4
+
+
+def test_no_slip_in_normal_driving(control, robot):
+    # drive, strafe and turn, one after another
+    script = MatchScript()
+    script.axis(0.5, 0, 1, -1)
+    script.neutral(1.5, 0)
+    script.axis(2.5, 0, 0, 1)
+    script.neutral(3.5, 0)
+    script.axis(4.5, 0, 2, 1)
+    script.neutral(5.5, 0)
+
+    match = Match(
+        robot, script, physics.PhysicsEngine,
+        autonomous_time=0, transition_time=0.5, teleop_time=6
+    )
+
+    slips = []
+    teleop_periodic = robot.teleopPeriodic
+
+    def check():
+        teleop_periodic()
+        if any(robot.traction.slipping):
+            slips.append(list(robot.traction.residuals))
+
+    robot.teleopPeriodic = check
+
+    with talon_notifiers_disabled():
+        control.run_test(match.on_step)
+
+    assert slips == []
@@ -0,0 +1,106 @@
+"""
+Checks the drive velocity estimator against a known wheel motion.
+"""
+import random
+import pytest
+from swerve.odometry import drive_ticks_per_inch
+from swerve.velocity import VelocityEstimator
+
+
+class FakeModule:
+    def __init__(self, drive_reversed=False):
+        self.name = 'Fake'
+        self.drive_reversed = drive_reversed
+
+
+class FakeDrivetrain:
+    def __init__(self):
+        self.modules = [FakeModule(), FakeModule(drive_reversed=True)]
+
+
+def run(estimator, accel, duration, jitter=0.002, seed=1):
+    """
+    Accelerate from rest, sampling whole encoder ticks every 20ms or so.
+    """
+    rng = random.Random(seed)
+    t = 0
+    while t < duration:
+        dist = 0.5 * accel * t * t * drive_ticks_per_inch
+        estimator.update([int(dist), -int(dist)], t)
+        t += 0.02 + rng.uniform(-jitter, jitter)
+
+    return t
+
+
+def test_tracks_acceleration():
+    estimator = VelocityEstimator(FakeDrivetrain())
+    t = run(estimator, 100, 1.0)
+
+    # both modules move forwards; the second one is wired in reverse
+    for vel, acc in zip(estimator.velocities, estimator.accelerations):
+        assert vel == pytest.approx(100 * t, rel=0.05)
+        assert acc == pytest.approx(100, rel=0.2)
+
+
+def test_follows_a_step_quickly():
+    estimator = VelocityEstimator(FakeDrivetrain())
+
+    # constant speed: 50 in/s
+    for i in range(50):
+        t = i * 0.02
+        ticks = int(50 * t * drive_ticks_per_inch)
+        estimator.update([ticks, -ticks], t)
+
+    # stop dead: within 0.2s the estimate should be most of the way there
+    stop = ticks
+    for i in range(50, 60):
+        estimator.update([stop, -stop], i * 0.02)
+
+    assert abs(estimator.velocities[0]) < 10
+
+
+def test_restarts_after_a_gap():
+    estimator = VelocityEstimator(FakeDrivetrain())
+    run(estimator, 100, 0.5)
+
+    # nothing for a second, then a sample far away: no huge spike
+    estimator.update([100000, -100000], 2.0)
+    assert estimator.velocities == [0, 0]
+
+    # a repeated timestamp is ignored
+    estimator.update([200000, -200000], 2.0)
+    assert estimator.positions[0] == pytest.approx(
+        100000 / drive_ticks_per_inch
+    )
+
+
+def test_matches_simulated_wheel_speeds(control, robot):
+    import physics
+    from sim import Match, MatchScript, talon_notifiers_disabled
+
+    script = MatchScript()
+    script.axis(0.5, 0, 1, -1)
+
+    match = Match(
+        robot, script, physics.PhysicsEngine,
+        autonomous_time=0, transition_time=0.5, teleop_time=1.5
+    )
+
+    samples = []
+    teleop_periodic = robot.teleopPeriodic
+
+    def sample():
+        teleop_periodic()
+        angles, speeds = match.physics.get_module_states()
+        samples.append((list(robot.drive_velocity.velocities), speeds))
+
+    robot.teleopPeriodic = sample
+
+    with talon_notifiers_disabled():
+        control.run_test(match.on_step)
+
+    # while driving forwards, after the first half second
+    estimates, speeds = samples[-10]
+    for estimate, speed in zip(estimates, speeds):
+        assert abs(speed) > 20
+        assert abs(estimate) == pytest.approx(abs(speed), rel=0.1)
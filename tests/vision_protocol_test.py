@@ -0,0 +1,64 @@
+"""
+Checks that vision messages survive the trip through the binary protocol,
+and that malformed ones are rejected.
+"""
+import pytest
+from vision import protocol
+from vision.visionconstants import THINGS, POWER_CUBE, SCALE_LEFT_EDGE
+
+
+@pytest.mark.parametrize('thing', THINGS + [None])
+def test_command_round_trip(thing):
+    data = protocol.encode_command(42, thing)
+    assert len(data) == 7
+
+    assert protocol.decode_command(data) == {
+        'locate': thing, 'command_id': 42
+    }
+
+
+def test_location_round_trip():
+    data = protocol.encode_location(
+        2 ** 32 + 5, 9, SCALE_LEFT_EDGE, 1234.5678, 1234.5901, -12.25, 3.5
+    )
+    assert len(data) == 35
+
+    assert protocol.decode_location(data) == {
+        'azimuth': -12.25,
+        'altitude': 3.5,
+        'thing': SCALE_LEFT_EDGE,
+        'command_id': 5,  # wrapped to 32 bits
+        'sequence': 9,
+        'capture_time': 1234.5678,
+        'publish_time': 1234.5901,
+    }
+
+    # angles are sent as 32-bit floats
+    location = protocol.decode_location(
+        protocol.encode_location(1, 1, None, 0, 0, 0.1, -0.2)
+    )
+    assert location['thing'] is None
+    assert location['azimuth'] == pytest.approx(0.1, abs=1e-6)
+    assert location['altitude'] == pytest.approx(-0.2, abs=1e-6)
+
+
+def test_bad_messages_are_rejected():
+    location = protocol.encode_location(1, 1, POWER_CUBE, 0, 0, 0, 0)
+    version = bytes([protocol.VERSION + 1])
+    msg_type = bytes([protocol.MSG_COMMAND])
+    thing = bytes([len(THINGS)])
+
+    bad = [
+        location[:-1],                          # truncated
+        location + b'\0',                       # too long
+        version + location[1:],                 # wrong version
+        location[:1] + msg_type + location[2:],  # wrong type
+        location[:10] + thing + location[11:],  # unknown thing
+    ]
+
+    for data in bad:
+        with pytest.raises(ValueError):
+            protocol.decode_location(data)
+
+    with pytest.raises(ValueError):
+        protocol.encode_command(1, 'goal')
@@ -0,0 +1,202 @@
+"""
+Checks that VisionMaster reads multi-target results in one round trip, ages
+them from when they were published, and survives malformed messages.
+"""
+import pytest
+
+redis = pytest.importorskip('redis')
+
+from vision import protocol, visionmaster  # noqa: E402
+from vision.visionconstants import PROTOCOL_BINARY, PROTOCOL_JSON, \
+    LOCATION_CHANNEL, POWER_CUBE, SWITCH_LEFT, SWITCH_RIGHT, TARGETS_KEY, \
+    TARGET_LOCATION_KEY_PREFIX  # noqa: E402
+
+
+class FakeClock:
+    def __init__(self):
+        self.time = 100.0
+
+    def __call__(self):
+        return self.time
+
+
+class FakePubSub:
+    def __init__(self):
+        self.handlers = {}
+
+    def subscribe(self, **handlers):
+        self.handlers.update(handlers)
+
+    def run_in_thread(self, sleep_time):
+        return self
+
+    def stop(self):
+        pass
+
+
+class FakeRedis:
+    """
+    Just enough of a redis client for VisionMaster, with keys that expire on
+    a shared fake clock. Counts the requests made to the server.
+    """
+
+    clock = None
+
+    def __init__(self, host, port):
+        self.values = {}
+        self.expiry = {}
+        self.sets = {}
+        self.requests = 0
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        return FakePubSub()
+
+    def set(self, key, value, px=None):
+        self.values[key] = value
+        if px is not None:
+            self.expiry[key] = self.clock() + px / 1000
+
+    def _expire(self, key):
+        if key in self.expiry and self.expiry[key] <= self.clock():
+            del self.values[key]
+            del self.expiry[key]
+
+    def pttl(self, key):
+        self._expire(key)
+        if key not in self.values:
+            return -2
+        if key not in self.expiry:
+            return -1
+        return int(round((self.expiry[key] - self.clock()) * 1000))
+
+    def get(self, key):
+        self.requests += 1
+        self._expire(key)
+        return self.values.get(key)
+
+    def smembers(self, key):
+        self.requests += 1
+        return set(self.sets.get(key, ()))
+
+    def register_script(self, script):
+        assert script == visionmaster.GET_LOCATIONS_SCRIPT
+
+        # what the script does on the server
+        def get_locations(keys, args):
+            self.requests += 1
+
+            prefix, things = args[0], list(args[1:])
+            if not things:
+                things = list(self.sets.get(keys[0], ()))
+
+            reply = []
+            for thing in things:
+                if isinstance(thing, str):
+                    thing = thing.encode()
+
+                key = prefix + thing.decode()
+                pttl = self.pttl(key)
+                reply += [thing, self.values.get(key), pttl]
+            return reply
+
+        return get_locations
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(FakeRedis, 'clock', clock)
+    monkeypatch.setattr(visionmaster.redis, 'Redis', FakeRedis)
+    return clock
+
+
+def publish(r, clock, thing, azimuth, latency=0.02):
+    r.set(
+        TARGET_LOCATION_KEY_PREFIX + thing,
+        protocol.encode_location(
+            3, 7, thing, clock() - latency, clock(), azimuth, 1.5
+        ),
+        px=500
+    )
+
+
+def test_results_age_from_publish_time(clock):
+    master = visionmaster.VisionMaster('jetson', 6379, PROTOCOL_BINARY,
+                                       clock=clock)
+    r = master.r
+    r.sets[TARGETS_KEY] = {SWITCH_RIGHT.encode(), POWER_CUBE.encode()}
+
+    publish(r, clock, POWER_CUBE, 12.5)
+    clock.time += 0.3
+
+    locations = master.get_locations()
+    assert r.requests == 1
+    assert list(locations) == [POWER_CUBE, SWITCH_RIGHT]
+    assert locations[SWITCH_RIGHT] is None
+
+    cube = locations[POWER_CUBE]
+    assert cube['azimuth'] == 12.5
+    assert cube['received_time'] == pytest.approx(100.0)
+    assert cube['latency'] == pytest.approx(0.02)
+    assert cube['age'] == pytest.approx(0.32)
+
+    assert master.is_fresh(cube, 0.4)
+    assert not master.is_fresh(cube, 0.25)
+
+    # the result expires after 500ms
+    clock.time += 0.25
+    assert master.get_locations([POWER_CUBE]) == {POWER_CUBE: None}
+
+
+def test_requested_things(clock):
+    master = visionmaster.VisionMaster('jetson', 6379, PROTOCOL_BINARY,
+                                       clock=clock)
+    r = master.r
+
+    publish(r, clock, SWITCH_LEFT, -4)
+    locations = master.get_locations([SWITCH_RIGHT, SWITCH_LEFT])
+    assert r.requests == 1
+    assert locations[SWITCH_RIGHT] is None
+    assert locations[SWITCH_LEFT]['age'] == pytest.approx(0.02)
+
+    assert master.get_locations([]) == {}
+    assert r.requests == 1
+
+
+def test_bad_messages_are_dropped(clock):
+    master = visionmaster.VisionMaster('jetson', 6379, PROTOCOL_BINARY,
+                                       clock=clock)
+    on_location = master.pubsub.handlers[LOCATION_CHANNEL]
+
+    data = protocol.encode_location(1, 1, POWER_CUBE, 99.9, 100, 2.5, 0)
+    on_location({'data': data})
+    assert master.get_location()['azimuth'] == 2.5
+
+    # a bad message doesn't raise (which would kill the listener thread),
+    # and the next good one still gets through
+    on_location({'data': data[:-1]})
+    on_location({'data': None})
+    assert master.dropped_messages == 2
+
+    clock.time += 1
+    on_location({'data': protocol.encode_location(
+        1, 2, POWER_CUBE, 100.9, 101, -1, 0
+    )})
+    assert master.get_location()['azimuth'] == -1
+    assert master.get_location()['sequence'] == 2
+
+
+def test_json_results(clock):
+    master = visionmaster.VisionMaster('jetson', 6379, PROTOCOL_JSON,
+                                       clock=clock)
+    r = master.r
+    r.sets[TARGETS_KEY] = {POWER_CUBE.encode()}
+    r.set(
+        TARGET_LOCATION_KEY_PREFIX + POWER_CUBE,
+        b'{"azimuth": 3, "altitude": -2}', px=500
+    )
+
+    assert master.get_locations() == {
+        POWER_CUBE: {'azimuth': 3, 'altitude': -2}
+    }
+    assert r.requests == 1
@@ -0,0 +1,83 @@
+"""
+Benchmark the NumPy detector on synthetic frames.
+
+Usage::
+
+    python -m vision.benchmark_detector [frames]
+
+Reports frames per second for each resolution, both searching every frame
+in full and with region of interest tracking (the normal case once a target
+has been found).
+"""
+import sys
+import time
+import numpy as np
+from vision.detector import Detector
+from vision.visionconstants import SWITCH_LEFT, SWITCH_RIGHT, POWER_CUBE
+
+RESOLUTIONS = [(160, 120), (320, 240), (640, 480), (1280, 720)]
+
+# BGR, like the frames from the cameras
+TAPE_BGR = (60, 230, 40)
+CUBE_BGR = (20, 200, 230)
+
+
+def make_frames(width, height, count, seed=0):
+    """
+    noisy frames with two tape strips and a cube that drift across the image
+    :return: list of HxWx3 uint8 BGR arrays
+    """
+    rng = np.random.RandomState(seed)
+    frames = []
+
+    tape_w, tape_h = max(width // 80, 2), height // 4
+    cube_w, cube_h = width // 8, int(width // 8 / 1.18)
+
+    for i in range(count):
+        frame = rng.randint(0, 90, (height, width, 3)).astype(np.uint8)
+        shift = (i * width // 200) % (width // 4)
+
+        for x in (width // 4 + shift, width // 2 + shift):
+            y = height // 3
+            frame[y:y + tape_h, x:x + tape_w] = TAPE_BGR
+
+        x, y = width // 8 + shift, height - cube_h - 10
+        frame[y:y + cube_h, x:x + cube_w] = CUBE_BGR
+
+        frames.append(frame)
+
+    return frames
+
+
+def run(frames, width, height, use_roi):
+    things = [SWITCH_LEFT, SWITCH_RIGHT, POWER_CUBE]
+    # no frame skipping: measure raw speed
+    detector = Detector(width, height, fps=None,
+                        refresh_interval=15 if use_roi else 0)
+
+    start = time.perf_counter()
+    found = 0
+    for frame in frames:
+        found += len(detector.detect(frame, things))
+    elapsed = time.perf_counter() - start
+
+    return len(frames) / elapsed, found / (len(frames) * len(things))
+
+
+def main(n_frames=60):
+    print('{:>10} {:>12} {:>12} {:>8}'.format(
+        'resolution', 'full fps', 'roi fps', 'found'
+    ))
+
+    for width, height in RESOLUTIONS:
+        frames = make_frames(width, height, n_frames)
+        full_fps, _ = run(frames, width, height, False)
+        roi_fps, found = run(frames, width, height, True)
+
+        print('{:>10} {:>12.1f} {:>12.1f} {:>7.0%}'.format(
+            '{}x{}'.format(width, height), full_fps, roi_fps, found
+        ))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,251 @@
+"""
+Camera calibration: intrinsics, lens distortion and mounting pose, baked
+into lookup tables.
+
+Two sets of tables are built:
+
+- per pixel: the (undistorted) azimuth / altitude of every pixel, so the
+  detector turns a blob centre into angles with one interpolated lookup
+  instead of undistorting it
+- per angle: for a given target height, where a ray at each
+  (azimuth, altitude) hits that height, relative to the robot centre. Vision
+  results are turned into robot-relative positions with one interpolated
+  lookup instead of redoing the mounting trig
+
+Angles follow the detector: azimuth is right positive, altitude is up
+positive, both in degrees relative to the camera's optical axis, with
+tan(azimuth) and tan(altitude) being the undistorted normalised image
+coordinates. Distances are in inches.
+"""
+import math
+import numpy as np
+
+
+def _bilinear(table, x, y):
+    """
+    interpolate a 2d table at fractional (column x, row y), clamped to the
+    table edges
+    """
+    rows, cols = table.shape[:2]
+    x = min(max(x, 0.0), cols - 1.0)
+    y = min(max(y, 0.0), rows - 1.0)
+
+    x0 = min(int(x), cols - 2) if cols > 1 else 0
+    y0 = min(int(y), rows - 2) if rows > 1 else 0
+    fx = x - x0
+    fy = y - y0
+
+    top = table[y0, x0] * (1 - fx) + table[y0, x0 + 1] * fx
+    bottom = table[y0 + 1, x0] * (1 - fx) + table[y0 + 1, x0 + 1] * fx
+    return top * (1 - fy) + bottom * fy
+
+
+class CameraCalibration:
+    """
+    Geometry of a single camera, with precomputed lookup tables
+    """
+
+    def __init__(self, width, height, fx, fy, cx=None, cy=None,
+                 distortion=(0, 0, 0, 0, 0), mount_height=20.0,
+                 mount_pitch=0.0, mount_yaw=0.0, mount_forward=0.0,
+                 mount_right=0.0, angle_step=0.25):
+        """
+        :param width: image width in pixels
+        :param height: image height in pixels
+        :param fx: horizontal focal length in pixels
+        :param fy: vertical focal length in pixels
+        :param cx: principal point x, defaults to the image centre
+        :param cy: principal point y, defaults to the image centre
+        :param distortion: (k1, k2, p1, p2, k3) brown-conrady coefficients,
+            as produced by opencv's calibrateCamera
+        :param mount_height: lens height above the carpet, inches
+        :param mount_pitch: camera tilt, degrees, up positive
+        :param mount_yaw: camera pan, degrees, right positive
+        :param mount_forward: lens position ahead of the robot centre, inches
+        :param mount_right: lens position right of the robot centre, inches
+        :param angle_step: resolution of the per-angle tables, degrees
+        """
+        self.width = width
+        self.height = height
+        self.fx = fx
+        self.fy = fy
+        self.cx = cx if cx is not None else width / 2
+        self.cy = cy if cy is not None else height / 2
+        self.distortion = tuple(distortion)
+
+        self.mount_height = mount_height
+        self.mount_pitch = mount_pitch
+        self.mount_yaw = mount_yaw
+        self.mount_forward = mount_forward
+        self.mount_right = mount_right
+        self.angle_step = angle_step
+
+        self.azimuth_table, self.altitude_table = self._build_pixel_tables()
+
+        # the angle grid covers everything the camera can see
+        self.min_azimuth = float(self.azimuth_table.min())
+        self.min_altitude = float(self.altitude_table.min())
+        n_az = int(math.ceil(
+            (self.azimuth_table.max() - self.min_azimuth) / angle_step
+        )) + 1
+        n_alt = int(math.ceil(
+            (self.altitude_table.max() - self.min_altitude) / angle_step
+        )) + 1
+        self.grid_azimuths = self.min_azimuth + angle_step * np.arange(n_az)
+        self.grid_altitudes = self.min_altitude + angle_step * np.arange(n_alt)
+
+        # target height -> (forward table, right table)
+        self._ground_tables = {}
+
+    @classmethod
+    def from_fov(cls, width, height, hfov, **kwargs):
+        """
+        calibration for an ideal (undistorted) camera with a known
+        horizontal field of view in degrees
+        """
+        f = (width / 2) / math.tan(math.radians(hfov) / 2)
+        return cls(width, height, f, f, **kwargs)
+
+    def undistort(self, u, v, iterations=8):
+        """
+        convert pixel coordinates to undistorted normalised coordinates
+        :param u: pixel x (array or scalar)
+        :param v: pixel y (array or scalar)
+        :return: (x, y) normalised coordinates, y down
+        """
+        k1, k2, p1, p2, k3 = self.distortion
+        xd = (np.asarray(u, dtype=np.float64) - self.cx) / self.fx
+        yd = (np.asarray(v, dtype=np.float64) - self.cy) / self.fy
+
+        if not any(self.distortion):
+            return xd, yd
+
+        # fixed point iteration, same as opencv's undistortPoints
+        x, y = xd, yd
+        for _ in range(iterations):
+            r2 = x * x + y * y
+            radial = 1 + r2 * (k1 + r2 * (k2 + r2 * k3))
+            dx = 2 * p1 * x * y + p2 * (r2 + 2 * x * x)
+            dy = p1 * (r2 + 2 * y * y) + 2 * p2 * x * y
+            x = (xd - dx) / radial
+            y = (yd - dy) / radial
+
+        return x, y
+
+    def _build_pixel_tables(self):
+        v, u = np.mgrid[0:self.height + 1, 0:self.width + 1]
+        x, y = self.undistort(u, v)
+        return np.degrees(np.arctan(x)), np.degrees(np.arctan(-y))
+
+    def _build_ground_tables(self, target_height):
+        az, alt = np.meshgrid(
+            np.radians(self.grid_azimuths), np.radians(self.grid_altitudes)
+        )
+
+        # ray in the camera frame: forward, right, up
+        fwd = np.ones_like(az)
+        right = np.tan(az)
+        up = np.tan(alt)
+
+        pitch = math.radians(self.mount_pitch)
+        fwd, up = (
+            fwd * math.cos(pitch) - up * math.sin(pitch),
+            fwd * math.sin(pitch) + up * math.cos(pitch)
+        )
+
+        yaw = math.radians(self.mount_yaw)
+        fwd, right = (
+            fwd * math.cos(yaw) - right * math.sin(yaw),
+            fwd * math.sin(yaw) + right * math.cos(yaw)
+        )
+
+        # scale each ray to reach the target height; rays that never get
+        # there (or only behind the camera) are marked invalid
+        rise = target_height - self.mount_height
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = rise / up
+        t[~np.isfinite(t) | (t <= 0)] = np.nan
+
+        return (
+            self.mount_forward + t * fwd,
+            self.mount_right + t * right
+        )
+
+    def ground_tables(self, target_height=0.0):
+        """
+        get (and build on first use) the per-angle tables for a target height
+        :return: (forward, right) arrays indexed [altitude, azimuth]
+        """
+        tables = self._ground_tables.get(target_height)
+        if tables is None:
+            tables = self._build_ground_tables(target_height)
+            self._ground_tables[target_height] = tables
+
+        return tables
+
+    def pixel_to_angles(self, x, y):
+        """
+        :param x: pixel x, may be fractional
+        :param y: pixel y, may be fractional
+        :return: (azimuth, altitude) in degrees
+        """
+        return (
+            float(_bilinear(self.azimuth_table, x, y)),
+            float(_bilinear(self.altitude_table, x, y))
+        )
+
+    def angles_to_robot(self, azimuth, altitude, target_height=0.0):
+        """
+        where a ray from the camera reaches a given height
+        :param azimuth: degrees
+        :param altitude: degrees
+        :param target_height: height of the target above the carpet, inches
+        :return: (forward, right) in inches from the robot centre, or None
+            if the ray never reaches that height in front of the camera
+        """
+        col = (azimuth - self.min_azimuth) / self.angle_step
+        row = (altitude - self.min_altitude) / self.angle_step
+        if (
+            col < 0 or row < 0
+            or col > len(self.grid_azimuths) - 1
+            or row > len(self.grid_altitudes) - 1
+        ):
+            return None
+
+        fwd_table, right_table = self.ground_tables(target_height)
+        forward = float(_bilinear(fwd_table, col, row))
+        right = float(_bilinear(right_table, col, row))
+
+        if math.isnan(forward) or math.isnan(right):
+            return None
+
+        return forward, right
+
+    def angles_to_ground(self, azimuth, altitude, target_height=0.0):
+        """
+        :return: (distance, bearing) from the robot centre, in inches and
+            degrees (right positive), or None; see angles_to_robot
+        """
+        position = self.angles_to_robot(azimuth, altitude, target_height)
+        if position is None:
+            return None
+
+        forward, right = position
+        return math.hypot(forward, right), math.degrees(
+            math.atan2(right, forward)
+        )
+
+    def pixel_to_ground(self, x, y, target_height=0.0):
+        """
+        :return: (distance, bearing) for a pixel; see angles_to_ground
+        """
+        azimuth, altitude = self.pixel_to_angles(x, y)
+        return self.angles_to_ground(azimuth, altitude, target_height)
+
+
+# cameras on the robot
+CAMERAS = {
+    'jetson': CameraCalibration.from_fov(
+        640, 480, 60.0, mount_height=20.0, mount_pitch=0.0
+    ),
+}
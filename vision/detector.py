@@ -0,0 +1,411 @@
+"""
+Target detection for the jetson, using plain NumPy (no GPU needed).
+
+Pipeline for each frame:
+
+1. convert BGR (or RGB) to HSV and threshold against the target's colour
+   range
+2. split the mask into connected blobs, using run-length encoding of each
+   row and merging runs that overlap between rows
+3. score each blob's bounding box against the target's expected shape
+4. turn the best blob's centre into azimuth / altitude
+
+Frames are BGR by default, as grabbed by cscore / OpenCV; pass
+``channel_order='rgb'`` to the Detector for frames from elsewhere.
+
+To keep up with the camera, once a target is found only a region of interest
+around it is processed on following frames, and if processing gets slower
+than the frame rate whole frames are skipped (nothing is reported for
+them).
+"""
+import math
+import time
+from collections import namedtuple
+import numpy as np
+from vision.visionconstants import SWITCH_LEFT, SWITCH_RIGHT, \
+    SCALE_LEFT_EDGE, SCALE_RIGHT_EDGE, POWER_CUBE
+
+Blob = namedtuple('Blob', ['x', 'y', 'w', 'h', 'area'])
+
+# hsv ranges use the opencv convention: H in [0, 180), S and V in [0, 255]
+TargetSpec = namedtuple('TargetSpec', [
+    'lower',    # (h, s, v) lower bound, inclusive
+    'upper',    # (h, s, v) upper bound, inclusive
+    'aspect',   # expected bounding box width / height
+    'min_area',  # smallest blob to consider, in pixels
+    'side',     # None for the best scoring blob, 'left' / 'right' to take
+                # the outermost good blob on that side
+])
+
+# retroreflective tape lit by the green led ring
+TAPE_LOWER = (55, 100, 100)
+TAPE_UPPER = (90, 255, 255)
+
+# yellow power cubes
+CUBE_LOWER = (20, 100, 80)
+CUBE_UPPER = (35, 255, 255)
+
+# 2in x 15.3in tape strips, 13in x 11in cube face
+TAPE_ASPECT = 2 / 15.3
+CUBE_ASPECT = 13 / 11
+
+TARGET_SPECS = {
+    SWITCH_LEFT: TargetSpec(TAPE_LOWER, TAPE_UPPER, TAPE_ASPECT, 20, 'left'),
+    SWITCH_RIGHT: TargetSpec(TAPE_LOWER, TAPE_UPPER, TAPE_ASPECT, 20,
+                             'right'),
+    SCALE_LEFT_EDGE: TargetSpec(TAPE_LOWER, TAPE_UPPER, TAPE_ASPECT, 10,
+                                'left'),
+    SCALE_RIGHT_EDGE: TargetSpec(TAPE_LOWER, TAPE_UPPER, TAPE_ASPECT, 10,
+                                 'right'),
+    POWER_CUBE: TargetSpec(CUBE_LOWER, CUBE_UPPER, CUBE_ASPECT, 100, None),
+}
+
+# blobs scoring below this are ignored
+MIN_SCORE = 0.3
+
+
+def _to_hsv(r, g, b):
+    v = np.maximum(np.maximum(r, g), b)
+    delta = v - np.minimum(np.minimum(r, g), b)
+    nonzero = delta != 0
+    safe_delta = np.where(nonzero, delta, 1)
+
+    s = np.where(v != 0, (delta * 255) // np.where(v != 0, v, 1), 0)
+
+    # hue in degrees / 2, by which channel is the max
+    h = np.where(
+        v == r, (30 * (g - b)) // safe_delta,
+        np.where(
+            v == g, 60 + (30 * (b - r)) // safe_delta,
+            120 + (30 * (r - g)) // safe_delta
+        )
+    )
+    h = np.where(nonzero, h % 180, 0)
+
+    return np.stack((h, s, v), axis=2).astype(np.uint8)
+
+
+def rgb_to_hsv(frame):
+    """
+    vectorised RGB -> HSV conversion
+    :param frame: HxWx3 uint8 array, RGB order
+    :return: HxWx3 uint8 array with H in [0, 180), S and V in [0, 255]
+    """
+    # elementwise max / min of the channels (in _to_hsv) is much faster than
+    # reducing over the (strided) last axis
+    rgb = frame.astype(np.int32)
+    return _to_hsv(rgb[..., 0], rgb[..., 1], rgb[..., 2])
+
+
+def bgr_to_hsv(frame):
+    """
+    vectorised BGR -> HSV conversion, for frames from cscore / OpenCV
+    :param frame: HxWx3 uint8 array, BGR order
+    :return: HxWx3 uint8 array with H in [0, 180), S and V in [0, 255]
+    """
+    bgr = frame.astype(np.int32)
+    return _to_hsv(bgr[..., 2], bgr[..., 1], bgr[..., 0])
+
+
+# HSV conversions by frame channel order
+HSV_CONVERSIONS = {
+    'bgr': bgr_to_hsv,
+    'rgb': rgb_to_hsv,
+}
+
+
+def threshold(hsv, lower, upper):
+    """
+    :param hsv: HxWx3 uint8 HSV array
+    :param lower: (h, s, v) inclusive lower bound
+    :param upper: (h, s, v) inclusive upper bound
+    :return: HxW bool mask
+    """
+    mask = (hsv[..., 2] >= lower[2]) & (hsv[..., 2] <= upper[2])
+    for channel in (0, 1):
+        plane = hsv[..., channel]
+        mask &= plane >= lower[channel]
+        mask &= plane <= upper[channel]
+    return mask
+
+
+def _row_runs(mask):
+    """
+    run-length encode every row of a mask at once
+    :return: (rows, starts, ends) arrays, ends exclusive, sorted by row
+    """
+    height, width = mask.shape
+    padded = np.zeros((height, width + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask
+
+    edges = np.diff(padded, axis=1)
+    rows, starts = np.nonzero(edges == 1)
+    _, ends = np.nonzero(edges == -1)
+    return rows, starts, ends
+
+
+def find_blobs(mask, min_area=1):
+    """
+    8-connected component extraction on a bool mask
+    :param mask: HxW bool array
+    :param min_area: drop blobs with fewer pixels than this
+    :return: list of Blob, largest first
+    """
+    rows, starts, ends = _row_runs(mask)
+    n_runs = len(rows)
+    if n_runs == 0:
+        return []
+
+    parent = list(range(n_runs))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    # runs are sorted by row, so the runs of each row are a contiguous slice
+    row_bounds = np.searchsorted(rows, np.arange(mask.shape[0] + 1))
+
+    for row in range(1, mask.shape[0]):
+        cur_lo, cur_hi = row_bounds[row], row_bounds[row + 1]
+        prev_lo, prev_hi = row_bounds[row - 1], row_bounds[row]
+        if cur_lo == cur_hi or prev_lo == prev_hi:
+            continue
+
+        # two-pointer sweep over the sorted runs of both rows
+        i, j = prev_lo, cur_lo
+        while i < prev_hi and j < cur_hi:
+            # runs overlap (diagonals count) if start <= other end, inclusive
+            if starts[i] <= ends[j] and starts[j] <= ends[i]:
+                a, b = find(i), find(j)
+                if a != b:
+                    parent[b] = a
+
+            if ends[i] < ends[j]:
+                i += 1
+            else:
+                j += 1
+
+    labels = np.array([find(i) for i in range(n_runs)])
+    lengths = ends - starts
+
+    uniq, inverse = np.unique(labels, return_inverse=True)
+    n_blobs = len(uniq)
+
+    area = np.bincount(inverse, weights=lengths, minlength=n_blobs)
+    x0 = np.full(n_blobs, mask.shape[1])
+    np.minimum.at(x0, inverse, starts)
+    x1 = np.zeros(n_blobs, dtype=np.int64)
+    np.maximum.at(x1, inverse, ends)
+    y0 = np.full(n_blobs, mask.shape[0])
+    np.minimum.at(y0, inverse, rows)
+    y1 = np.zeros(n_blobs, dtype=np.int64)
+    np.maximum.at(y1, inverse, rows + 1)
+
+    blobs = [
+        Blob(int(x0[k]), int(y0[k]), int(x1[k] - x0[k]), int(y1[k] - y0[k]),
+             int(area[k]))
+        for k in np.argsort(-area)
+        if area[k] >= min_area
+    ]
+    return blobs
+
+
+def score_blob(blob, aspect):
+    """
+    score how much a blob looks like the target, from 0 to 1
+    :param blob: Blob
+    :param aspect: expected width / height of the target
+    :return: product of how filled the bounding box is and how close its
+        aspect ratio is to the expected one
+    """
+    fill = blob.area / (blob.w * blob.h)
+    blob_aspect = blob.w / blob.h
+    aspect_match = min(blob_aspect, aspect) / max(blob_aspect, aspect)
+    return fill * aspect_match
+
+
+class Detector:
+    """
+    Finds targets in camera frames and reports where they are relative to
+    the camera.
+    """
+
+    def __init__(self, width, height, hfov=60.0, fps=30.0, roi_margin=0.5,
+                 refresh_interval=15, clock=None, calibration=None,
+                 channel_order='bgr'):
+        """
+        :param width: frame width in pixels
+        :param height: frame height in pixels
+        :param hfov: horizontal field of view, degrees
+        :param fps: camera frame rate, used as the processing time budget;
+            None to never skip frames
+        :param roi_margin: how much to grow a found target's bounding box by
+            (as a fraction of its size) to get the next frame's search region
+        :param refresh_interval: search the whole frame at least this often,
+            in processed frames, so new blobs on the other side get noticed
+        :param clock: function returning seconds (defaults to time.monotonic)
+        :param calibration: vision.calibration.CameraCalibration for this
+            camera; if given, it is used instead of hfov to turn pixels into
+            (undistorted) angles
+        :param channel_order: 'bgr' for frames grabbed by cscore / OpenCV,
+            or 'rgb'
+        """
+        try:
+            self.to_hsv = HSV_CONVERSIONS[channel_order]
+        except KeyError:
+            raise ValueError('unknown channel order {!r}'.format(
+                channel_order
+            ))
+
+        self.width = width
+        self.height = height
+        self.calibration = calibration
+        self.fps = fps
+        self.roi_margin = roi_margin
+        self.refresh_interval = refresh_interval
+        self.clock = clock if clock is not None else time.monotonic
+
+        self.focal_length = (width / 2) / math.tan(math.radians(hfov) / 2)
+
+        # per thing: search region (x0, y0, x1, y1) and frames since a full
+        # frame search
+        self.rois = {}
+        self.frames_since_refresh = {}
+
+        # frame skipping
+        self.process_time = 0
+        self.skip_remaining = 0
+        self.frames_skipped = 0
+
+    def angles(self, x, y):
+        """
+        convert a pixel position to angles relative to the camera centre
+        :return: (azimuth, altitude) in degrees, right and up positive
+        """
+        if self.calibration is not None:
+            return self.calibration.pixel_to_angles(x, y)
+
+        azimuth = math.degrees(
+            math.atan2(x - self.width / 2, self.focal_length)
+        )
+        altitude = math.degrees(
+            math.atan2(self.height / 2 - y, self.focal_length)
+        )
+        return azimuth, altitude
+
+    def _pick(self, blobs, spec):
+        scored = [
+            (score_blob(blob, spec.aspect), blob) for blob in blobs
+        ]
+        scored = [(s, blob) for s, blob in scored if s >= MIN_SCORE]
+        if not scored:
+            return None
+
+        if spec.side == 'left':
+            return min(scored, key=lambda sb: sb[1].x)[1]
+        elif spec.side == 'right':
+            return max(scored, key=lambda sb: sb[1].x + sb[1].w)[1]
+
+        return max(scored, key=lambda sb: sb[0])[1]
+
+    def _search(self, hsv, spec, x_off=0, y_off=0):
+        mask = threshold(hsv, spec.lower, spec.upper)
+        blob = self._pick(find_blobs(mask, spec.min_area), spec)
+        if blob is None:
+            return None
+
+        return blob._replace(x=blob.x + x_off, y=blob.y + y_off)
+
+    def _grow_roi(self, blob):
+        dx = int(blob.w * self.roi_margin) + 4
+        dy = int(blob.h * self.roi_margin) + 4
+        return (
+            max(blob.x - dx, 0), max(blob.y - dy, 0),
+            min(blob.x + blob.w + dx, self.width),
+            min(blob.y + blob.h + dy, self.height),
+        )
+
+    def _needs_full_search(self, thing):
+        return (
+            thing not in self.rois
+            or self.frames_since_refresh.get(thing, 0) >=
+            self.refresh_interval
+        )
+
+    def locate(self, frame, thing, hsv=None):
+        """
+        find a single thing in a frame
+        :param frame: HxWx3 uint8 array, in the detector's channel order
+        :param thing: one of the things in detector.TARGET_SPECS
+        :param hsv: the frame already converted to HSV, if available
+        :return: best Blob, or None if not found
+        """
+        spec = TARGET_SPECS[thing]
+        roi = self.rois.get(thing)
+        since_refresh = self.frames_since_refresh.get(thing, 0)
+
+        blob = None
+        if not self._needs_full_search(thing):
+            x0, y0, x1, y1 = roi
+            if hsv is not None:
+                crop = hsv[y0:y1, x0:x1]
+            else:
+                crop = self.to_hsv(frame[y0:y1, x0:x1])
+            blob = self._search(crop, spec, x0, y0)
+            self.frames_since_refresh[thing] = since_refresh + 1
+
+        if blob is None:
+            if hsv is None:
+                hsv = self.to_hsv(frame)
+            blob = self._search(hsv, spec)
+            self.frames_since_refresh[thing] = 0
+
+        if blob is None:
+            self.rois.pop(thing, None)
+        else:
+            self.rois[thing] = self._grow_roi(blob)
+
+        return blob
+
+    def detect(self, frame, things):
+        """
+        find several things in one frame; skips the frame entirely when
+        recent frames took longer than the camera frame period to process
+        :param frame: HxWx3 uint8 array, in the detector's channel order
+        :param things: iterable of things to look for
+        :return: dict mapping each found thing to (azimuth, altitude), ready
+            for VisionSlave.update_locations; or None if the frame was
+            skipped, in which case nothing should be published for it (an
+            older result would be stamped with this frame's capture time)
+        """
+        if self.skip_remaining > 0:
+            self.skip_remaining -= 1
+            self.frames_skipped += 1
+            return None
+
+        start = self.clock()
+
+        # only convert the full frame once if something needs a full search
+        hsv = None
+        if any(self._needs_full_search(thing) for thing in things):
+            hsv = self.to_hsv(frame)
+
+        result = {}
+        for thing in things:
+            blob = self.locate(frame, thing, hsv)
+            if blob is not None:
+                result[thing] = self.angles(
+                    blob.x + blob.w / 2, blob.y + blob.h / 2
+                )
+
+        elapsed = self.clock() - start
+        self.process_time = 0.8 * self.process_time + 0.2 * elapsed
+
+        # drop enough frames to stay at (roughly) the camera rate
+        budget = 1 / self.fps if self.fps else None
+        if budget is not None and self.process_time > budget:
+            self.skip_remaining = math.ceil(self.process_time / budget) - 1
+
+        return result
@@ -0,0 +1,358 @@
+"""
+Shared-memory ring of raw camera frames.
+
+One process (the capture process) owns a camera and writes every frame into
+a ring of fixed-size slots in a memory-mapped file under /dev/shm. Any
+number of other local processes (detector, recorder, ...) map the same file
+and get NumPy views straight onto the slots, so a frame is captured once and
+never copied or re-encoded to be shared.
+
+Layout::
+
+    header:  magic | version | slots | width | height | channels |
+             generation | retired | latest frame number
+    slot:    sequence | frame number | timestamp | pad to 64 bytes | pixels
+
+Pixels are stored as the writer captured them; the camera process
+(driver_vision.py) captures with cscore, so its frames are BGR. Timestamps
+are in seconds, on whatever clock the writer used: commit() defaults to
+time.monotonic(), but the camera process commits cscore's own capture times
+(microseconds from wpi::Now(), converted to seconds), so only compare them
+with other timestamps from the same ring.
+
+When the frame size changes, the writer replaces the ring with a new one
+(the generation goes up by one, and frame numbers start again from 1) and
+marks the old one as retired. Readers still have the old ring mapped, so
+they should check replaced() every so often and reopen() when it returns
+True.
+
+Each slot's sequence counter works as a seqlock: the writer makes it odd
+before touching the pixels and even again once the frame is complete. A
+reader notes the (even) sequence when it picks up a frame, and after using
+the pixels checks it is unchanged; if it changed, the writer lapped the ring
+and the data may be torn, so the result should be thrown away. With N slots
+a reader has about N - 1 frame periods to use a frame.
+"""
+import mmap
+import os
+import struct
+import tempfile
+import time
+from collections import namedtuple
+import numpy as np
+
+MAGIC = b'FRNG'
+VERSION = 2
+
+_header = struct.Struct('<4sIIIIIIIQ')
+_slot_header = struct.Struct('<QQd')
+
+_HEADER_SIZE = 64
+_SLOT_HEADER_SIZE = 64
+_RETIRED_OFFSET = _header.size - 12
+_LATEST_OFFSET = _header.size - 8
+
+#: A frame picked up from the ring. ``image`` is a view into shared memory.
+Frame = namedtuple('Frame', ['number', 'timestamp', 'image', 'slot', 'seq'])
+
+
+def ring_path(name):
+    """
+    where the ring with a given name lives
+    :param name: ring name, e.g. 'camera0'
+    """
+    shm_dir = '/dev/shm'
+    if not os.path.isdir(shm_dir):
+        shm_dir = tempfile.gettempdir()
+
+    return os.path.join(shm_dir, 'frame_ring_' + name)
+
+
+def _align(size, alignment=64):
+    return (size + alignment - 1) // alignment * alignment
+
+
+class _FrameRing:
+    def _map(self, fd, size, access):
+        self.mm = mmap.mmap(fd, size, access=access)
+
+        self.frame_bytes = self.width * self.height * self.channels
+        self.slot_size = _SLOT_HEADER_SIZE + _align(self.frame_bytes)
+
+        self.images = []
+        for i in range(self.slots):
+            offset = self._slot_offset(i) + _SLOT_HEADER_SIZE
+            image = np.frombuffer(
+                self.mm, dtype=np.uint8, count=self.frame_bytes, offset=offset
+            ).reshape((self.height, self.width, self.channels))
+            self.images.append(image)
+
+    def _slot_offset(self, slot):
+        return _HEADER_SIZE + slot * self.slot_size
+
+    def _read_slot(self, slot):
+        return _slot_header.unpack_from(self.mm, self._slot_offset(slot))
+
+    def latest_number(self):
+        """
+        :return: number of the newest complete frame, 0 if none yet
+        """
+        return struct.unpack_from('<Q', self.mm, _LATEST_OFFSET)[0]
+
+    def replaced(self):
+        """
+        :return: True if the writer has closed this ring (and perhaps
+            replaced it with a new one)
+        """
+        return struct.unpack_from('<I', self.mm, _RETIRED_OFFSET)[0] != 0
+
+    def close(self):
+        """
+        unmap the ring; any frame / image views still held elsewhere have to
+        be dropped first, otherwise this raises BufferError
+        """
+        self.images = []
+        self.mm.close()
+
+
+class FrameRingWriter(_FrameRing):
+    """
+    Capture side of a frame ring
+    """
+
+    def __init__(self, name, width, height, channels=3, slots=4,
+                 generation=1):
+        """
+        create (or replace) a ring
+        :param name: ring name, readers open it by the same name
+        :param width: frame width in pixels
+        :param height: frame height in pixels
+        :param channels: bytes per pixel
+        :param slots: number of frames kept
+        :param generation: which ring this is, for readers; see replace()
+        """
+        self.name = name
+        self.path = ring_path(name)
+        self.width = width
+        self.height = height
+        self.channels = channels
+        self.slots = slots
+        self.generation = generation
+
+        slot_size = _SLOT_HEADER_SIZE + _align(width * height * channels)
+        size = _HEADER_SIZE + slots * slot_size
+
+        # write to a temporary file and rename it into place, so readers
+        # never see a half initialised ring
+        tmp_path = self.path + '.tmp'
+        fd = os.open(tmp_path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o666)
+        try:
+            os.ftruncate(fd, size)
+            self._map(fd, size, mmap.ACCESS_WRITE)
+        finally:
+            os.close(fd)
+
+        _header.pack_into(
+            self.mm, 0, MAGIC, VERSION, slots, width, height, channels,
+            generation, 0, 0
+        )
+        os.rename(tmp_path, self.path)
+
+        self.frame_number = 0
+        self.writing = None
+
+    def begin_write(self):
+        """
+        claim the next slot to capture into
+        :return: HxWxC uint8 view of the slot; fill it in place (e.g. pass it
+            to CvSink.grabFrame) and then call commit
+        """
+        slot = self.frame_number % self.slots
+
+        # (the slot is left odd if a previous write was aborted)
+        seq = self._read_slot(slot)[0] & ~1
+
+        # odd sequence: readers will see this slot as being written
+        struct.pack_into('<Q', self.mm, self._slot_offset(slot), seq + 1)
+        self.writing = slot
+        return self.images[slot]
+
+    def commit(self, timestamp=None):
+        """
+        publish the frame written since begin_write
+        :param timestamp: capture time, defaults to time.monotonic()
+        :return: the frame number
+        """
+        if self.writing is None:
+            raise RuntimeError('commit() called without begin_write()')
+
+        if timestamp is None:
+            timestamp = time.monotonic()
+
+        slot = self.writing
+        seq = self._read_slot(slot)[0]
+        self.frame_number += 1
+
+        _slot_header.pack_into(
+            self.mm, self._slot_offset(slot),
+            seq + 1, self.frame_number, timestamp
+        )
+        struct.pack_into('<Q', self.mm, _LATEST_OFFSET, self.frame_number)
+
+        self.writing = None
+        return self.frame_number
+
+    def abort(self):
+        """
+        give up on the frame started with begin_write; the slot stays marked
+        as being written to until it is reused
+        """
+        self.writing = None
+
+    def write(self, frame, timestamp=None):
+        """
+        copy a frame in (for sources that can't capture in place)
+        :return: the frame number
+        """
+        self.begin_write()[...] = frame
+        return self.commit(timestamp)
+
+    def replace(self, width, height):
+        """
+        put a ring for a new frame size in place of this one, and close this
+        one; the slot views from begin_write() have to be dropped first
+        :return: the new FrameRingWriter
+        """
+        writer = FrameRingWriter(
+            self.name, width, height, self.channels, self.slots,
+            self.generation + 1
+        )
+        self.close()
+        return writer
+
+    def close(self):
+        """
+        mark the ring as retired, so readers know to reopen it, and unmap it
+        """
+        struct.pack_into('<I', self.mm, _RETIRED_OFFSET, 1)
+        super().close()
+
+    def unlink(self):
+        """
+        remove the ring file; open readers keep their mapping
+        """
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class FrameRingReader(_FrameRing):
+    """
+    Consumer side of a frame ring
+    """
+
+    def __init__(self, name):
+        """
+        open an existing ring
+        :param name: ring name used by the writer
+        """
+        self.name = name
+        self.path = ring_path(name)
+        self._open()
+
+    def _open(self):
+        with open(self.path, 'rb') as fp:
+            magic, version, slots, width, height, channels, generation, \
+                _, _ = _header.unpack(fp.read(_header.size))
+
+            if magic != MAGIC or version != VERSION:
+                raise ValueError('{} is not a version {} frame ring'.format(
+                    self.path, VERSION
+                ))
+
+            self.slots = slots
+            self.width = width
+            self.height = height
+            self.channels = channels
+            self.generation = generation
+
+            self._map(fp.fileno(), 0, mmap.ACCESS_READ)
+
+    def reopen(self):
+        """
+        switch to the ring currently under this name, after replaced()
+        returns True; like close(), frame / image views have to be dropped
+        first. Frame numbers start again on a new ring.
+        :return: True if this is now a newer generation ring
+        """
+        generation = self.generation
+        self.close()
+        self._open()
+        return self.generation != generation
+
+    def get(self, number):
+        """
+        pick up a specific frame, if it is still in the ring
+        :param number: frame number
+        :return: Frame, or None if it has been overwritten or is being
+            written
+        """
+        if number <= 0:
+            return None
+
+        slot = (number - 1) % self.slots
+        seq, slot_number, timestamp = self._read_slot(slot)
+
+        if seq % 2 or slot_number != number:
+            return None
+
+        return Frame(number, timestamp, self.images[slot], slot, seq)
+
+    def latest(self):
+        """
+        pick up the newest frame
+        :return: Frame, or None if nothing has been written yet
+        """
+        return self.get(self.latest_number())
+
+    def is_valid(self, frame):
+        """
+        check a frame wasn't overwritten while it was being used; call this
+        after processing and discard the result if it returns False
+        """
+        return self._read_slot(frame.slot)[0] == frame.seq
+
+    def copy(self, frame):
+        """
+        take a private copy of a frame
+        :return: array, or None if the frame was overwritten during the copy
+        """
+        image = frame.image.copy()
+        if not self.is_valid(frame):
+            return None
+
+        return image
+
+    def wait_next(self, last_number, timeout=None, poll_interval=0.001):
+        """
+        wait for a frame newer than last_number
+        :param last_number: number of the last frame processed (0 for none)
+        :param timeout: seconds to wait, None waits forever
+        :return: the newest Frame, or None on timeout or if the ring has
+            been replaced (see replaced())
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while not self.replaced():
+            if self.latest_number() > last_number:
+                frame = self.latest()
+                if frame is not None:
+                    return frame
+
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+
+            time.sleep(poll_interval)
+
+        return None
@@ -0,0 +1,135 @@
+"""
+Compact fixed-layout binary encoding for vision messages.
+
+All messages start with a two byte header (protocol version, message type)
+and are little-endian. Layouts:
+
+command (7 bytes)::
+
+    version u8 | type u8 | command id u32 | thing u8
+
+location (35 bytes)::
+
+    version u8 | type u8 | command id u32 | sequence u32 | thing u8 |
+    capture time f64 | publish time f64 | azimuth f32 | altitude f32
+
+Times are seconds on the jetson's monotonic clock; only differences between
+them are meaningful on the robot side.
+"""
+import struct
+from vision.visionconstants import THINGS
+
+VERSION = 1
+
+MSG_COMMAND = 1
+MSG_LOCATION = 2
+
+_header = struct.Struct('<BB')
+_command = struct.Struct('<BBIB')
+_location = struct.Struct('<BBIIBddff')
+
+_thing_ids = {thing: idx for idx, thing in enumerate(THINGS)}
+
+# sent in place of a thing id when there is no current command
+NO_THING = 0xFF
+
+
+def _thing_to_id(thing):
+    if thing is None:
+        return NO_THING
+
+    try:
+        return _thing_ids[thing]
+    except KeyError:
+        raise ValueError('unknown thing {!r}'.format(thing))
+
+
+def _id_to_thing(thing_id):
+    if thing_id == NO_THING:
+        return None
+
+    try:
+        return THINGS[thing_id]
+    except IndexError:
+        raise ValueError('unknown thing id {}'.format(thing_id))
+
+
+def _check_header(data, msg_type, layout):
+    if len(data) != layout.size:
+        raise ValueError('bad message length {} (expected {})'.format(
+            len(data), layout.size
+        ))
+
+    version, found_type = _header.unpack_from(data)
+    if version != VERSION:
+        raise ValueError('unsupported protocol version {}'.format(version))
+    if found_type != msg_type:
+        raise ValueError('unexpected message type {}'.format(found_type))
+
+
+def encode_command(command_id, thing):
+    """
+    pack a locate command
+    :param command_id: id to tag results for this command with
+    :param thing: what to look for, one of visionconstants.THINGS
+    :return: bytes
+    """
+    return _command.pack(
+        VERSION, MSG_COMMAND, command_id & 0xFFFFFFFF, _thing_to_id(thing)
+    )
+
+
+def decode_command(data):
+    """
+    unpack a locate command
+    :param data: bytes from encode_command
+    :return: dict with 'locate' and 'command_id'
+    """
+    _check_header(data, MSG_COMMAND, _command)
+    _, _, command_id, thing_id = _command.unpack(data)
+
+    return {'locate': _id_to_thing(thing_id), 'command_id': command_id}
+
+
+def encode_location(command_id, sequence, thing, capture_time, publish_time,
+                    azimuth, altitude):
+    """
+    pack a location result
+    :param command_id: id of the command this result answers
+    :param sequence: per-sender result counter
+    :param thing: what was located, or None if no command yet
+    :param capture_time: when the frame was captured
+    :param publish_time: when the result was sent
+    :param azimuth: degrees relative to the camera
+    :param altitude: degrees relative to the camera
+    :return: bytes
+    """
+    return _location.pack(
+        VERSION, MSG_LOCATION,
+        command_id & 0xFFFFFFFF, sequence & 0xFFFFFFFF, _thing_to_id(thing),
+        capture_time, publish_time, azimuth, altitude
+    )
+
+
+def decode_location(data):
+    """
+    unpack a location result
+    :param data: bytes from encode_location
+    :return: dict with 'azimuth', 'altitude', 'thing', 'command_id',
+        'sequence', 'capture_time' and 'publish_time'
+    """
+    _check_header(data, MSG_LOCATION, _location)
+    (
+        _, _, command_id, sequence, thing_id,
+        capture_time, publish_time, azimuth, altitude
+    ) = _location.unpack(data)
+
+    return {
+        'azimuth': azimuth,
+        'altitude': altitude,
+        'thing': _id_to_thing(thing_id),
+        'command_id': command_id,
+        'sequence': sequence,
+        'capture_time': capture_time,
+        'publish_time': publish_time,
+    }
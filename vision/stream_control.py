@@ -0,0 +1,130 @@
+"""
+Keeps the driver camera stream under a bandwidth cap.
+
+The stream settings are a ladder of modes from best to worst (resolution,
+fps and jpeg quality). The controller is fed the measured data rate and
+frame rate of the stream; when the data rate goes over the cap it steps down
+the ladder straight away, and when there has been enough headroom for a
+while it steps back up. Dropping quality before the link saturates keeps the
+stream live, where going over the cap makes it lag seconds behind.
+"""
+from collections import namedtuple
+
+StreamMode = namedtuple('StreamMode', ['width', 'height', 'fps', 'quality'])
+
+
+def mode_cost(mode):
+    # rough relative size of a second of video in this mode: pixels per
+    # second, scaled by how much jpeg quality inflates each frame
+    return mode.width * mode.height * mode.fps * (0.25 + mode.quality / 100)
+
+
+def build_ladder(width, height, fps, qualities=(70, 50, 30)):
+    """
+    make the list of modes to step through, best first
+    :param width: full resolution width
+    :param height: full resolution height
+    :param fps: full frame rate
+    :param qualities: jpeg qualities to try at each resolution
+    :return: list of StreamMode
+    """
+    ladder = []
+    for scale in (1, 2):
+        w, h = width // scale, height // scale
+        for quality in qualities:
+            ladder.append(StreamMode(w, h, fps, quality))
+
+    # last resort: small and slow
+    w, h = width // 2, height // 2
+    for reduced_fps in (fps * 2 // 3, fps // 2):
+        if 0 < reduced_fps < fps:
+            ladder.append(StreamMode(w, h, reduced_fps, qualities[-1]))
+
+    return ladder
+
+
+class StreamController:
+    """
+    Picks a StreamMode that keeps the stream under a bandwidth cap
+    """
+
+    def __init__(self, ladder, bandwidth_cap, headroom=0.75, up_delay=3):
+        """
+        :param ladder: list of StreamMode, best first (see build_ladder)
+        :param bandwidth_cap: maximum data rate, bytes per second; 0 or None
+            to always use the best mode
+        :param headroom: only step up if the next mode is predicted to use
+            less than this fraction of the cap
+        :param up_delay: how many updates in a row there has to be headroom
+            before stepping up
+        """
+        self.ladder = ladder
+        self.bandwidth_cap = bandwidth_cap
+        self.headroom = headroom
+        self.up_delay = up_delay
+
+        self.level = 0
+        self.headroom_count = 0
+
+        self.data_rate = 0
+        self.frame_rate = 0
+        self.frame_size = 0
+
+    @property
+    def mode(self):
+        return self.ladder[self.level]
+
+    def set_bandwidth_cap(self, bandwidth_cap):
+        self.bandwidth_cap = bandwidth_cap
+        self.headroom_count = 0
+
+        if not bandwidth_cap:
+            self.level = 0
+
+    def update(self, data_rate, frame_rate):
+        """
+        feed in a measurement
+        :param data_rate: measured stream data rate, bytes per second
+        :param frame_rate: measured frames per second
+        :return: the new StreamMode if it changed, otherwise None
+        """
+        self.data_rate = data_rate
+        self.frame_rate = frame_rate
+        self.frame_size = data_rate / frame_rate if frame_rate > 0 else 0
+
+        if not self.bandwidth_cap:
+            return None
+
+        old_level = self.level
+
+        if data_rate > self.bandwidth_cap:
+            self.headroom_count = 0
+
+            # jump as far down as the current measurement says we need to
+            target = self.bandwidth_cap * self.headroom
+            while self.level < len(self.ladder) - 1:
+                self.level += 1
+                if self._predict(data_rate, old_level, self.level) <= target:
+                    break
+        elif self.level > 0:
+            predicted = self._predict(data_rate, self.level, self.level - 1)
+
+            if predicted < self.bandwidth_cap * self.headroom:
+                self.headroom_count += 1
+            else:
+                self.headroom_count = 0
+
+            if self.headroom_count >= self.up_delay:
+                self.level -= 1
+                self.headroom_count = 0
+
+        if self.level != old_level:
+            return self.mode
+
+        return None
+
+    def _predict(self, data_rate, from_level, to_level):
+        return data_rate * (
+            mode_cost(self.ladder[to_level])
+            / mode_cost(self.ladder[from_level])
+        )
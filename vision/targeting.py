@@ -0,0 +1,167 @@
+"""
+Turns camera-relative vision results into field positions, corrected for how
+far the robot has moved since the frame was captured.
+
+The robot keeps moving while a frame is processed on the jetson and sent
+back, so an azimuth taken straight from VisionMaster is out of date by the
+whole pipeline latency. Here each result is projected onto the field using
+the robot pose *at capture time* (looked up in a PoseHistory), giving a
+fixed field position for the target; that position can then be turned back
+into a distance / bearing from wherever the robot is now.
+
+The VisionMaster clock must be the same clock the pose history is stamped
+with, e.g.::
+
+    master = VisionMaster(host, port, PROTOCOL_BINARY,
+                          clock=wpilib.Timer.getFPGATimestamp)
+"""
+import math
+from sensors.pose_history import transform_point, inverse_transform_point
+from vision.calibration import CAMERAS
+from vision.visionconstants import SWITCH_LEFT, SWITCH_RIGHT, \
+    SCALE_LEFT_EDGE, SCALE_RIGHT_EDGE, POWER_CUBE
+
+# height of the middle of each target above the carpet, inches
+TARGET_HEIGHTS = {
+    SWITCH_LEFT: 11.0,
+    SWITCH_RIGHT: 11.0,
+    SCALE_LEFT_EDGE: 60.0,
+    SCALE_RIGHT_EDGE: 60.0,
+    POWER_CUBE: 5.5,
+}
+
+
+class VisionTargeting:
+    """
+    Latency-compensated field positions for vision targets
+    """
+
+    def __init__(self, master, pose_history, calibration=None, max_age=0.5,
+                 pose_estimator=None, landmarks=None):
+        """
+        :param master: VisionMaster to read results from
+        :param pose_history: sensors.pose_history.PoseHistory kept up to date
+            by the robot loop, on the same clock as the master
+        :param calibration: vision.calibration.CameraCalibration of the
+            camera the results come from, defaults to the jetson camera
+        :param max_age: ignore results older than this many seconds
+        :param pose_estimator: sensors.pose_estimator.PoseEstimator to
+            correct with sightings of landmarks
+        :param landmarks: dict of thing -> (x, y) field position, for things
+            that don't move (and so can correct the pose estimate)
+        """
+        self.master = master
+        self.pose_history = pose_history
+        self.calibration = (
+            calibration if calibration is not None else CAMERAS['jetson']
+        )
+        self.max_age = max_age
+        self.pose_estimator = pose_estimator
+        self.landmarks = landmarks if landmarks is not None else {}
+
+        # thing -> (field x, field y, local capture time)
+        self.targets = {}
+
+    def camera_to_robot(self, thing, azimuth, altitude):
+        """
+        place a target relative to the robot from its camera angles
+        :param thing: what was seen (sets the target height)
+        :param azimuth: degrees, right positive
+        :param altitude: degrees, up positive
+        :return: (forward, right) in inches from the robot centre, or None if
+            the angles don't intersect the target height in front of us
+        """
+        return self.calibration.angles_to_robot(
+            azimuth, altitude, TARGET_HEIGHTS[thing]
+        )
+
+    def add_location(self, thing, location):
+        """
+        project a single VisionMaster result onto the field
+        :param thing: what the result is for
+        :param location: dict from VisionMaster.get_location(s); results with
+            timing info (binary protocol) are placed using the pose at
+            capture time, others using the latest pose
+        :return: (x, y) field position, or None if it couldn't be placed
+        """
+        if location is None:
+            return None
+
+        capture_time = location.get('local_capture_time')
+        if capture_time is not None:
+            if location['age'] > self.max_age:
+                return None
+            pose = self.pose_history.get_pose(capture_time)
+        else:
+            latest = self.pose_history.latest()
+            if latest is None:
+                return None
+            capture_time, pose = latest
+
+        if pose is None:
+            return None
+
+        relative = self.camera_to_robot(
+            thing, location['azimuth'], location['altitude']
+        )
+        if relative is None:
+            return None
+
+        landmark = self.landmarks.get(thing)
+        if landmark is not None and self.pose_estimator is not None:
+            self.pose_estimator.add_landmark(
+                capture_time, landmark[0], landmark[1], *relative
+            )
+
+        x, y = transform_point(pose, *relative)
+        self.targets[thing] = (x, y, capture_time)
+        return x, y
+
+    def update(self, things=None):
+        """
+        fetch and place the latest results for several things
+        :param things: things to update, defaults to everything tracked
+        :return: dict of thing -> (x, y) for the results that were placed
+        """
+        placed = {}
+        for thing, location in self.master.get_locations(things).items():
+            position = self.add_location(thing, location)
+            if position is not None:
+                placed[thing] = position
+
+        return placed
+
+    def get_target(self, thing, pose=None):
+        """
+        where a target is relative to the robot now
+        :param thing: what to look up
+        :param pose: robot pose to measure from, defaults to the latest pose
+            in the history
+        :return: dict with 'distance' (inches), 'bearing' (degrees, right
+            positive, relative to the robot's forward direction), 'x' and 'y'
+            (field position) and 'capture_time'; None if we have no
+            recent result for the thing
+        """
+        target = self.targets.get(thing)
+        if target is None:
+            return None
+
+        x, y, capture_time = target
+
+        if pose is None:
+            latest = self.pose_history.latest()
+            if latest is None:
+                return None
+            now, pose = latest
+
+            if now - capture_time > self.max_age:
+                return None
+
+        forward, right = inverse_transform_point(pose, x, y)
+        return {
+            'distance': math.hypot(forward, right),
+            'bearing': math.degrees(math.atan2(right, forward)),
+            'x': x,
+            'y': y,
+            'capture_time': capture_time,
+        }
@@ -8,3 +8,27 @@ SWITCH_LEFT = 'switch_left'
 SWITCH_RIGHT = 'switch_right'
 SCALE_RIGHT_EDGE = 'scale_right_edge'
 SCALE_LEFT_EDGE = 'scale_left_edge'
+POWER_CUBE = 'power_cube'
+
+# redis keys / channels for the binary protocol
+BINARY_COMMAND_QUEUE_KEY = 'command_queue_bin'
+LOCATION_CHANNEL = 'location_channel'
+
+# multi-target tracking: the set of things the robot wants, and the per-thing
+# result keys (expire so a lost target doesn't leave a stale location behind)
+TARGETS_KEY = 'targets'
+TARGET_LOCATION_KEY_PREFIX = 'location:'
+TARGET_LOCATION_TTL_MS = 500
+
+# protocols
+PROTOCOL_JSON = 'json'
+PROTOCOL_BINARY = 'binary'
+
+# things, in wire order: the binary protocol sends the index into this list
+THINGS = [
+    SWITCH_LEFT,
+    SWITCH_RIGHT,
+    SCALE_RIGHT_EDGE,
+    SCALE_LEFT_EDGE,
+    POWER_CUBE,
+]
@@ -1,6 +1,33 @@
+import itertools
 import json
+import sys
+import time
 import redis
-from vision.visionconstants import COMMAND_QUEUE_KEY, LOCATION_KEY
+from vision import protocol
+from vision.visionconstants import COMMAND_QUEUE_KEY, LOCATION_KEY, \
+    BINARY_COMMAND_QUEUE_KEY, LOCATION_CHANNEL, PROTOCOL_JSON, \
+    PROTOCOL_BINARY, TARGETS_KEY, TARGET_LOCATION_KEY_PREFIX, \
+    TARGET_LOCATION_TTL_MS
+
+# fetches the latest result for several things (everything tracked, if none
+# are given), along with how long each result has left before it expires,
+# in a single round trip. Replies with a flat list of
+# thing, value, pttl triples.
+GET_LOCATIONS_SCRIPT = """
+local prefix = ARGV[1]
+local things = {unpack(ARGV, 2)}
+if #things == 0 then
+    things = redis.call('SMEMBERS', KEYS[1])
+end
+
+local reply = {}
+for _, thing in ipairs(things) do
+    reply[#reply + 1] = thing
+    reply[#reply + 1] = redis.call('GET', prefix .. thing)
+    reply[#reply + 1] = redis.call('PTTL', prefix .. thing)
+end
+return reply
+"""
 
 
 class VisionMaster:
@@ -9,23 +36,67 @@ class VisionMaster:
     reads the location response
     """
 
-    def __init__(self, host, port):
+    def __init__(self, host, port, protocol=PROTOCOL_JSON, clock=None,
+                 location_ttl_ms=TARGET_LOCATION_TTL_MS):
         """
         create redis instance
         :param host: redis host port on jetson
         :param port: redis port
+        :param protocol: PROTOCOL_JSON (polled, no timestamps) or
+            PROTOCOL_BINARY (pub/sub, timestamped)
+        :param clock: function returning the local time in seconds, used to
+            timestamp received results (defaults to time.monotonic)
+        :param location_ttl_ms: the expiry the slave sets on per-thing
+            results (see VisionSlave.update_locations); must match it, as
+            it's used to work out when get_locations results were published
         """
         self.host = host
         self.port = port
+        self.protocol = protocol
+        self.clock = clock if clock is not None else time.monotonic
+        self.location_ttl_ms = location_ttl_ms
         self.r = redis.Redis(host, port)
+        self.get_locations_script = self.r.register_script(
+            GET_LOCATIONS_SCRIPT
+        )
+
+        self.command_ids = itertools.count(1)
+        self.latest_location = None
+        self.dropped_messages = 0
+        self.listener = None
+
+        if protocol == PROTOCOL_BINARY:
+            # results get pushed to us by the jetson, no polling needed
+            self.pubsub = self.r.pubsub(ignore_subscribe_messages=True)
+            self.pubsub.subscribe(**{LOCATION_CHANNEL: self._on_location})
+            self.listener = self.pubsub.run_in_thread(sleep_time=1.0)
+        elif protocol != PROTOCOL_JSON:
+            raise ValueError('unknown protocol ' + str(protocol))
+
+    def close(self):
+        """
+        stop listening for results
+        :return:
+        """
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
 
     def locate(self, thing):
         """
         tell jetson what you want to look for,
         check visionconstants module for list of things
         :param thing: what to look for
-        :return:
+        :return: the command id (binary protocol), or the queue length (json)
         """
+        if self.protocol == PROTOCOL_BINARY:
+            command_id = next(self.command_ids)
+            self.r.lpush(
+                BINARY_COMMAND_QUEUE_KEY,
+                protocol.encode_command(command_id, thing)
+            )
+            return command_id
+
         command = {'locate': thing}
         serial_json = json.dumps(command)
         return self.r.lpush(COMMAND_QUEUE_KEY, serial_json)
@@ -35,16 +106,164 @@ class VisionMaster:
         wipe out the queue if you need to
         :return:
         """
+        if self.protocol == PROTOCOL_BINARY:
+            return self.r.delete(BINARY_COMMAND_QUEUE_KEY)
+
         return self.r.delete(COMMAND_QUEUE_KEY)
 
+    def track(self, *things):
+        """
+        replace the set of things the jetson should look for every frame
+        :param things: what to look for, see visionconstants.THINGS
+        :return:
+        """
+        pipe = self.r.pipeline()
+        pipe.delete(TARGETS_KEY)
+        if things:
+            pipe.sadd(TARGETS_KEY, *things)
+        pipe.execute()
+
+    def add_targets(self, *things):
+        """
+        start tracking more things, without dropping the current ones
+        :param things:
+        :return:
+        """
+        return self.r.sadd(TARGETS_KEY, *things)
+
+    def remove_targets(self, *things):
+        """
+        stop tracking some things
+        :param things:
+        :return:
+        """
+        return self.r.srem(TARGETS_KEY, *things)
+
+    def get_targets(self):
+        """
+        :return: set of things currently being tracked
+        """
+        return {thing.decode() for thing in self.r.smembers(TARGETS_KEY)}
+
+    def get_locations(self, things=None):
+        """
+        fetch the latest result for several things in one round trip
+        :param things: things to fetch, defaults to everything tracked
+        :return: dict mapping each thing to its location (same format as
+            get_location), or None if there is no current result for it;
+            with the binary protocol, received_time is when the result was
+            published (on our clock), not when it was read
+        """
+        if things is None:
+            things = []
+        else:
+            things = list(things)
+            if not things:
+                return {}
+
+        reply = self.get_locations_script(
+            keys=[TARGETS_KEY], args=[TARGET_LOCATION_KEY_PREFIX] + things
+        )
+        now = self.clock()
+
+        results = [
+            (thing.decode(), value, pttl)
+            for thing, value, pttl in zip(*[iter(reply)] * 3)
+        ]
+        results.sort(key=lambda result: result[0])
+
+        locations = {}
+        for thing, value, pttl in results:
+            if value is None:
+                locations[thing] = None
+            elif self.protocol == PROTOCOL_BINARY:
+                # the result was set to expire location_ttl_ms after it was
+                # published, so the time it has left says how long it has
+                # been sitting there
+                if pttl >= 0:
+                    elapsed = max(self.location_ttl_ms - pttl, 0) / 1000
+                else:
+                    elapsed = 0
+
+                location = protocol.decode_location(value)
+                location['received_time'] = now - elapsed
+                location.update(self.location_timing(location))
+                locations[thing] = location
+            else:
+                locations[thing] = json.loads(value.decode())
+
+        return locations
+
+    def _on_location(self, message):
+        """ pub/sub handler, runs on the listener thread """
+        # an exception here would kill the listener thread, and we'd keep
+        # serving the last location forever; drop bad messages instead
+        try:
+            location = protocol.decode_location(message['data'])
+        except (ValueError, TypeError) as e:
+            self.dropped_messages += 1
+            print(
+                "[vision] Dropped bad location message ({} so far): {}".format(
+                    self.dropped_messages, e
+                ),
+                file=sys.stderr
+            )
+            return
+
+        location['received_time'] = self.clock()
+
+        # single reference assignment, so readers never see a partial update
+        self.latest_location = location
+
     def get_location(self):
         """
         read the location state, as long as you've told jetson
         to look for a valid thing, there should be a value
-        :return: dict containing azimuth and altitude
+        :return: dict containing azimuth and altitude; with the binary
+            protocol it also has thing, command_id, sequence, the jetson's
+            capture_time and publish_time, the local received_time, and
+            local_capture_time / age / latency (see location_timing)
         """
+        if self.protocol == PROTOCOL_BINARY:
+            location = self.latest_location
+            if location is None:
+                return None
+
+            location = dict(location)
+            location.update(self.location_timing(location))
+            return location
+
         try:
             serial_json = self.r.get(LOCATION_KEY).decode()
             return json.loads(serial_json)
         except AttributeError:
             return None
+
+    def location_timing(self, location):
+        """
+        work out how old a (binary protocol) result is
+        :param location: dict from get_location
+        :return: dict with 'latency' (capture to publish on the jetson),
+            'local_capture_time' (capture time on our clock, ignoring
+            network transit) and 'age' (seconds since capture)
+        """
+        latency = location['publish_time'] - location['capture_time']
+        local_capture_time = location['received_time'] - latency
+
+        return {
+            'latency': latency,
+            'local_capture_time': local_capture_time,
+            'age': self.clock() - local_capture_time,
+        }
+
+    def is_fresh(self, location, max_age):
+        """
+        check whether a result is recent enough to act on
+        :param location: dict from get_location (binary protocol)
+        :param max_age: maximum acceptable age in seconds
+        :return: bool
+        """
+        if location is None or 'received_time' not in location:
+            return False
+
+        return self.location_timing(location)['age'] <= max_age
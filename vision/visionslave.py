@@ -1,6 +1,11 @@
 import json
+import time
 import redis
-from vision.visionconstants import COMMAND_QUEUE_KEY, LOCATION_KEY
+from vision import protocol
+from vision.visionconstants import COMMAND_QUEUE_KEY, LOCATION_KEY, \
+    BINARY_COMMAND_QUEUE_KEY, LOCATION_CHANNEL, \
+    PROTOCOL_JSON, PROTOCOL_BINARY, TARGETS_KEY, TARGET_LOCATION_KEY_PREFIX, \
+    TARGET_LOCATION_TTL_MS, THINGS
 
 
 class VisionSlave:
@@ -9,31 +14,134 @@ class VisionSlave:
     post location for last thing requested
     """
 
-    def __init__(self, host, port):
+    def __init__(self, host, port, protocol=PROTOCOL_JSON, clock=None):
         """
         establish connection
         :param host: redis host
         :param port: redis port
+        :param protocol: PROTOCOL_JSON or PROTOCOL_BINARY, must match the
+            master
+        :param clock: function returning the time in seconds, used for
+            capture / publish timestamps (defaults to time.monotonic)
         """
         self.host = host
         self.port = port
+        self.protocol = protocol
+        self.clock = clock if clock is not None else time.monotonic
         self.r = redis.Redis(host, port)
 
-    def pop_command(self):
-        """ check for a command on the queue, returns None if empty queue """
+        if protocol not in (PROTOCOL_JSON, PROTOCOL_BINARY):
+            raise ValueError('unknown protocol ' + str(protocol))
+
+        # the command we are currently answering
+        self.command_id = 0
+        self.thing = None
+        self.sequence = 0
+
+    def pop_command(self, timeout=None):
+        """
+        check for a command on the queue, returns None if empty queue
+        :param timeout: None to return immediately; otherwise block for up
+            to this many seconds waiting for a command (0 = forever)
+        """
+        if self.protocol == PROTOCOL_BINARY:
+            if timeout is None:
+                data = self.r.rpop(BINARY_COMMAND_QUEUE_KEY)
+            else:
+                item = self.r.brpop(BINARY_COMMAND_QUEUE_KEY, timeout)
+                data = item[1] if item is not None else None
+
+            if data is None:
+                return None
+
+            command = protocol.decode_command(data)
+            self.command_id = command['command_id']
+            self.thing = command['locate']
+            return command
+
         try:
-            serial_json = self.r.rpop(COMMAND_QUEUE_KEY).decode()
-            return json.loads(serial_json)
-        except AttributeError:
+            if timeout is None:
+                serial_json = self.r.rpop(COMMAND_QUEUE_KEY).decode()
+            else:
+                serial_json = self.r.brpop(COMMAND_QUEUE_KEY, timeout)[1]
+                serial_json = serial_json.decode()
+            command = json.loads(serial_json)
+            self.thing = command.get('locate')
+            return command
+        except (AttributeError, TypeError):
             return None
 
-    def update_location(self, azimuth, altitude):
+    def update_location(self, azimuth, altitude, capture_time=None):
         """
         send back the degrees relative to camera + or - from 0 degrees
         :param azimuth:
         :param altitude:
-        :return:
+        :param capture_time: when the frame this came from was captured
+            (binary protocol only; defaults to now)
+        :return: sequence number of the result (binary), or redis set result
         """
+        if self.protocol == PROTOCOL_BINARY:
+            now = self.clock()
+            if capture_time is None:
+                capture_time = now
+
+            self.sequence += 1
+            data = protocol.encode_location(
+                self.command_id, self.sequence, self.thing,
+                capture_time, now, azimuth, altitude
+            )
+
+            self.r.publish(LOCATION_CHANNEL, data)
+            return self.sequence
+
         location = {'azimuth': azimuth, 'altitude': altitude}
         serial_json = json.dumps(location)
         return self.r.set(LOCATION_KEY, serial_json)
+
+    def get_targets(self):
+        """
+        check which things the robot wants tracked
+        :return: list of things, in visionconstants.THINGS order
+        """
+        targets = {thing.decode() for thing in self.r.smembers(TARGETS_KEY)}
+        return [thing for thing in THINGS if thing in targets]
+
+    def update_locations(self, locations, capture_time=None,
+                         ttl_ms=TARGET_LOCATION_TTL_MS):
+        """
+        post results for several things at once, each under its own key
+        :param locations: dict mapping thing to an (azimuth, altitude) tuple;
+            things that weren't found this frame should just be left out,
+            their old result expires after ttl_ms
+        :param capture_time: when the frame was captured (binary protocol
+            only; defaults to now)
+        :param ttl_ms: how long each result stays valid, in milliseconds;
+            the master works out how old a result is from the time it has
+            left, so this must match its location_ttl_ms
+        :return: sequence number of the batch (binary), or None
+        """
+        if not locations:
+            return None
+
+        now = self.clock()
+        if capture_time is None:
+            capture_time = now
+
+        if self.protocol == PROTOCOL_BINARY:
+            self.sequence += 1
+
+        pipe = self.r.pipeline(transaction=False)
+        for thing, (azimuth, altitude) in locations.items():
+            if self.protocol == PROTOCOL_BINARY:
+                data = protocol.encode_location(
+                    self.command_id, self.sequence, thing,
+                    capture_time, now, azimuth, altitude
+                )
+            else:
+                data = json.dumps({'azimuth': azimuth, 'altitude': altitude})
+
+            pipe.set(TARGET_LOCATION_KEY_PREFIX + thing, data, px=ttl_ms)
+        pipe.execute()
+
+        if self.protocol == PROTOCOL_BINARY:
+            return self.sequence
@@ -7,14 +7,27 @@ import wpilib
 
 
 class Winch:
+    #: Status frame periods (in ms) for the winch Talon.
+    #: See :mod:`canbus.status_frames`.
+    status_frames = {
+        'general': 100,
+        'feedback': 20,  # winch position, read by teleop while climbing
+        'quadrature': 500,  # dashboard only
+    }
+
     def __init__(self, talon_id):
         self.talon = TalonSRX(talon_id)
-        self.talon.configSelectedFeedbackSensor(
-            TalonSRX.FeedbackDevice.QuadEncoder, 0, 0
-        )
-        self.talon.setQuadraturePosition(0, 0)
         self.talon.setInverted(True)
 
+    def get_talon_config(self):
+        return [(self.talon, {
+            'feedback_sensor': TalonSRX.FeedbackDevice.QuadEncoder,
+            'quadrature_position': 0,
+        })]
+
+    def get_status_frame_rates(self):
+        return [(self.talon, self.status_frames)]
+
     def forward(self):
         self.talon.set(TalonSRX.ControlMode.PercentOutput, 0.75)
 